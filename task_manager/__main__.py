@@ -1,4 +1,12 @@
-from gtasks.app import run_commands
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+# ``python -m task_manager`` runs from the parent directory; the code imports
+# the ``gtasks`` package from here.
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 tutorial_questions = [
     "alınacak listeme kedi kumu ekler misin?",
@@ -6,4 +14,83 @@ tutorial_questions = [
     "alınacak listesindeki kedi kumunu tamamlandı olarak işaretle",
 ]
 
-run_commands(tutorial_questions)
+
+def tutorial(args):
+    from gtasks.app import run_commands
+
+    run_commands(tutorial_questions)
+
+
+def _given(**options) -> dict:
+    # Options left unset fall back to the defaults of the module that takes them.
+    return {key: value for key, value in options.items() if value is not None}
+
+
+def serve(args):
+    from gtasks.serve import AgentServer
+
+    server = AgentServer(**_given(concurrency=args.concurrency, queue_size=args.queue_size))
+    try:
+        asyncio.run(server.serve(args.host, args.port, **_given(stats_interval=args.stats_interval)))
+    except KeyboardInterrupt:
+        pass
+
+
+def batch(args):
+    from gtasks.runner import run_batch
+
+    summary = run_batch(
+        args.input,
+        args.output,
+        start=args.start,
+        limit=args.limit,
+        resume=args.resume,
+        **_given(workers=args.workers),
+    )
+    print(json.dumps(summary))
+
+
+def bench(args):
+    from benchmarks.bench_graph import run
+
+    run(args, default_corpus=tutorial_questions)
+
+
+def main(argv=None):
+    # Only the handler of the chosen command imports gtasks, so --help stays fast.
+    from benchmarks.bench_graph import add_arguments
+
+    parser = argparse.ArgumentParser(prog="task_manager")
+    commands = parser.add_subparsers(dest="command")
+
+    commands.add_parser("tutorial", help="Run the tutorial commands (the default).").set_defaults(func=tutorial)
+
+    serve_parser = commands.add_parser("serve", help="Serve many conversations at once over JSON lines on TCP.")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8765)
+    serve_parser.add_argument("--concurrency", type=int, help="Turns running at once (default: GTASKS_SERVE_CONCURRENCY or 32).")
+    serve_parser.add_argument("--queue-size", type=int, help="Pending turns per session (default: 8).")
+    serve_parser.add_argument("--stats-interval", type=float, help="Seconds between stats lines (default: 30).")
+    serve_parser.set_defaults(func=serve)
+
+    batch_parser = commands.add_parser("batch", help="Run the commands of a JSONL file and write the results as JSONL.")
+    batch_parser.add_argument("input")
+    batch_parser.add_argument("output")
+    batch_parser.add_argument("--workers", type=int, help="Records running at once (default: GTASKS_BATCH_WORKERS or 8).")
+    batch_parser.add_argument("--start", type=int, default=0, help="Offset (line number) of the first record to run.")
+    batch_parser.add_argument("--limit", type=int, help="Run at most this many lines from --start.")
+    batch_parser.add_argument("--resume", action="store_true", help="Skip records already in the output and append to it.")
+    batch_parser.set_defaults(func=batch)
+
+    bench_parser = commands.add_parser(
+        "bench", help="Replay recorded LLM and API calls of a command corpus and report per-turn costs."
+    )
+    add_arguments(bench_parser)
+    bench_parser.set_defaults(func=bench)
+
+    args = parser.parse_args(argv)
+    getattr(args, "func", tutorial)(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+API-layer benchmarks against the local fake Tasks server.
+
+Run from the ``task_manager`` directory::
+
+    python -m benchmarks.bench_api --sizes 10 100 1000 10000 --latency 0.02
+
+``requests`` counts HTTP round trips (a batch is one), ``calls`` counts API
+calls (every part of a batch is one).
+"""
+
+import argparse
+import asyncio
+import json
+
+from benchmarks.common import Results, fake_account, fresh_store, measure
+from gtasks.api import cache
+from gtasks.api.utils import build_task_hierarchy
+from gtasks.tools import BulkTaskOps, GetTasks, SearchTasks, UpsertTask
+from gtasks.tools.bulk_task_ops import TaskOperation
+from gtasks.tools.upsert_task import Task as UpsertTaskInput
+
+COLUMNS = ["scenario", "tasks", "lists", "wall_ms", "requests", "calls", "kb_sent", "kb_received"]
+
+
+def bench_size(results: Results, num_tasks: int, latency: float, upserts: int):
+    num_lists = min(10, max(1, num_tasks // 100))
+    row = dict(tasks=num_tasks, lists=num_lists)
+
+    with fake_account(num_tasks, num_lists=num_lists, children_per_task=2, latency=latency) as server:
+        tool = GetTasks()
+
+        with measure(results, server, scenario="get_tasks cold", **row):
+            _, task_lists = tool._run()
+
+        with measure(results, server, scenario="get_tasks warm", **row):
+            tool._run()
+
+        cache.get_store().expire()
+        with measure(results, server, scenario="get_tasks delta", **row):
+            tool._run()
+
+        # The first search builds the index, later ones only look it up.
+        with measure(results, server, scenario="search_tasks warm", **row):
+            SearchTasks()._run("task 42")
+
+        with measure(results, server, scenario="search_tasks indexed", **row):
+            SearchTasks()._run("notes for task 4242")
+
+        list_id = task_lists[0]["id"]
+        with measure(results, server, scenario=f"upsert_task x{upserts}", **row):
+            for index in range(upserts):
+                UpsertTask()._run(list_id, UpsertTaskInput(title=f"Bench task {index}"))
+
+        operations = [TaskOperation(op="create", task_list_id=list_id, title=f"Bulk task {index}") for index in range(upserts)]
+        with measure(results, server, scenario=f"bulk_task_ops x{upserts}", **row):
+            BulkTaskOps()._run(operations)
+
+        fresh_store()
+        # Unsynced lists are filtered by the server, which sends summaries only.
+        with measure(results, server, scenario="get_tasks due filter cold", **row):
+            tool._run(due_min="2026-01-01", due_max="2026-01-08")
+
+        with measure(results, server, scenario="get_tasks cold async", **row):
+            asyncio.run(tool._arun())
+
+        tasks = [task for task_list in task_lists for task in cache.get_store().get_tasks(task_list["id"])]
+        with measure(results, scenario="build_task_hierarchy", **row):
+            build_task_hierarchy(tasks)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated latency per HTTP request, in seconds.")
+    parser.add_argument("--upserts", type=int, default=10)
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this file.")
+    args = parser.parse_args(argv)
+
+    results = Results(COLUMNS)
+    for num_tasks in args.sizes:
+        bench_size(results, num_tasks, args.latency, args.upserts)
+    results.print()
+
+    if args.json_path:
+        with open(args.json_path, "w") as output:
+            json.dump(results.rows, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+End-to-end benchmark of the agent graph over recorded LLM and Tasks API calls.
+
+Record a cassette once, against the live endpoints::
+
+    python -m task_manager bench --record --cassette tutorial.json
+
+then replay it as often as needed, offline and deterministically, to see
+what a prompt or tool change costs per turn::
+
+    python -m task_manager bench --cassette tutorial.json --latency-scale 1
+
+The corpus is the tutorial commands unless ``--corpus`` names a file with
+one command per line, or JSON lines with ``message`` and optional
+``session`` fields (the ``batch`` input format). Commands of a session run
+in order, in one conversation.
+
+Replays only follow the recording while the run makes the same calls: a
+changed prompt still replays the recorded responses, but a run asking for
+a call that was never recorded fails with ``CassetteMiss``. Record again
+after such changes.
+"""
+
+import argparse
+import json
+
+from typing import List, Optional, Tuple
+
+# gtasks and langgraph are imported where used: ``python -m task_manager``
+# imports this module for ``add_arguments`` alone.
+
+COLUMNS = ["turn", "command", "wall_ms", "llm_calls", "tool_calls", "api_requests", "input_tokens", "output_tokens"]
+
+# Commands are cut to this many characters in the table.
+COMMAND_WIDTH = 40
+
+
+def read_corpus(path: str) -> List[Tuple[str, str]]:
+    """``(session, command)`` pairs of a corpus file."""
+    commands = []
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                record = json.loads(line)
+                commands.append((str(record.get("session", "bench")), record["message"]))
+            else:
+                commands.append(("bench", line))
+    return commands
+
+
+def reset_state():
+    """Start from an empty store and fresh process-wide state, as the recording did."""
+    from benchmarks.common import fresh_store
+    from gtasks.app import get_response_cache
+    from gtasks.directory import get_directory
+    from gtasks.prefetch import get_prefetcher
+    from gtasks.tools.compact import clear_aliases
+
+    fresh_store()
+    clear_aliases()
+    get_directory.cache_clear()
+    get_prefetcher.cache_clear()
+    cache = get_response_cache()
+    if cache is not None:
+        cache.clear()
+
+
+def run_bench(commands: List[Tuple[str, str]], results):
+    """Run ``commands`` through a new graph and add one row per turn, plus a total."""
+    from langgraph.checkpoint.memory import MemorySaver
+
+    from gtasks import tracing
+    from gtasks.app import build_graph
+
+    graph = build_graph(checkpointer=MemorySaver())
+    totals = dict.fromkeys(COLUMNS[2:], 0)
+    for index, (session, command) in enumerate(commands, start=1):
+        config = {"configurable": {"thread_id": session}}
+
+        with tracing.trace(command) as turn:
+            for _ in graph.stream({"messages": ("user", command)}, config={**config, "callbacks": turn.callbacks}, stream_mode="updates"):
+                pass
+
+        llm_spans = [span for span in turn.spans if span.kind == "llm"]
+        row = dict(
+            wall_ms=turn.root.duration_ms,
+            llm_calls=len(llm_spans),
+            tool_calls=sum(span.kind == "tool" for span in turn.spans),
+            api_requests=sum(span.kind == "api" for span in turn.spans),
+            input_tokens=sum(span.attributes.get("input_tokens") or 0 for span in llm_spans),
+            output_tokens=sum(span.attributes.get("output_tokens") or 0 for span in llm_spans),
+        )
+        for key, value in row.items():
+            totals[key] += value
+        results.add(turn=index, command=command[:COMMAND_WIDTH], **row)
+    results.add(turn="total", command=f"{len(commands)} commands", **totals)
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--cassette", default="bench_cassette.json", help="Cassette file to replay, or to record with --record.")
+    parser.add_argument("--record", action="store_true", help="Run against the live endpoints and record the cassette.")
+    parser.add_argument("--corpus", help="Commands to run, one per line or as JSON lines.")
+    parser.add_argument("--latency-scale", type=float, default=0.0, help="Replay each call in its recorded time times this.")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this file.")
+
+
+def run(args, default_corpus: Optional[List[str]] = None):
+    from benchmarks.common import Results
+    from gtasks.cassette import use_cassette
+
+    if args.corpus:
+        commands = read_corpus(args.corpus)
+    elif default_corpus:
+        commands = [("bench", command) for command in default_corpus]
+    else:
+        raise SystemExit("No commands to run: pass --corpus.")
+
+    reset_state()
+    results = Results(COLUMNS)
+    with use_cassette(args.cassette, "record" if args.record else "replay", args.latency_scale) as cassette:
+        run_bench(commands, results)
+    results.print()
+
+    if args.record:
+        print(f"Recorded {len(cassette.calls['llm'])} LLM calls and {len(cassette.calls['http'])} HTTP exchanges to {args.cassette}")
+    else:
+        print(f"Replayed from {args.cassette}: {cassette.loose_matches} calls matched loosely, unused: {cassette.unused()}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as output:
+            json.dump(results.rows, output, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    run(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import os
+import tempfile
+import time
+
+from contextlib import contextmanager
+from typing import List, Optional
+
+from gtasks.api import cache, gtasks_api, rate_limit
+from gtasks.api.fake_server import FakeTasksServer
+
+
+def fresh_store() -> cache.TaskStore:
+    """Point the shared task store at a new, empty database file."""
+    cache.get_store.cache_clear()
+    cache.DEFAULT_CACHE_PATH = os.path.join(tempfile.mkdtemp(prefix="gtasks-bench-"), "tasks_cache.db")
+    return cache.get_store()
+
+
+@contextmanager
+def fake_account(num_tasks: int, num_lists: int = 1, children_per_task: int = 0, latency: float = 0.0, quota: bool = False):
+    """
+    Start a fake server holding a synthetic account and point ``gtasks_api`` at it.
+
+    The fake server has no quota, so the client-side rate limiter is off
+    unless ``quota`` is set.
+    """
+    with FakeTasksServer(latency=latency) as server:
+        server.populate(num_tasks, num_lists=num_lists, children_per_task=children_per_task)
+        gtasks_api.use_api_root(server.url)
+        fresh_store()
+        if not quota:
+            rate_limit.set_limiter(rate_limit.RateLimiter(project_qps=0, user_qps=0))
+        try:
+            yield server
+        finally:
+            gtasks_api.use_api_root()
+            rate_limit.set_limiter()
+
+
+class Results:
+    """Rows of a benchmark run, printed as a table."""
+
+    def __init__(self, columns: List[str]):
+        self.columns = columns
+        self.rows: List[dict] = []
+
+    def add(self, **row):
+        self.rows.append(row)
+
+    def print(self):
+        widths = {
+            column: max([len(column)] + [len(self._format(row.get(column))) for row in self.rows])
+            for column in self.columns
+        }
+        print("  ".join(column.ljust(widths[column]) for column in self.columns))
+        for row in self.rows:
+            print("  ".join(self._format(row.get(column)).ljust(widths[column]) for column in self.columns))
+
+    @staticmethod
+    def _format(value) -> str:
+        if isinstance(value, float):
+            return f"{value:.2f}"
+        return "" if value is None else str(value)
+
+
+@contextmanager
+def measure(results: Results, server: Optional[FakeTasksServer] = None, **row):
+    """Add a row with the wall time, and the server traffic if given, of the block."""
+    if server is not None:
+        server.reset_stats()
+    start = time.perf_counter()
+    yield
+    row["wall_ms"] = (time.perf_counter() - start) * 1000
+    if server is not None:
+        row.update(
+            requests=server.stats["requests"],
+            calls=server.stats["requests"] - server.stats["batches"] + server.stats["batch_parts"],
+            kb_sent=server.stats["bytes_received"] / 1024,
+            kb_received=server.stats["bytes_sent"] / 1024,
+        )
+    results.add(**row)
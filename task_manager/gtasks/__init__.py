@@ -1,3 +1,11 @@
 from .api import *
 from .tools import *
-from .app import run_commands
\ No newline at end of file
+
+
+def __getattr__(name):
+    # The agent graph pulls in langgraph, so it is only imported when used.
+    if name == "run_commands":
+        from .app import run_commands
+
+        return run_commands
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
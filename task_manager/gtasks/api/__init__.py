@@ -1 +1,9 @@
-from .gtasks_api import get_task_lists, get_task_list, get_tasks, upsert_task
+from .gtasks_api import get_task_lists, get_task_list, get_task, get_tasks, upsert_task, move_task, delete_task
+from .gtasks_api import iter_task_lists, iter_task_pages, iter_tasks, query_tasks
+from .gtasks_api import sync_tasks, get_cached_task_list, get_cached_tasks
+from .gtasks_api import get_api_root, use_api_root
+from .batch import TasksBatch, BatchResult, sync_task_lists, upsert_tasks
+from .async_api import aget_task_list, aget_task_lists, aget_task, aget_tasks, aupsert_task, amove_task, adelete_task
+from .async_api import aiter_task_lists, aiter_task_pages, aquery_tasks, async_sync_tasks, aget_cached_task_list, aget_cached_tasks
+from .search import SearchHit, search_tasks
+from .rate_limit import RateLimiter, as_user, get_limiter, set_limiter
@@ -0,0 +1,311 @@
+import asyncio
+import itertools
+import re
+import weakref
+
+from datetime import datetime, timezone
+from typing import AsyncIterator, List, Optional
+
+import httpx
+from google.auth.transport.requests import Request
+
+from gtasks import tracing
+from gtasks.api import gtasks_api, rate_limit
+from gtasks.api.cache import get_store
+from gtasks.api.typing import TasksResponse, TaskListsResponse, Task, TaskList, TaskSummary, TaskSummariesResponse
+
+try:
+    import h2  # noqa: F401
+
+    HTTP2 = True
+except ImportError:  # pragma: no cover - h2 is optional
+    HTTP2 = False
+
+# Connection pool shared by every coroutine running on the same event loop.
+POOL_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10)
+TIMEOUT = httpx.Timeout(30.0)
+
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+# One credential refresh at a time per event loop. Locks are bound to their loop.
+_refresh_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_client() -> httpx.AsyncClient:
+    """Pooled client for the running event loop, created on first use."""
+    loop = asyncio.get_running_loop()
+    base_url = gtasks_api.get_api_root() + "tasks/v1/"
+    client = _clients.get(loop)
+    if client is None or client.is_closed or client.base_url != base_url:
+        client = httpx.AsyncClient(
+            base_url=base_url, http2=HTTP2, limits=POOL_LIMITS, timeout=TIMEOUT
+        )
+        _clients[loop] = client
+    return client
+
+
+async def aclose():
+    """Close the pooled client of the running event loop."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+async def _auth_headers() -> dict:
+    creds = gtasks_api._creds
+    if creds is None:
+        # First use reads the token file, and may even run the OAuth flow.
+        creds = await asyncio.to_thread(gtasks_api.get_credentials)
+    if not creds.valid:
+        lock = _refresh_locks.setdefault(asyncio.get_running_loop(), asyncio.Lock())
+        async with lock:
+            if not creds.valid:
+                # google-auth only ships a blocking refresh.
+                await asyncio.to_thread(creds.refresh, Request())
+
+    headers = {}
+    creds.apply(headers)
+    return headers
+
+
+def _query(params: dict) -> dict:
+    return {
+        key: str(value).lower() if isinstance(value, bool) else value
+        for key, value in params.items()
+        if value is not None
+    }
+
+
+# "lists/<id>/tasks/<id>" -> "lists/*/tasks/*", to group request spans by endpoint.
+_RESOURCE_ID = re.compile(r"(lists|tasks)/[^/]+")
+_ANY_ID = r"\1/*"
+
+
+async def _request(
+    method: str, path: str, params: Optional[dict] = None, body: Optional[dict] = None, headers: Optional[dict] = None
+) -> dict:
+    """Send one API call, with the rate limiting and retries of ``gtasks_api.execute``."""
+    limiter = rate_limit.get_limiter()
+    idempotent = rate_limit.is_idempotent(method, headers)
+    with tracing.span(f"{method} {_RESOURCE_ID.sub(_ANY_ID, path)}", "api") as span:
+        for attempt in itertools.count():
+            waited = await limiter.aacquire()
+            if span is not None and waited:
+                span.attributes["queue_ms"] = span.attributes.get("queue_ms", 0) + round(waited * 1000, 1)
+            try:
+                response = await get_client().request(
+                    method,
+                    path,
+                    params=_query(params or {}),
+                    json=body,
+                    headers={**(headers or {}), **(await _auth_headers())},
+                )
+            except httpx.TransportError:
+                delay = limiter.retry_delay(attempt, None, idempotent=idempotent)
+                if delay is None:
+                    raise
+            else:
+                if span is not None:
+                    span.attributes.update(
+                        request_bytes=len(response.request.content),
+                        response_bytes=len(response.content),
+                        status=response.status_code,
+                    )
+                if response.is_success:
+                    return response.json() if response.content else {}
+                if rate_limit.is_repeated_delete(method, response.status_code, attempt):
+                    return {}
+                delay = limiter.retry_delay(
+                    attempt,
+                    response.status_code,
+                    response.content,
+                    rate_limit.retry_after(response.headers.get("retry-after")),
+                    idempotent=idempotent,
+                )
+                if delay is None:
+                    response.raise_for_status()
+            if span is not None:
+                span.attributes["retries"] = attempt + 1
+            await asyncio.sleep(delay)
+
+
+async def aget_task_list(task_list_id: str) -> TaskList:
+    task_list = TaskList(**(await _request("GET", f"users/@me/lists/{task_list_id}")))
+    get_store().put_task_list(task_list)
+    return task_list
+
+
+async def aget_task_lists(max_results=5, page_token: Optional[str] = None) -> TaskListsResponse:
+    response = TaskListsResponse(
+        **(
+            await _request(
+                "GET",
+                "users/@me/lists",
+                params=dict(maxResults=max_results, pageToken=page_token),
+            )
+        )
+    )
+    for task_list in response.items or []:
+        get_store().put_task_list(task_list)
+    return response
+
+
+async def aiter_task_lists(page_size: int = gtasks_api.MAX_PAGE_SIZE) -> AsyncIterator[TaskList]:
+    """Async counterpart of ``gtasks_api.iter_task_lists``."""
+    page_token = None
+    while True:
+        response = await aget_task_lists(
+            max_results=min(page_size, gtasks_api.MAX_PAGE_SIZE), page_token=page_token
+        )
+        for task_list in response.items or []:
+            yield task_list
+
+        page_token = response.nextPageToken
+        if not page_token:
+            return
+
+
+async def aget_tasks(task_list_id, **params) -> TasksResponse:
+    """
+    Async counterpart of ``gtasks_api.get_tasks``.
+
+    :param task_list_id: Task list ID.
+    :param params: ``tasks.list`` query parameters, e.g. ``showCompleted`` or ``pageToken``.
+    """
+    return TasksResponse(**(await _request("GET", f"lists/{task_list_id}/tasks", params=params)))
+
+
+async def aiter_task_pages(
+    task_list_id, page_size: int = gtasks_api.MAX_PAGE_SIZE, **params
+) -> AsyncIterator[TasksResponse]:
+    """Async counterpart of ``gtasks_api.iter_task_pages``."""
+    page_token = None
+    while True:
+        response = await aget_tasks(
+            task_list_id,
+            maxResults=min(page_size, gtasks_api.MAX_PAGE_SIZE),
+            pageToken=page_token,
+            **params,
+        )
+        yield response
+
+        page_token = response.nextPageToken
+        if not page_token:
+            return
+
+
+async def aquery_tasks(task_list_id: str, fields: str = gtasks_api.SUMMARY_FIELDS, **filters) -> List[TaskSummary]:
+    """Async counterpart of ``gtasks_api.query_tasks``."""
+    params = gtasks_api.query_params(**filters)
+    summaries: List[TaskSummary] = []
+    page_token = None
+    while True:
+        response = TaskSummariesResponse(
+            **(
+                await _request(
+                    "GET",
+                    f"lists/{task_list_id}/tasks",
+                    params=dict(maxResults=gtasks_api.MAX_PAGE_SIZE, pageToken=page_token, fields=fields, **params),
+                )
+            )
+        )
+        summaries.extend(response.items or [])
+        page_token = response.nextPageToken
+        if not page_token:
+            return summaries
+
+
+async def async_sync_tasks(task_list_id: str, max_age: Optional[float] = gtasks_api.SYNC_MAX_AGE) -> bool:
+    """Async counterpart of ``gtasks_api.sync_tasks``."""
+    params = gtasks_api.sync_params(task_list_id, max_age=max_age)
+    if params is None:
+        return False
+
+    store = get_store()
+    started_at = datetime.now(timezone.utc)
+    etag = None
+    async for page in aiter_task_pages(task_list_id, **params):
+        etag = etag or page.etag
+        store.apply_changes(task_list_id, page.items or [])
+    store.mark_synced(task_list_id, etag, started_at)
+    return True
+
+
+async def aget_cached_task_list(task_list_id: str) -> TaskList:
+    return get_store().get_task_list(task_list_id) or await aget_task_list(task_list_id)
+
+
+async def aget_cached_tasks(
+    task_list_id: str, showCompleted=False, max_age: Optional[float] = gtasks_api.SYNC_MAX_AGE
+) -> TasksResponse:
+    """Async counterpart of ``gtasks_api.get_cached_tasks``."""
+    await async_sync_tasks(task_list_id, max_age=max_age)
+    store = get_store()
+    return TasksResponse(
+        kind="tasks#tasks",
+        etag=store.get_sync_state(task_list_id)[0] or "",
+        items=store.get_tasks(task_list_id, show_completed=showCompleted),
+    )
+
+
+async def aupsert_task(task_list_id: Optional[str], task: Task, previous: Optional[str] = None) -> Task:
+    """Async counterpart of ``gtasks_api.upsert_task``."""
+    if task.id:
+        result = await _apatch_task(task_list_id, task)
+    else:
+        response = await _request(
+            "POST",
+            f"lists/{task_list_id}/tasks",
+            params=dict(parent=task.parent, previous=previous),
+            body=task.model_dump(exclude_none=True),
+        )
+        result = Task(**response)
+
+    if task_list_id:
+        get_store().put_task(task_list_id, result)
+    return result
+
+
+async def _apatch_task(task_list_id: Optional[str], task) -> Task:
+    """Async counterpart of ``gtasks_api._patch_task``."""
+    store = get_store()
+    for attempt in range(gtasks_api.MAX_CONFLICT_RETRIES + 1):
+        base = store.get_task(task_list_id, task.id) if task_list_id else None
+        body, etag = gtasks_api._conditional_patch(task, base)
+        headers = {"If-Match": etag} if etag else None
+        try:
+            return Task(**(await _request("PATCH", f"lists/{task_list_id}/tasks/{task.id}", body=body, headers=headers)))
+        except httpx.HTTPStatusError as error:
+            if error.response.status_code != 412 or attempt == gtasks_api.MAX_CONFLICT_RETRIES:
+                raise
+        await aget_task(task_list_id, task.id)
+
+
+async def aget_task(task_list_id: str, task_id: str) -> Task:
+    """Async counterpart of ``gtasks_api.get_task``."""
+    task = Task(**(await _request("GET", f"lists/{task_list_id}/tasks/{task_id}")))
+    get_store().put_task(task_list_id, task)
+    return task
+
+
+async def amove_task(
+    task_list_id: str,
+    task_id: str,
+    parent: Optional[str] = None,
+    previous: Optional[str] = None,
+    destination_task_list_id: Optional[str] = None,
+) -> Task:
+    """Async counterpart of ``gtasks_api.move_task``."""
+    params = dict(parent=parent, previous=previous, destinationTasklist=destination_task_list_id)
+    result = Task(**(await _request("POST", f"lists/{task_list_id}/tasks/{task_id}/move", params=params)))
+    gtasks_api._store_move(task_list_id, task_id, result, destination_task_list_id)
+    return result
+
+
+async def adelete_task(task_list_id: str, task_id: str):
+    """Async counterpart of ``gtasks_api.delete_task``."""
+    await _request("DELETE", f"lists/{task_list_id}/tasks/{task_id}")
+    gtasks_api._store_delete(task_list_id, task_id)
@@ -0,0 +1,250 @@
+import time
+
+from collections import Counter
+from datetime import datetime, timezone
+from functools import partial
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Type, Union
+
+from googleapiclient.errors import HttpError
+from googleapiclient.http import BatchHttpRequest
+from pydantic import BaseModel, Field
+
+from gtasks.api import gtasks_api, rate_limit
+from gtasks.api.cache import get_store
+from gtasks.api.typing import Task, TaskList, TasksResponse
+
+# The batch endpoint accepts up to 1000 calls, but large batches are slower to
+# assemble and fail as a whole on transport errors, so they are split.
+MAX_BATCH_SIZE = 50
+
+
+class BatchResult(BaseModel):
+    """Outcome of a single call inside a batch."""
+
+    key: str = Field(..., description="Key the call was added with.")
+    value: Optional[Union[TasksResponse, TaskList, Task]] = Field(None, description="Parsed response, if the call succeeded.")
+    error: Optional[str] = Field(None, description="Error message, if the call failed.")
+    status: Optional[int] = Field(None, description="HTTP status of a failed call.")
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def chunks(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class TasksBatch:
+    """
+    Collects Tasks API calls and sends them as multipart batch requests.
+
+    Task listings are paginated transparently: pages after the first are sent
+    in follow-up batches and merged into one ``TasksResponse``.
+
+    .. code-block:: python
+
+        batch = TasksBatch()
+        batch.get_task_list("list-id")
+        batch.list_tasks("list-id", key="tasks")
+        results = batch.execute()
+        results["tasks"].value.items
+    """
+
+    def __init__(self):
+        # key -> (build(page_token) -> HttpRequest, response model or None)
+        self._calls: Dict[str, Tuple[Callable, Optional[Type[BaseModel]]]] = {}
+
+    def __len__(self):
+        return len(self._calls)
+
+    def _add(self, key: Optional[str], build: Callable, model: Optional[Type[BaseModel]]) -> str:
+        key = key or str(len(self._calls))
+        if key in self._calls:
+            raise ValueError(f"Duplicate batch key: {key}")
+        self._calls[key] = (build, model)
+        return key
+
+    def get_task_list(self, task_list_id: str, key: Optional[str] = None) -> str:
+        return self._add(key, lambda _: gtasks_api._task_list_request(task_list_id), TaskList)
+
+    def list_tasks(self, task_list_id: str, key: Optional[str] = None, **params) -> str:
+        params.setdefault("maxResults", gtasks_api.MAX_PAGE_SIZE)
+        return self._add(
+            key,
+            lambda page_token: gtasks_api._tasks_request(task_list_id, pageToken=page_token, **params),
+            TasksResponse,
+        )
+
+    def upsert_task(
+        self, task_list_id: Optional[str], task: Task, key: Optional[str] = None, previous: Optional[str] = None
+    ) -> str:
+        return self._add(key, lambda _: gtasks_api._upsert_request(task_list_id, task, previous), Task)
+
+    def move_task(
+        self,
+        task_list_id: str,
+        task_id: str,
+        parent: Optional[str] = None,
+        previous: Optional[str] = None,
+        destination_task_list_id: Optional[str] = None,
+        key: Optional[str] = None,
+    ) -> str:
+        return self._add(
+            key,
+            lambda _: gtasks_api._move_request(task_list_id, task_id, parent, previous, destination_task_list_id),
+            Task,
+        )
+
+    def delete_task(self, task_list_id: str, task_id: str, key: Optional[str] = None) -> str:
+        # Deletions answer with an empty body: their result has no value.
+        return self._add(key, lambda _: gtasks_api._delete_request(task_list_id, task_id), None)
+
+    def execute(self) -> Dict[str, BatchResult]:
+        """
+        Send all collected calls.
+
+        Calls refused for quota are retried in a later batch, after the
+        backoff of ``rate_limit``. So are idempotent calls failing with a
+        server error.
+
+        :return: Results keyed by call key, in the order the calls were added.
+        """
+        results: Dict[str, BatchResult] = {}
+        attempts: Counter = Counter()
+        pending = [(key, None) for key in self._calls]
+
+        while pending:
+            next_pages, retries = [], []
+            for chunk in chunks(pending, MAX_BATCH_SIZE):
+                # Not service.new_batch_http_request(): that always targets
+                # Google, whatever the service's api_endpoint is.
+                http_batch = BatchHttpRequest(batch_uri=gtasks_api.get_api_root() + "batch")
+                for key, page_token in chunk:
+                    build, _ = self._calls[key]
+                    request = build(page_token)
+                    idempotent = rate_limit.is_idempotent(request.method, request.headers)
+                    http_batch.add(
+                        request,
+                        callback=partial(self._collect, results, next_pages, retries, attempts, page_token, request.method, idempotent),
+                        request_id=key,
+                    )
+                gtasks_api.execute(http_batch, cost=len(chunk))
+
+            if retries:
+                time.sleep(max(delay for _, _, delay in retries))
+            pending = next_pages + [(key, page_token) for key, page_token, _ in retries]
+
+        return {key: results[key] for key in self._calls}
+
+    def _collect(self, results, next_pages, retries, attempts, page_token, method, idempotent, key, response, exception):
+        if exception is not None:
+            status = exception.resp.status if isinstance(exception, HttpError) else None
+            if rate_limit.is_repeated_delete(method, status, attempts[key]):
+                results[key] = BatchResult(key=key, value=None)
+                return
+            if status is not None:
+                delay = rate_limit.get_limiter().retry_delay(
+                    attempts[key],
+                    status,
+                    exception.content,
+                    rate_limit.retry_after(exception.resp.get("retry-after")),
+                    idempotent=idempotent,
+                )
+                if delay is not None:
+                    attempts[key] += 1
+                    retries.append((key, page_token, delay))
+                    return
+            results[key] = BatchResult(key=key, error=str(exception), status=status)
+            return
+
+        model = self._calls[key][1]
+        value = model(**response) if model is not None else None
+        previous = results.get(key)
+        if previous is not None and isinstance(value, TasksResponse):
+            # Follow-up page of a listing: merge into the first page.
+            previous.value.items = (previous.value.items or []) + (value.items or [])
+            previous.value.nextPageToken = value.nextPageToken
+            value = previous.value
+        results[key] = BatchResult(key=key, value=value)
+
+        if isinstance(value, TasksResponse) and value.nextPageToken:
+            next_pages.append((key, value.nextPageToken))
+
+
+def sync_task_lists(
+    task_list_ids: Iterable[str], max_age: Optional[float] = gtasks_api.SYNC_MAX_AGE
+) -> Dict[str, str]:
+    """
+    Batched ``sync_tasks`` for several lists.
+
+    Missing list metadata and delta listings for stale lists go out in the same
+    batch, so fresh lists cost nothing and stale ones share one round trip.
+
+    :param task_list_ids: Task list IDs.
+    :param max_age: See ``gtasks_api.sync_tasks``.
+    :return: Error messages keyed by the IDs of lists that could not be synced.
+    """
+    store = get_store()
+    batch = TasksBatch()
+    for task_list_id in task_list_ids:
+        if store.get_task_list(task_list_id) is None:
+            batch.get_task_list(task_list_id, key=f"list:{task_list_id}")
+
+        params = gtasks_api.sync_params(task_list_id, max_age=max_age)
+        if params is not None:
+            batch.list_tasks(task_list_id, key=f"tasks:{task_list_id}", **params)
+
+    if not len(batch):
+        return {}
+
+    started_at = datetime.now(timezone.utc)
+    errors = {}
+    for key, result in batch.execute().items():
+        kind, task_list_id = key.split(":", 1)
+        if not result.ok:
+            errors[task_list_id] = result.error
+        elif kind == "list":
+            store.put_task_list(result.value)
+        else:
+            store.apply_changes(task_list_id, result.value.items or [])
+            store.mark_synced(task_list_id, result.value.etag, started_at)
+    return errors
+
+
+def upsert_tasks(items: Iterable[Tuple[Optional[str], Task]]) -> List[BatchResult]:
+    """
+    Batched ``upsert_task``.
+
+    :param items: ``(task_list_id, task)`` pairs.
+    :return: One result per pair, in order.
+    """
+    items = list(items)
+    results: List[Optional[BatchResult]] = [None] * len(items)
+    batch = TasksBatch()
+    for index, (task_list_id, task) in enumerate(items):
+        batch.upsert_task(task_list_id, task, key=str(index))
+
+    for key, result in batch.execute().items() if len(batch) else ():
+        index = int(key)
+        task_list_id, task = items[index]
+        if result.status == 412:
+            # The task changed on the server since it was stored.
+            result = _single(key, lambda: gtasks_api._patch_task(task_list_id, task, stale=True))
+        if result.ok and task_list_id:
+            get_store().put_task(task_list_id, result.value)
+        results[index] = result
+    return results
+
+
+def _single(key: str, call: Callable) -> BatchResult:
+    """Result of a call made on its own instead of in a batch."""
+    try:
+        return BatchResult(key=key, value=call())
+    except HttpError as error:
+        return BatchResult(key=key, error=str(error), status=error.resp.status)
+    except Exception as error:
+        return BatchResult(key=key, error=str(error))
@@ -0,0 +1,224 @@
+import os
+import sqlite3
+import threading
+import time
+
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+from gtasks.api.typing import Task, TaskList
+
+# Location of the local task store. Relative paths resolve against the working
+# directory, next to token.json.
+DEFAULT_CACHE_PATH = os.environ.get("GTASKS_CACHE_PATH", "tasks_cache.db")
+
+# Server timestamps and the local clock are not guaranteed to agree, so every
+# incremental sync overlaps the previous one by this much.
+SYNC_CLOCK_SKEW = timedelta(seconds=5)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS task_lists (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    list_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    completed INTEGER NOT NULL,
+    hidden INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (list_id, id)
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    list_id TEXT PRIMARY KEY,
+    etag TEXT,
+    updated_min TEXT NOT NULL,
+    synced_at REAL NOT NULL
+);
+"""
+
+
+def _rfc3339(moment: datetime) -> str:
+    return moment.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+class TaskStore:
+    """
+    Persistent local copy of task lists and tasks, keyed by list id and task id.
+
+    The store only holds what the API returned. Deciding when to talk to the
+    API is left to ``gtasks_api.sync_tasks``.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        # In-memory write counters, so that derived data (e.g. the search
+        # index) can tell which lists changed since it last looked.
+        self._versions: Dict[str, int] = {}
+        self._version = 0
+        # Same for the set of lists and their titles.
+        self._lists_version = 0
+
+    def _bump(self, task_list_id: Optional[str] = None):
+        self._version += 1
+        if task_list_id is None:
+            for known in self._versions:
+                self._versions[known] = self._version
+        else:
+            self._versions[task_list_id] = self._version
+
+    def lists_version(self) -> int:
+        """Counter of additions, removals and renames of task lists."""
+        return self._lists_version
+
+    def version(self, task_list_id: Optional[str] = None) -> int:
+        """Write counter of a list's tasks, or of the whole store."""
+        if task_list_id is None:
+            return self._version
+        return self._versions.get(task_list_id, 0)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # ---- task lists
+
+    def put_task_list(self, task_list: TaskList):
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT data FROM task_lists WHERE id = ?", (task_list.id,)).fetchone()
+            if row is None or TaskList.model_validate_json(row[0]).title != task_list.title:
+                # Answers naming lists may be stale now, so the whole store's version moves too.
+                self._lists_version += 1
+                self._version += 1
+            self._conn.execute(
+                "INSERT OR REPLACE INTO task_lists (id, data) VALUES (?, ?)",
+                (task_list.id, task_list.model_dump_json()),
+            )
+
+    def get_task_list(self, task_list_id: str) -> Optional[TaskList]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM task_lists WHERE id = ?", (task_list_id,)
+            ).fetchone()
+        return TaskList.model_validate_json(row[0]) if row else None
+
+    def get_task_lists(self) -> List[TaskList]:
+        with self._lock:
+            rows = self._conn.execute("SELECT data FROM task_lists").fetchall()
+        return [TaskList.model_validate_json(data) for data, in rows]
+
+    # ---- tasks
+
+    def put_task(self, task_list_id: str, task: Task):
+        self.apply_changes(task_list_id, [task])
+
+    def apply_changes(self, task_list_id: str, tasks: Iterable[Task]):
+        """
+        Merge tasks returned by the API into the store.
+
+        Tombstones (``deleted`` tasks) remove the stored copy.
+
+        :param task_list_id: Task list ID.
+        :param tasks: Tasks as returned by the API.
+        """
+        changed = False
+        with self._lock, self._conn:
+            for task in tasks:
+                changed = True
+                if task.deleted:
+                    self._conn.execute(
+                        "DELETE FROM tasks WHERE list_id = ? AND id = ?",
+                        (task_list_id, task.id),
+                    )
+                    continue
+
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO tasks (list_id, id, completed, hidden, data) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (
+                        task_list_id,
+                        task.id,
+                        task.status == "completed",
+                        bool(task.hidden),
+                        task.model_dump_json(exclude_none=True),
+                    ),
+                )
+            if changed:
+                self._bump(task_list_id)
+
+    def get_task(self, task_list_id: str, task_id: str) -> Optional[Task]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM tasks WHERE list_id = ? AND id = ?",
+                (task_list_id, task_id),
+            ).fetchone()
+        return Task.model_validate_json(row[0]) if row else None
+
+    def get_tasks(
+        self, task_list_id: str, show_completed=False, show_hidden=False
+    ) -> List[Task]:
+        query = "SELECT data FROM tasks WHERE list_id = ?"
+        if not show_completed:
+            query += " AND completed = 0"
+        if not show_hidden:
+            query += " AND hidden = 0"
+
+        with self._lock:
+            rows = self._conn.execute(query, (task_list_id,)).fetchall()
+        return [Task.model_validate_json(data) for data, in rows]
+
+    # ---- sync bookkeeping
+
+    def get_sync_state(self, task_list_id: str) -> Optional[tuple]:
+        """
+        :return: ``(etag, updated_min, synced_at)`` of the last sync, or None if
+            the list has never been synced.
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT etag, updated_min, synced_at FROM sync_state WHERE list_id = ?",
+                (task_list_id,),
+            ).fetchone()
+
+    def mark_synced(self, task_list_id: str, etag: Optional[str], started_at: datetime):
+        """
+        Record a completed sync.
+
+        :param started_at: When the sync request was sent. The next sync asks for
+            changes since this moment, minus ``SYNC_CLOCK_SKEW``.
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sync_state (list_id, etag, updated_min, synced_at) "
+                "VALUES (?, ?, ?, ?)",
+                (task_list_id, etag, _rfc3339(started_at - SYNC_CLOCK_SKEW), time.time()),
+            )
+
+    def expire(self, task_list_id: Optional[str] = None):
+        """Make the next read of a list (or of every list) sync, whatever its age."""
+        with self._lock, self._conn:
+            if task_list_id is None:
+                self._conn.execute("UPDATE sync_state SET synced_at = 0")
+            else:
+                self._conn.execute("UPDATE sync_state SET synced_at = 0 WHERE list_id = ?", (task_list_id,))
+
+    def clear(self, task_list_id: Optional[str] = None):
+        with self._lock, self._conn:
+            self._bump(task_list_id)
+            self._lists_version += 1
+            if task_list_id is None:
+                for table in ("task_lists", "tasks", "sync_state"):
+                    self._conn.execute(f"DELETE FROM {table}")
+            else:
+                self._conn.execute("DELETE FROM task_lists WHERE id = ?", (task_list_id,))
+                self._conn.execute("DELETE FROM tasks WHERE list_id = ?", (task_list_id,))
+                self._conn.execute("DELETE FROM sync_state WHERE list_id = ?", (task_list_id,))
+
+
+@lru_cache(maxsize=None)
+def get_store() -> TaskStore:
+    """Shared store instance, opened on first use."""
+    return TaskStore(DEFAULT_CACHE_PATH)
@@ -0,0 +1,568 @@
+"""
+In-process stand-in for the Google Tasks v1 endpoints used by ``gtasks_api``.
+
+.. code-block:: python
+
+    from gtasks.api import gtasks_api
+    from gtasks.api.fake_server import FakeTasksServer
+
+    with FakeTasksServer(latency=0.05) as server:
+        task_list = server.add_task_list("alınacak")
+        server.add_task(task_list["id"], "kedi kumu")
+
+        gtasks_api.use_api_root(server.url)
+        ...
+        print(server.stats)
+"""
+
+import hashlib
+import itertools
+import json
+import re
+import threading
+import time
+
+from collections import Counter, deque
+from datetime import datetime, timezone
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+# Page size defaults and limits of the real API.
+_DEFAULT_TASKS_PAGE_SIZE = 20
+_MAX_TASKS_PAGE_SIZE = 100
+_DEFAULT_LISTS_PAGE_SIZE = 1000
+_MAX_LISTS_PAGE_SIZE = 1000
+
+_SEED_UPDATED = "2020-01-01T00:00:00.000Z"
+
+
+class FakeApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+
+def _flag(query: dict, name: str, default: bool) -> bool:
+    value = query.get(name)
+    return default if value is None else value.lower() == "true"
+
+
+def _time(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+def _in_range(value: Optional[str], low: Optional[datetime], high: Optional[datetime]) -> bool:
+    """Whether ``value`` is within ``[low, high)``. Without bounds, anything is."""
+    if low is None and high is None:
+        return True
+    moment = _time(value)
+    return moment is not None and (low is None or moment >= low) and (high is None or moment < high)
+
+
+def _parse_fields(mask: str) -> dict:
+    """A ``fields=`` mask such as ``etag,items(id,title)`` as ``{"etag": {}, "items": {"id": {}, "title": {}}}``."""
+    root: dict = {}
+    stack = [root]
+    name = ""
+    for char in mask + ",":
+        if char in ",()":
+            if name.strip():
+                # "a/b" selects b inside a.
+                node = stack[-1]
+                for part in name.strip().split("/"):
+                    node = node.setdefault(part, {})
+                last = node
+            name = ""
+            if char == "(":
+                stack.append(last)
+            elif char == ")":
+                stack.pop()
+        else:
+            name += char
+    return root
+
+
+def _project(value, mask: dict):
+    """Keep only the fields of ``mask`` in ``value``, applied to each item of lists."""
+    if not mask:
+        return value
+    if isinstance(value, list):
+        return [_project(item, mask) for item in value]
+    if isinstance(value, dict):
+        return {key: _project(value[key], sub) for key, sub in mask.items() if key in value}
+    return value
+
+
+def _etag(resource: dict) -> str:
+    digest = hashlib.sha1(json.dumps(resource, sort_keys=True).encode()).hexdigest()
+    return f'"{digest[:27]}"'
+
+
+class FakeTasksState:
+    """Task lists and tasks held by the fake server. All access goes through a lock."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.task_lists: Dict[str, dict] = {}
+        # list id -> task id -> task
+        self.tasks: Dict[str, Dict[str, dict]] = {}
+        # (list id, parent id) -> sibling task ids in position order
+        self.siblings: Dict[Tuple[str, Optional[str]], List[str]] = {}
+        self._ids = itertools.count(1)
+
+    def new_id(self, prefix: str) -> str:
+        return f"{prefix}{next(self._ids):08d}"
+
+    def reposition(self, list_id: str, parent: Optional[str]):
+        for index, task_id in enumerate(self.siblings.get((list_id, parent), [])):
+            self.tasks[list_id][task_id]["position"] = f"{index:020d}"
+
+    def touch(self, resource: dict, updated: Optional[str] = None):
+        resource["updated"] = updated or _now()
+        resource.pop("etag", None)
+        resource["etag"] = _etag(resource)
+
+
+class FakeTasksServer:
+    """
+    Localhost HTTP server implementing ``tasklists.get/list``, ``tasks.get/list/
+    insert/patch/move/delete`` and the batch endpoint, with pagination, etags, parent/position
+    handling, injectable latency and injectable failures.
+
+    :param latency: Seconds to sleep before answering each HTTP request. A
+        batch counts as one request.
+    :param port: Port to listen on, 0 picks a free one.
+    """
+
+    def __init__(self, latency: float = 0.0, port: int = 0):
+        self.latency = latency
+        self.state = FakeTasksState()
+        self.stats: Counter = Counter()
+        self._stats_lock = threading.Lock()
+        # (status, retry_after) answers forced on the next HTTP requests and API calls.
+        self._failing_requests: deque = deque()
+        self._failing_calls: deque = deque()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self) -> "FakeTasksServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self.stats.clear()
+
+    def count(self, **increments):
+        with self._stats_lock:
+            self.stats.update(increments)
+
+    def fail_requests(self, status: int, count: int = 1, retry_after: Optional[float] = None):
+        """
+        Answer the next ``count`` HTTP requests (a batch counts as one) with ``status``.
+
+        :param retry_after: Value of the ``Retry-After`` header to send, if any.
+        """
+        with self._stats_lock:
+            self._failing_requests.extend([(status, retry_after)] * count)
+
+    def fail_calls(self, status: int, count: int = 1):
+        """Fail the next ``count`` API calls, including calls inside batches, with ``status``."""
+        with self._stats_lock:
+            self._failing_calls.extend([(status, None)] * count)
+
+    def _next_failure(self, failures: deque) -> Optional[Tuple[int, Optional[float]]]:
+        with self._stats_lock:
+            if not failures:
+                return None
+            self.stats["injected_failures"] += 1
+            return failures.popleft()
+
+    @staticmethod
+    def _error(status: int) -> dict:
+        reason = "rateLimitExceeded" if status in (403, 429) else "backendError"
+        return {"error": {"code": status, "message": reason, "errors": [{"reason": reason}]}}
+
+    # ---- seeding
+
+    def add_task_list(self, title: str) -> dict:
+        state = self.state
+        with state.lock:
+            list_id = state.new_id("L")
+            task_list = {
+                "kind": "tasks#taskList",
+                "id": list_id,
+                "title": title,
+                "selfLink": f"{self.url}tasks/v1/users/@me/lists/{list_id}",
+            }
+            state.touch(task_list)
+            state.task_lists[list_id] = task_list
+            state.tasks[list_id] = {}
+            return task_list
+
+    def add_task(self, list_id: str, title: str, parent: Optional[str] = None, **fields) -> dict:
+        """Append a task to the end of its siblings. Extra fields are stored as given."""
+        return self._insert(list_id, dict(title=title, parent=parent, **fields), append=True)
+
+    def populate(self, num_tasks: int, num_lists: int = 1, children_per_task: int = 0) -> List[dict]:
+        """
+        Create ``num_lists`` lists sharing ``num_tasks`` tasks between them.
+
+        With ``children_per_task`` every top-level task gets that many subtasks,
+        counted towards ``num_tasks``. Seeded tasks are backdated, so that they
+        fall outside the window of a later incremental sync.
+        """
+        task_lists = [self.add_task_list(f"List {index}") for index in range(num_lists)]
+        per_list = -(-num_tasks // num_lists)
+        created = 0
+        for task_list in task_lists:
+            in_list = 0
+            while in_list < per_list and created < num_tasks:
+                parent = self.add_task(task_list["id"], f"Task {created}", notes=f"Notes for task {created}")
+                created += 1
+                in_list += 1
+                for child in range(children_per_task):
+                    if in_list >= per_list or created >= num_tasks:
+                        break
+                    self.add_task(task_list["id"], f"Task {created}", parent=parent["id"])
+                    created += 1
+                    in_list += 1
+
+        with self.state.lock:
+            for task_list in task_lists:
+                for task in self.state.tasks[task_list["id"]].values():
+                    self.state.touch(task, updated=_SEED_UPDATED)
+        return task_lists
+
+    def _insert(self, list_id: str, body: dict, previous: Optional[str] = None, append=False) -> dict:
+        state = self.state
+        with state.lock:
+            tasks = self._list_tasks_of(list_id)
+            parent = body.get("parent")
+            if parent is not None and parent not in tasks:
+                raise FakeApiError(400, f"Invalid parent: {parent}")
+
+            task_id = state.new_id("T")
+            task = {
+                key: value
+                for key, value in body.items()
+                if key not in ("id", "etag", "kind", "selfLink", "position", "updated") and value is not None
+            }
+            task.update(
+                kind="tasks#task",
+                id=task_id,
+                selfLink=f"{self.url}tasks/v1/lists/{list_id}/tasks/{task_id}",
+                status=task.get("status", "needsAction"),
+                links=task.get("links", []),
+            )
+            siblings = state.siblings.setdefault((list_id, parent), [])
+            if append:
+                siblings.append(task_id)
+            elif previous:
+                if previous not in siblings:
+                    raise FakeApiError(400, f"Invalid previous: {previous}")
+                siblings.insert(siblings.index(previous) + 1, task_id)
+            else:
+                siblings.insert(0, task_id)
+            tasks[task_id] = task
+            state.reposition(list_id, parent)
+            state.touch(task)
+            return task
+
+    def _list_tasks_of(self, list_id: str) -> Dict[str, dict]:
+        try:
+            return self.state.tasks[list_id]
+        except KeyError:
+            raise FakeApiError(404, f"Task list not found: {list_id}")
+
+    def _task(self, list_id: str, task_id: str) -> dict:
+        try:
+            return self._list_tasks_of(list_id)[task_id]
+        except KeyError:
+            raise FakeApiError(404, f"Task not found: {task_id}")
+
+    # ---- endpoints
+
+    _ROUTES = [
+        ("GET", re.compile(r"^/tasks/v1/users/@me/lists$"), "list_task_lists"),
+        ("GET", re.compile(r"^/tasks/v1/users/@me/lists/(?P<list_id>[^/]+)$"), "get_task_list"),
+        ("GET", re.compile(r"^/tasks/v1/lists/(?P<list_id>[^/]+)/tasks$"), "list_tasks"),
+        ("POST", re.compile(r"^/tasks/v1/lists/(?P<list_id>[^/]+)/tasks$"), "insert_task"),
+        ("GET", re.compile(r"^/tasks/v1/lists/(?P<list_id>[^/]+)/tasks/(?P<task_id>[^/]+)$"), "get_task"),
+        ("PATCH", re.compile(r"^/tasks/v1/lists/(?P<list_id>[^/]+)/tasks/(?P<task_id>[^/]+)$"), "patch_task"),
+        ("DELETE", re.compile(r"^/tasks/v1/lists/(?P<list_id>[^/]+)/tasks/(?P<task_id>[^/]+)$"), "delete_task"),
+        ("POST", re.compile(r"^/tasks/v1/lists/(?P<list_id>[^/]+)/tasks/(?P<task_id>[^/]+)/move$"), "move_task"),
+    ]
+
+    def dispatch(self, method: str, target: str, headers, body: bytes) -> Tuple[int, Optional[dict]]:
+        """Serve one (non-batch) API call and return ``(status, json body)``. No body is None."""
+        split = urlsplit(target)
+        query = {key: values[-1] for key, values in parse_qs(split.query).items()}
+
+        for route_method, pattern, name in self._ROUTES:
+            match = pattern.match(split.path)
+            if match and route_method == method:
+                self.count(**{name: 1})
+                failure = self._next_failure(self._failing_calls)
+                if failure is not None:
+                    return failure[0], self._error(failure[0])
+                try:
+                    payload = json.loads(body) if body else {}
+                    with self.state.lock:
+                        result = getattr(self, f"_{name}")(query, headers, payload, **match.groupdict())
+                        if result is None:
+                            return 204, None
+                        if query.get("fields"):
+                            result = _project(result, _parse_fields(query["fields"]))
+                        return 200, result
+                except FakeApiError as error:
+                    return error.status, {"error": {"code": error.status, "message": error.message}}
+
+        return 404, {"error": {"code": 404, "message": f"No route for {method} {split.path}"}}
+
+    @staticmethod
+    def _page(items: list, query: dict, default_size: int, max_size: int) -> Tuple[list, Optional[str]]:
+        size = min(int(query.get("maxResults", default_size)), max_size)
+        offset = int(query.get("pageToken") or 0)
+        page = items[offset:offset + size]
+        next_token = str(offset + size) if offset + size < len(items) else None
+        return page, next_token
+
+    def _list_task_lists(self, query, headers, payload):
+        items, next_token = self._page(
+            list(self.state.task_lists.values()), query, _DEFAULT_LISTS_PAGE_SIZE, _MAX_LISTS_PAGE_SIZE
+        )
+        response = {"kind": "tasks#taskLists", "etag": _etag({"lists": [it["etag"] for it in items]}), "items": items}
+        if next_token:
+            response["nextPageToken"] = next_token
+        return response
+
+    def _get_task_list(self, query, headers, payload, list_id):
+        try:
+            return self.state.task_lists[list_id]
+        except KeyError:
+            raise FakeApiError(404, f"Task list not found: {list_id}")
+
+    def _list_tasks(self, query, headers, payload, list_id):
+        show_completed = _flag(query, "showCompleted", True)
+        show_deleted = _flag(query, "showDeleted", False)
+        show_hidden = _flag(query, "showHidden", False)
+        try:
+            updated_min = _time(query.get("updatedMin"))
+            due_min, due_max = _time(query.get("dueMin")), _time(query.get("dueMax"))
+            completed_min, completed_max = _time(query.get("completedMin")), _time(query.get("completedMax"))
+        except ValueError as error:
+            raise FakeApiError(400, f"Invalid time filter: {error}")
+
+        matching = [
+            task
+            for task in self._list_tasks_of(list_id).values()
+            if (show_completed or task.get("status") != "completed")
+            and (show_deleted or not task.get("deleted"))
+            and (show_hidden or not task.get("hidden"))
+            and (updated_min is None or _time(task["updated"]) >= updated_min)
+            and _in_range(task.get("due"), due_min, due_max)
+            and _in_range(task.get("completed"), completed_min, completed_max)
+        ]
+        items, next_token = self._page(matching, query, _DEFAULT_TASKS_PAGE_SIZE, _MAX_TASKS_PAGE_SIZE)
+        response = {"kind": "tasks#tasks", "etag": _etag({"tasks": [it["etag"] for it in items]}), "items": items}
+        if next_token:
+            response["nextPageToken"] = next_token
+        return response
+
+    def _insert_task(self, query, headers, payload, list_id):
+        if query.get("parent"):
+            payload["parent"] = query["parent"]
+        return self._insert(list_id, payload, previous=query.get("previous"))
+
+    def _get_task(self, query, headers, payload, list_id, task_id):
+        return self._task(list_id, task_id)
+
+    def _patch_task(self, query, headers, payload, list_id, task_id):
+        task = self._task(list_id, task_id)
+        if_match = headers.get("If-Match")
+        if if_match and if_match not in ("*", task["etag"]):
+            raise FakeApiError(412, "Precondition Failed")
+
+        for key, value in payload.items():
+            if key in ("id", "kind", "selfLink", "etag", "updated", "position", "parent"):
+                continue
+            if value is None:
+                task.pop(key, None)
+            else:
+                task[key] = value
+        if payload.get("status") == "completed" and "completed" not in payload:
+            task["completed"] = _now()
+        elif payload.get("status") == "needsAction":
+            task.pop("completed", None)
+        self.state.touch(task)
+        return task
+
+    def _subtree(self, list_id: str, task_id: str) -> List[str]:
+        """``task_id`` and the ids of all its subtasks."""
+        ids, pending = [], [task_id]
+        while pending:
+            current = pending.pop()
+            ids.append(current)
+            pending.extend(self.state.siblings.get((list_id, current), []))
+        return ids
+
+    def _delete_task(self, query, headers, payload, list_id, task_id):
+        state = self.state
+        task = self._task(list_id, task_id)
+        if task.get("deleted"):
+            raise FakeApiError(404, f"Task not found: {task_id}")
+
+        # Deleted tasks stay as tombstones, for listings with showDeleted.
+        state.siblings[(list_id, task.get("parent"))].remove(task_id)
+        state.reposition(list_id, task.get("parent"))
+        for deleted_id in self._subtree(list_id, task_id):
+            state.siblings.pop((list_id, deleted_id), None)
+            deleted = state.tasks[list_id][deleted_id]
+            deleted["deleted"] = True
+            state.touch(deleted)
+        return None
+
+    def _move_task(self, query, headers, payload, list_id, task_id):
+        state = self.state
+        task = self._task(list_id, task_id)
+        destination = query.get("destinationTasklist") or list_id
+        destination_tasks = self._list_tasks_of(destination)
+        parent, previous = query.get("parent") or None, query.get("previous") or None
+        subtree = self._subtree(list_id, task_id)
+        if task.get("deleted"):
+            raise FakeApiError(404, f"Task not found: {task_id}")
+        if parent is not None and (parent not in destination_tasks or destination_tasks[parent].get("deleted") or parent in subtree):
+            raise FakeApiError(400, f"Invalid parent: {parent}")
+        if previous is not None and (previous == task_id or previous not in state.siblings.get((destination, parent), [])):
+            raise FakeApiError(400, f"Invalid previous: {previous}")
+
+        old_parent = task.get("parent")
+        state.siblings[(list_id, old_parent)].remove(task_id)
+        state.reposition(list_id, old_parent)
+
+        if destination != list_id:
+            for moved_id in subtree:
+                moved = state.tasks[list_id][moved_id]
+                # The source list keeps a tombstone, so its delta syncs see the task leave.
+                state.tasks[list_id][moved_id] = tombstone = dict(moved, deleted=True)
+                state.touch(tombstone)
+                moved["selfLink"] = f"{self.url}tasks/v1/lists/{destination}/tasks/{moved_id}"
+                destination_tasks[moved_id] = moved
+                if (list_id, moved_id) in state.siblings:
+                    state.siblings[(destination, moved_id)] = state.siblings.pop((list_id, moved_id))
+                if moved_id != task_id:
+                    state.touch(moved)
+
+        if parent is None:
+            task.pop("parent", None)
+        else:
+            task["parent"] = parent
+        siblings = state.siblings.setdefault((destination, parent), [])
+        siblings.insert(siblings.index(previous) + 1 if previous else 0, task_id)
+        state.reposition(destination, parent)
+        state.touch(task)
+        return task
+
+    # ---- HTTP plumbing
+
+    def _dispatch_batch(self, content_type: str, body: bytes) -> Tuple[str, bytes]:
+        message = BytesParser().parsebytes(b"Content-Type: " + content_type.encode() + b"\r\n\r\n" + body)
+        boundary = "batch_" + hashlib.sha1(body).hexdigest()[:16]
+        parts = []
+        for part in message.get_payload():
+            self.count(batch_parts=1)
+            raw = part.get_payload(decode=True) or part.get_payload().encode()
+            request_line, rest = raw.split(b"\n", 1)
+            method, target = request_line.decode().split(" ")[:2]
+            head, _, inner_body = rest.replace(b"\r\n", b"\n").partition(b"\n\n")
+            inner_headers = BytesParser().parsebytes(head + b"\n\n")
+
+            status, payload = self.dispatch(method, target, inner_headers, inner_body.strip())
+            content_id = part["Content-ID"].strip("<>")
+            parts.append(
+                f"--{boundary}\r\n"
+                f"Content-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status} {'OK' if status < 300 else 'Error'}\r\n"
+                f"Content-Type: application/json; charset=UTF-8\r\n\r\n"
+                f"{'' if payload is None else json.dumps(payload)}\r\n"
+            )
+        parts.append(f"--{boundary}--\r\n")
+        return f'multipart/mixed; boundary="{boundary}"', "".join(parts).encode()
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; with Nagle on, every
+            # response would wait for the client's delayed ACK.
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _serve(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                server.count(requests=1, bytes_received=len(body))
+                if server.latency:
+                    time.sleep(server.latency)
+
+                failure = server._next_failure(server._failing_requests)
+                if failure is not None:
+                    status, retry_after = failure
+                    data = json.dumps(server._error(status)).encode()
+                    self.send_response(status)
+                    if retry_after is not None:
+                        self.send_header("Retry-After", str(retry_after))
+                    self.send_header("Content-Type", "application/json; charset=UTF-8")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                    return
+
+                if self.command == "POST" and urlsplit(self.path).path.rstrip("/") == "/batch":
+                    server.count(batches=1)
+                    status = 200
+                    content_type, data = server._dispatch_batch(self.headers["Content-Type"], body)
+                else:
+                    status, payload = server.dispatch(self.command, self.path, self.headers, body)
+                    content_type = "application/json; charset=UTF-8"
+                    data = b"" if payload is None else json.dumps(payload).encode()
+
+                server.count(bytes_sent=len(data))
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PATCH = do_PUT = do_DELETE = _serve
+
+        return Handler
@@ -1,12 +1,27 @@
+import itertools
 import os.path
+import threading
+import time
 
+from datetime import datetime, timezone
+
+import httplib2
+
+from google.auth.credentials import AnonymousCredentials
 from google.auth.transport.requests import Request
+from google_auth_httplib2 import AuthorizedHttp
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 
-from typing import Optional
-from gtasks.api.typing import TasksResponse, TaskListsResponse, Task, TaskList
+from typing import Callable, Iterator, List, Optional, Tuple
+from gtasks import tracing
+from gtasks.api import rate_limit
+from gtasks.api.cache import get_store
+from gtasks.api.http_pool import HttpPool, HTTP_POOL_SIZE, HTTP_TIMEOUT
+from gtasks.api.utils import parse_time
+from gtasks.api.typing import TasksResponse, TaskListsResponse, Task, TaskList, TaskSummary, TaskSummariesResponse
 
 # If modifying these scopes, delete the file token.json.
 SCOPES = [
@@ -14,59 +29,568 @@ SCOPES = [
     "https://www.googleapis.com/auth/tasks.readonly",
 ]
 
-creds = None
+# Root URL of the Tasks API. Point it at another deployment, such as the local
+# fake server, with GTASKS_API_ROOT or ``use_api_root``.
+DEFAULT_API_ROOT = "https://tasks.googleapis.com/"
 
-# The file token.json stores the user's access and refresh tokens, and is
-# created automatically when the authorization flow completes for the first
-# time.
-if os.path.exists("token.json"):
-    creds = Credentials.from_authorized_user_file("token.json", SCOPES)
+# Refresh the access token this many seconds before it expires, in the
+# background, so requests never wait on a refresh.
+TOKEN_REFRESH_MARGIN = 300
+TOKEN_REFRESH_RETRY = 60
 
-# If there are no (valid) credentials available, let the user log in.
-if not creds or not creds.valid:
-    if creds and creds.expired and creds.refresh_token:
-        creds.refresh(Request())
-    else:
-        flow = InstalledAppFlow.from_client_secrets_file("credentials.json", SCOPES)
-        creds = flow.run_local_server(port=12345)
-    # Save the credentials for the next run
+_init_lock = threading.Lock()
+_api_root: str = os.environ.get("GTASKS_API_ROOT", DEFAULT_API_ROOT)
+_creds: Optional[Credentials] = None
+_service = None
+_http_pool: Optional[HttpPool] = None
+_wrap_transport: Optional[Callable[[httplib2.Http], httplib2.Http]] = None
+
+
+def _save_credentials(creds: Credentials):
     with open("token.json", "w") as token:
         token.write(creds.to_json())
 
-service = build("tasks", "v1", credentials=creds)
+
+def _refresh_in_background(creds: Credentials):
+    try:
+        creds.refresh(Request())
+        _save_credentials(creds)
+        delay = None
+    except Exception:
+        # Requests still refresh on their own when the token expires.
+        delay = TOKEN_REFRESH_RETRY
+    _schedule_refresh(creds, delay)
+
+
+def _schedule_refresh(creds: Credentials, delay: Optional[float] = None):
+    if not getattr(creds, "refresh_token", None):
+        return
+
+    if delay is None:
+        if not creds.expiry:
+            return
+        # google-auth keeps expiry as a naive UTC datetime.
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        delay = max((creds.expiry - now).total_seconds() - TOKEN_REFRESH_MARGIN, 0)
+
+    timer = threading.Timer(delay, _refresh_in_background, args=(creds,))
+    timer.daemon = True
+    timer.start()
+
+
+def _load_credentials() -> Credentials:
+    creds = None
+
+    # The file token.json stores the user's access and refresh tokens, and is
+    # created automatically when the authorization flow completes for the first
+    # time.
+    if os.path.exists("token.json"):
+        creds = Credentials.from_authorized_user_file("token.json", SCOPES)
+
+    # If there are no (valid) credentials available, let the user log in.
+    if not creds or not creds.valid:
+        if creds and creds.expired and creds.refresh_token:
+            creds.refresh(Request())
+        else:
+            flow = InstalledAppFlow.from_client_secrets_file("credentials.json", SCOPES)
+            creds = flow.run_local_server(port=12345)
+        # Save the credentials for the next run
+        _save_credentials(creds)
+
+    return creds
+
+
+def get_api_root() -> str:
+    return _api_root
+
+
+def use_api_root(api_root: Optional[str] = None, credentials=None):
+    """
+    Point the module at another Tasks API deployment, e.g. ``FakeTasksServer``.
+
+    Anonymous credentials are used for any root other than Google's unless
+    ``credentials`` is given. Calling it without arguments switches back.
+
+    :param api_root: Root URL, e.g. ``http://127.0.0.1:8080/``.
+    :param credentials: Credentials to use instead.
+    """
+    global _api_root, _creds, _service, _http_pool
+
+    api_root = api_root or DEFAULT_API_ROOT
+    with _init_lock:
+        _api_root = api_root if api_root.endswith("/") else api_root + "/"
+        if credentials is None and _api_root != DEFAULT_API_ROOT:
+            credentials = AnonymousCredentials()
+        _creds = credentials
+        _service = None
+        _http_pool = None
+
+
+def use_transport(wrap: Optional[Callable[[httplib2.Http], httplib2.Http]] = None):
+    """
+    Wrap every HTTP transport made from now on, e.g. to record or replay the
+    exchanges (see ``gtasks.cassette``). Calling it without arguments switches back.
+
+    :param wrap: Takes an authorized transport and returns the one to use.
+    """
+    global _wrap_transport, _http_pool
+
+    with _init_lock:
+        _wrap_transport = wrap
+        _http_pool = None
+
+
+def _make_transport(credentials) -> httplib2.Http:
+    http = AuthorizedHttp(credentials, http=httplib2.Http(timeout=HTTP_TIMEOUT))
+    return _wrap_transport(http) if _wrap_transport is not None else http
+
+
+def get_credentials() -> Credentials:
+    """Credentials, loaded (and if needed, authorized) on first use."""
+    global _creds
+
+    if _creds is None:
+        with _init_lock:
+            if _creds is None:
+                creds = (
+                    _load_credentials() if _api_root == DEFAULT_API_ROOT else AnonymousCredentials()
+                )
+                _schedule_refresh(creds)
+                _creds = creds
+    return _creds
+
+
+def get_service():
+    """Tasks API service, built on first use from the bundled discovery document."""
+    global _service
+
+    if _service is None:
+        credentials = get_credentials()
+        with _init_lock:
+            if _service is None:
+                _service = build(
+                    "tasks",
+                    "v1",
+                    credentials=credentials,
+                    static_discovery=True,
+                    cache_discovery=False,
+                    client_options={"api_endpoint": _api_root},
+                )
+    return _service
+
+
+def get_http_pool() -> HttpPool:
+    """Pool of authorized HTTP transports shared by every thread."""
+    global _http_pool
+
+    if _http_pool is None:
+        credentials = get_credentials()
+        with _init_lock:
+            if _http_pool is None:
+                _http_pool = HttpPool(lambda: _make_transport(credentials), size=HTTP_POOL_SIZE)
+    return _http_pool
+
+
+def execute(request, cost: int = 1):
+    """
+    Execute an API request (or batch) on a transport checked out from the pool.
+
+    The service object itself is safe to share; only its transport is not.
+    Requests wait for the rate limiter and are retried on throttling, and on
+    server and transport errors if they are idempotent (see ``rate_limit``).
+
+    :param cost: Requests this counts as against the quota, e.g. the number
+        of calls in a batch.
+    """
+    limiter = rate_limit.get_limiter()
+    idempotent = _idempotent(request)
+    with tracing.span(getattr(request, "methodId", None) or "batch", "api") as span:
+        if span is not None:
+            _measure(request, span)
+        for attempt in itertools.count():
+            waited = limiter.acquire(cost)
+            if span is not None and waited:
+                span.attributes["queue_ms"] = span.attributes.get("queue_ms", 0) + round(waited * 1000, 1)
+            try:
+                with get_http_pool().checkout() as http:
+                    return request.execute(http=http)
+            except HttpError as error:
+                if rate_limit.is_repeated_delete(getattr(request, "method", ""), error.resp.status, attempt):
+                    return {}
+                delay = limiter.retry_delay(
+                    attempt,
+                    error.resp.status,
+                    error.content,
+                    rate_limit.retry_after(error.resp.get("retry-after")),
+                    idempotent=idempotent,
+                )
+                if delay is None:
+                    raise
+            except (ConnectionError, TimeoutError):
+                delay = limiter.retry_delay(attempt, None, idempotent=idempotent)
+                if delay is None:
+                    raise
+            if span is not None:
+                span.attributes["retries"] = attempt + 1
+            time.sleep(delay)
+
+
+def _idempotent(request) -> bool:
+    """Whether ``request`` may be sent twice; a batch only if all its calls may."""
+    calls = getattr(request, "_requests", None)
+    if calls is not None:
+        # Nor if it deletes: the 404 of a repeated DELETE in a batch cannot be told from a real one.
+        return all(_idempotent(call) and call.method != "DELETE" for call in calls.values())
+    return rate_limit.is_idempotent(request.method, request.headers)
+
+
+def _measure(request, span):
+    """Record request and response sizes of ``request`` on ``span``."""
+    span.attributes["request_bytes"] = len(getattr(request, "body", None) or "")
+    postproc = getattr(request, "postproc", None)
+    if postproc is None:
+        return
+
+    def measured(resp, content):
+        span.attributes.update(response_bytes=len(content or b""), status=resp.status)
+        return postproc(resp, content)
+
+    request.postproc = measured
+
+
+# Largest page the Tasks API accepts for tasks.list and tasklists.list.
+MAX_PAGE_SIZE = 100
+
+# Cached reads younger than this many seconds are served without a delta sync.
+SYNC_MAX_AGE = 10.0
+
+
+# Partial responses (``fields=``) of tasks.list. Syncs leave out what the store
+# never reads (kind, selfLink, links, webViewLink); queries only ask for what
+# a ``TaskSummary`` holds.
+SYNC_FIELDS = "etag,nextPageToken,items(id,etag,title,updated,parent,position,notes,status,due,completed,deleted,hidden)"
+SUMMARY_FIELDS = "nextPageToken,items(id,title,parent,position,notes,status,due,completed)"
+
+# Task fields a PATCH changes. The parent and position change with tasks.move.
+PATCH_FIELDS = ("title", "notes", "status", "due", "completed", "deleted")
+
+# Conditional PATCHes failing because the task changed meanwhile are retried
+# this many times, each against a freshly fetched copy.
+MAX_CONFLICT_RETRIES = 2
+
+
+def _task_list_request(task_list_id: str):
+    return get_service().tasklists().get(tasklist=task_list_id)
+
+
+def _tasks_request(task_list_id, **params):
+    return get_service().tasks().list(tasklist=task_list_id, **params)
+
+
+def patch_body(task, base: Optional[Task] = None) -> dict:
+    """
+    Body of a PATCH applying ``task`` to the task.
+
+    Only fields set on ``task`` are sent, and, given the last known server
+    copy ``base``, only those that differ from it.
+
+    :param task: Task model with the wanted fields set.
+    :param base: Last known server copy of the task.
+    """
+    wanted = task.model_dump(mode="json", exclude_unset=True, exclude_none=True, include=set(PATCH_FIELDS))
+    if base is None:
+        return wanted
+    current = base.model_dump(mode="json", include=set(PATCH_FIELDS))
+    return {key: value for key, value in wanted.items() if current.get(key) != value}
+
+
+def _conditional_patch(task, base: Optional[Task] = None) -> Tuple[dict, Optional[str]]:
+    """
+    Body and ``If-Match`` etag of the PATCH applying ``task`` over ``base``.
+
+    The stored ``base`` may be stale, so a patch is sent even when it matches
+    ``task``: its etag then checks that the server still agrees. Without an
+    etag to check, every wanted field is sent again instead.
+    """
+    if base is None or not base.etag:
+        return patch_body(task), None
+    return patch_body(task, base), base.etag
+
+
+def _patch_request(task_list_id: Optional[str], task, base: Optional[Task] = None):
+    body, etag = _conditional_patch(task, base)
+    request = get_service().tasks().patch(tasklist=task_list_id, task=task.id, body=body)
+    if etag:
+        # Fails with 412 if the task changed since ``base`` was read.
+        request.headers["If-Match"] = etag
+    return request
+
+
+def _upsert_request(task_list_id: Optional[str], task: Task, previous: Optional[str] = None):
+    if task.id:
+        base = get_store().get_task(task_list_id, task.id) if task_list_id else None
+        return _patch_request(task_list_id, task, base)
+    # The API takes the position of a new task from the query, not the body.
+    return get_service().tasks().insert(
+        tasklist=task_list_id, parent=task.parent, previous=previous, body=task.model_dump(exclude_none=True)
+    )
+
+
+def _move_request(
+    task_list_id: str,
+    task_id: str,
+    parent: Optional[str] = None,
+    previous: Optional[str] = None,
+    destination_task_list_id: Optional[str] = None,
+):
+    return get_service().tasks().move(
+        tasklist=task_list_id,
+        task=task_id,
+        parent=parent,
+        previous=previous,
+        destinationTasklist=destination_task_list_id,
+    )
+
+
+def _delete_request(task_list_id: str, task_id: str):
+    return get_service().tasks().delete(tasklist=task_list_id, task=task_id)
+
+
+def get_task(task_list_id: str, task_id: str) -> Task:
+    """Fetch a single task, and refresh its stored copy."""
+    task = Task(**execute(get_service().tasks().get(tasklist=task_list_id, task=task_id)))
+    get_store().put_task(task_list_id, task)
+    return task
 
 
 def get_task_list(task_list_id: str) -> TaskList:
-    return TaskList(**(service.tasklists().get(tasklist=task_list_id).execute()))
+    task_list = TaskList(**execute(_task_list_request(task_list_id)))
+    get_store().put_task_list(task_list)
+    return task_list
 
 
-def get_task_lists(max_results=5) -> TaskListsResponse:
-    return TaskListsResponse(
-        **(
-            service.tasklists()
+def get_task_lists(max_results=5, page_token: Optional[str] = None) -> TaskListsResponse:
+    response = TaskListsResponse(
+        **execute(
+            get_service()
+            .tasklists()
             .list(
                 maxResults=max_results,
+                pageToken=page_token,
             )
-            .execute()
         )
     )
+    for task_list in response.items or []:
+        get_store().put_task_list(task_list)
+    return response
 
 
-def get_tasks(task_list_id, showCompleted=False, showDeleted=False) -> TasksResponse:
+def iter_task_lists(page_size: int = MAX_PAGE_SIZE) -> Iterator[TaskList]:
+    """
+    Iterate over all task lists, fetching one page at a time.
+
+    :param page_size: Task lists per request, at most ``MAX_PAGE_SIZE``.
+    """
+    page_token = None
+    while True:
+        response = get_task_lists(max_results=min(page_size, MAX_PAGE_SIZE), page_token=page_token)
+        yield from response.items or []
+
+        page_token = response.nextPageToken
+        if not page_token:
+            return
+
+
+def get_tasks(
+    task_list_id,
+    showCompleted=False,
+    showDeleted=False,
+    showHidden=False,
+    updatedMin: Optional[str] = None,
+    max_results: Optional[int] = None,
+    page_token: Optional[str] = None,
+    dueMin: Optional[str] = None,
+    dueMax: Optional[str] = None,
+    completedMin: Optional[str] = None,
+    completedMax: Optional[str] = None,
+    fields: Optional[str] = None,
+) -> TasksResponse:
     return TasksResponse(
-        **(
-            service.tasks()
-            .list(
-                tasklist=task_list_id,
+        **execute(
+            _tasks_request(
+                task_list_id,
                 showCompleted=showCompleted,
                 showDeleted=showDeleted,
+                showHidden=showHidden,
+                updatedMin=updatedMin,
+                maxResults=max_results,
+                pageToken=page_token,
+                dueMin=dueMin,
+                dueMax=dueMax,
+                completedMin=completedMin,
+                completedMax=completedMax,
+                fields=fields,
             )
-            .execute()
         )
     )
 
 
-def upsert_task(task_list_id: Optional[str], task: Task) -> Task:
+def as_rfc3339(value: Optional[str]) -> Optional[str]:
+    """``value`` as the RFC 3339 timestamp the API's time filters expect. Plain dates are taken as midnight UTC."""
+    parsed = parse_time(value)
+    return None if parsed is None else parsed.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def query_params(
+    showCompleted: bool = False,
+    dueMin: Optional[str] = None,
+    dueMax: Optional[str] = None,
+    completedMin: Optional[str] = None,
+    completedMax: Optional[str] = None,
+    updatedMin: Optional[str] = None,
+) -> dict:
+    """
+    ``tasks.list`` parameters of a filtered query, with the times normalized.
+
+    Completion filters only match completed tasks, so they turn on ``showCompleted``.
+    """
+    return dict(
+        showCompleted=showCompleted or bool(completedMin or completedMax),
+        showHidden=bool(completedMin or completedMax),
+        dueMin=as_rfc3339(dueMin),
+        dueMax=as_rfc3339(dueMax),
+        completedMin=as_rfc3339(completedMin),
+        completedMax=as_rfc3339(completedMax),
+        updatedMin=as_rfc3339(updatedMin),
+    )
+
+
+def query_tasks(task_list_id: str, fields: str = SUMMARY_FIELDS, **filters) -> List[TaskSummary]:
+    """
+    Tasks of a list matching time filters, filtered by the server and read
+    from partial responses.
+
+    Nothing is written to the store: the summaries lack the fields it keeps.
+
+    :param task_list_id: Task list ID.
+    :param fields: Partial-response mask. See ``SUMMARY_FIELDS``.
+    :param filters: Keyword arguments for ``query_params``, e.g. ``dueMax="2026-10-24"``.
+    """
+    params = query_params(**filters)
+    summaries: List[TaskSummary] = []
+    page_token = None
+    while True:
+        response = TaskSummariesResponse(
+            **execute(_tasks_request(task_list_id, maxResults=MAX_PAGE_SIZE, pageToken=page_token, fields=fields, **params))
+        )
+        summaries.extend(response.items or [])
+        page_token = response.nextPageToken
+        if not page_token:
+            return summaries
+
+
+def iter_task_pages(task_list_id, page_size: int = MAX_PAGE_SIZE, **filters) -> Iterator[TasksResponse]:
+    """
+    Iterate over the pages of a task listing, following ``nextPageToken``.
+
+    :param task_list_id: Task list ID.
+    :param page_size: Tasks per request, at most ``MAX_PAGE_SIZE``.
+    :param filters: Extra keyword arguments for ``get_tasks``.
+    """
+    page_token = None
+    while True:
+        response = get_tasks(
+            task_list_id,
+            max_results=min(page_size, MAX_PAGE_SIZE),
+            page_token=page_token,
+            **filters,
+        )
+        yield response
+
+        page_token = response.nextPageToken
+        if not page_token:
+            return
+
+
+def iter_tasks(task_list_id, page_size: int = MAX_PAGE_SIZE, **filters) -> Iterator[Task]:
+    """Iterate over all tasks of a list. See ``iter_task_pages``."""
+    for page in iter_task_pages(task_list_id, page_size=page_size, **filters):
+        yield from page.items or []
+
+
+def sync_params(task_list_id: str, max_age: Optional[float] = SYNC_MAX_AGE) -> Optional[dict]:
+    """
+    Parameters for the ``tasks.list`` call that brings a list's local copy up
+    to date, or None if the copy is fresh enough.
+
+    :param task_list_id: Task list ID.
+    :param max_age: See ``sync_tasks``.
+    """
+    state = get_store().get_sync_state(task_list_id)
+    if state and (max_age is None or state[2] + max_age > datetime.now(timezone.utc).timestamp()):
+        return None
+
+    return dict(
+        showCompleted=True,
+        showDeleted=True,
+        showHidden=True,
+        updatedMin=state[1] if state else None,
+        fields=SYNC_FIELDS,
+    )
+
+
+def sync_tasks(task_list_id: str, max_age: Optional[float] = SYNC_MAX_AGE) -> bool:
+    """
+    Bring the local copy of a task list up to date.
+
+    The first sync downloads the whole list. Later syncs only ask for tasks
+    changed since the previous one, including deleted and hidden tasks so that
+    removals reach the store too.
+
+    :param task_list_id: Task list ID.
+    :param max_age: Skip the request if the last sync is younger than this many
+        seconds. None skips it whenever the list has been synced before.
+    :return: True if a request was made.
+    """
+    params = sync_params(task_list_id, max_age=max_age)
+    if params is None:
+        return False
+
+    store = get_store()
+    started_at = datetime.now(timezone.utc)
+    etag = None
+    for page in iter_task_pages(task_list_id, **params):
+        etag = etag or page.etag
+        store.apply_changes(task_list_id, page.items or [])
+    store.mark_synced(task_list_id, etag, started_at)
+    return True
+
+
+def get_cached_task_list(task_list_id: str) -> TaskList:
+    return get_store().get_task_list(task_list_id) or get_task_list(task_list_id)
+
+
+def get_cached_tasks(
+    task_list_id: str, showCompleted=False, max_age: Optional[float] = SYNC_MAX_AGE
+) -> TasksResponse:
+    """
+    Same as ``get_tasks`` but served from the local store after a delta sync.
+
+    :param task_list_id: Task list ID.
+    :param showCompleted: Include completed tasks.
+    :param max_age: See ``sync_tasks``.
+    :return: Tasks response built from the store.
+    """
+    sync_tasks(task_list_id, max_age=max_age)
+    store = get_store()
+    return TasksResponse(
+        kind="tasks#tasks",
+        etag=store.get_sync_state(task_list_id)[0] or "",
+        items=store.get_tasks(task_list_id, show_completed=showCompleted),
+    )
+
+
+def upsert_task(task_list_id: Optional[str], task: Task, previous: Optional[str] = None) -> Task:
     """
     Insert or update a task in the task list.
 
@@ -75,22 +599,103 @@ def upsert_task(task_list_id: Optional[str], task: Task) -> Task:
 
     :param task_list_id: Task list ID.
     :param task: Task object.
+    :param previous: For a new task, the sibling to place it after. None places it first.
     :return: Task object.
     """
 
     if task.id:
-        return Task(
-            **(
-                service.tasks()
-                .patch(tasklist=task_list_id, task=task.id, body=task.model_dump(exclude_none=True))
-                .execute()
-            )
-        )
+        result = _patch_task(task_list_id, task)
     else:
-        return Task(
-            **(
-                service.tasks()
-                .insert(tasklist=task_list_id, body=task.model_dump(exclude_none=True))
-                .execute()
-            )
-        )
+        result = Task(**execute(_upsert_request(task_list_id, task, previous)))
+
+    # Write-through, so the next cached read sees the change without a sync.
+    if task_list_id:
+        get_store().put_task(task_list_id, result)
+    return result
+
+
+def _patch_task(task_list_id: Optional[str], task, stale: bool = False) -> Task:
+    """
+    PATCH the fields of ``task`` that differ from the stored copy.
+
+    The request is conditional on the stored copy's etag, and sent even if
+    nothing differs. If the task changed on the server since, it is fetched
+    again and the diff is retried against it.
+
+    :param stale: The stored copy is known to be outdated, e.g. after a 412
+        from a batch: fetch it before the first attempt.
+    """
+    store = get_store()
+    if stale:
+        get_task(task_list_id, task.id)
+    for attempt in range(MAX_CONFLICT_RETRIES + 1):
+        base = store.get_task(task_list_id, task.id) if task_list_id else None
+        try:
+            return Task(**execute(_patch_request(task_list_id, task, base)))
+        except HttpError as error:
+            if error.resp.status != 412 or attempt == MAX_CONFLICT_RETRIES:
+                raise
+        get_task(task_list_id, task.id)
+
+
+def _subtree_tombstones(task_list_id: str, task_id: str) -> List[Task]:
+    """Deleted markers for a stored task and its stored subtasks."""
+    children = {}
+    for task in get_store().get_tasks(task_list_id, show_completed=True, show_hidden=True):
+        children.setdefault(task.parent, []).append(task.id)
+
+    tombstones, pending = [], [task_id]
+    while pending:
+        current = pending.pop()
+        # Only id and deleted are read from a tombstone.
+        tombstones.append(Task.model_construct(id=current, deleted=True))
+        pending.extend(children.get(current, []))
+    return tombstones
+
+
+def _store_move(task_list_id: str, task_id: str, result: Task, destination_task_list_id: Optional[str] = None):
+    """Write a moved task through to the store."""
+    store = get_store()
+    if destination_task_list_id and destination_task_list_id != task_list_id:
+        # Subtasks move along; the destination's next read syncs them.
+        store.apply_changes(task_list_id, _subtree_tombstones(task_list_id, task_id))
+        store.expire(destination_task_list_id)
+    store.put_task(destination_task_list_id or task_list_id, result)
+
+
+def _store_delete(task_list_id: str, task_id: str):
+    """Remove a deleted task, and its subtasks with it, from the store."""
+    get_store().apply_changes(task_list_id, _subtree_tombstones(task_list_id, task_id))
+
+
+def move_task(
+    task_list_id: str,
+    task_id: str,
+    parent: Optional[str] = None,
+    previous: Optional[str] = None,
+    destination_task_list_id: Optional[str] = None,
+) -> Task:
+    """
+    Move a task under another parent, after another sibling, or to another list.
+
+    :param task_list_id: Task list ID the task is in.
+    :param task_id: Task ID.
+    :param parent: New parent task ID. None moves the task to the top level.
+    :param previous: Sibling to place the task after. None places it first.
+    :param destination_task_list_id: Task list to move the task to, if not its own.
+    :return: The moved task.
+    """
+    result = Task(**execute(_move_request(task_list_id, task_id, parent, previous, destination_task_list_id)))
+    _store_move(task_list_id, task_id, result, destination_task_list_id)
+    return result
+
+
+def delete_task(task_list_id: str, task_id: str):
+    """
+    Delete a task, and its subtasks with it.
+
+    :param task_list_id: Task list ID.
+    :param task_id: Task ID.
+    """
+    execute(_delete_request(task_list_id, task_id))
+    _store_delete(task_list_id, task_id)
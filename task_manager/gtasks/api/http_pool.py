@@ -0,0 +1,64 @@
+import os
+import queue
+import threading
+
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+import httplib2
+
+# Maximum number of HTTP transports, i.e. of Tasks API requests in flight at once.
+HTTP_POOL_SIZE = int(os.environ.get("GTASKS_HTTP_POOL_SIZE", 8))
+HTTP_TIMEOUT = 30
+
+
+class HttpPool:
+    """
+    Pool of HTTP transports for concurrent use of the Tasks API.
+
+    ``httplib2.Http`` is not thread-safe, so every request checks out a
+    transport for its own use. Transports are created lazily up to ``size``;
+    past that, callers wait for one to be returned.
+    """
+
+    def __init__(self, factory: Callable[[], httplib2.Http], size: int = HTTP_POOL_SIZE):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1.")
+        self._factory = factory
+        self._size = size
+        self._created = 0
+        self._lock = threading.Lock()
+        # LIFO keeps the most recently used connections warm.
+        self._idle: "queue.LifoQueue[httplib2.Http]" = queue.LifoQueue()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def _acquire(self) -> httplib2.Http:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            create = self._created < self._size
+            if create:
+                self._created += 1
+
+        if create:
+            try:
+                return self._factory()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        return self._idle.get()
+
+    @contextmanager
+    def checkout(self) -> Iterator[httplib2.Http]:
+        http = self._acquire()
+        try:
+            yield http
+        finally:
+            self._idle.put(http)
@@ -0,0 +1,308 @@
+"""
+Client-side quota for the Tasks API, shared by every thread and event loop.
+
+Every request takes a token from the project bucket and from the bucket of the
+user it runs for (``as_user``), waiting when either is empty. Throttled (429,
+rate limit 403 and 503) requests are retried with exponential backoff and full
+jitter, never sooner than ``Retry-After``. So are failed ones (5xx, transport
+errors), but only when sending them twice is harmless: a timed out insert may
+well have been committed. A retried DELETE answered with 404 counts as done,
+as an earlier attempt must have gone through. A throttled response also pauses
+the buckets, so other callers back off too instead of spending quota on
+requests that would be refused.
+"""
+
+import asyncio
+import contextvars
+import os
+import random
+import threading
+import time
+
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterator, Optional
+
+# Requests per second for the whole process, and for each user. 0 turns the
+# limit off. Bursts of up to PROJECT_BURST and USER_BURST requests go out at once.
+PROJECT_QPS = float(os.environ.get("GTASKS_PROJECT_QPS", 50))
+USER_QPS = float(os.environ.get("GTASKS_USER_QPS", 10))
+PROJECT_BURST = 100
+USER_BURST = 20
+
+# Retries of one request, and the backoff before them: a random delay of up
+# to BACKOFF_BASE * 2 ** attempt seconds, capped at BACKOFF_MAX.
+MAX_RETRIES = 5
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 32.0
+
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+# Methods safe to retry after a failure that may have been applied. PATCH only
+# counts when conditional: a repeat of an applied one is refused with 412.
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "PUT", "DELETE"})
+# Google reports some quota errors as 403 with one of these reasons.
+RATE_LIMIT_REASONS = ("ratelimitexceeded", "userratelimitexceeded", "quotaexceeded")
+
+DEFAULT_USER = "default"
+
+# Users with a bucket of their own, least recently seen dropped first. Full
+# buckets go as soon as another user comes: a new one would be the same.
+MAX_USER_BUCKETS = 10000
+
+_user: contextvars.ContextVar[str] = contextvars.ContextVar("gtasks_quota_user", default=DEFAULT_USER)
+
+
+@contextmanager
+def as_user(user: str) -> Iterator[None]:
+    """Charge the Tasks API requests made inside the block to ``user``'s budget."""
+    token = _user.set(user)
+    try:
+        yield
+    finally:
+        _user.reset(token)
+
+
+def retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a ``Retry-After`` header, in seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max((parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _text(content) -> str:
+    return (content.decode(errors="replace") if isinstance(content, bytes) else str(content or "")).lower()
+
+
+def is_throttled(status: Optional[int], content=b"") -> bool:
+    """True for responses refusing a request for quota reasons."""
+    if status == 429:
+        return True
+    return status in (403, 503) and any(reason in _text(content) for reason in RATE_LIMIT_REASONS)
+
+
+def is_idempotent(method: str, headers: Optional[dict] = None) -> bool:
+    """True for requests that change nothing more when sent twice."""
+    method = method.upper()
+    if method == "PATCH":
+        return any(key.lower() == "if-match" for key in headers or {})
+    return method in IDEMPOTENT_METHODS
+
+
+def is_repeated_delete(method: str, status: Optional[int], attempt: int) -> bool:
+    """True for a 404 answering a retried DELETE: an earlier attempt deleted it."""
+    return attempt > 0 and status == 404 and method.upper() == "DELETE"
+
+
+class TokenBucket:
+    """
+    Token bucket refilled at ``rate`` tokens per second, holding at most ``capacity``.
+
+    Tokens are reserved, not waited for: the balance may go negative, and each
+    caller waits until its own reservation is covered. Callers are therefore
+    served in arrival order without a queue.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, cost: float = 1.0) -> float:
+        """Take ``cost`` tokens and return the seconds to wait before using them."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= cost
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def is_full(self) -> bool:
+        """True once refilled to capacity, i.e. in the state of a new bucket."""
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens >= self.capacity
+
+    def pause(self, seconds: float):
+        """Hand out no tokens for the next ``seconds``, but one for the retry after them."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, 1 - seconds * self.rate)
+
+
+class RateLimiter:
+    """
+    Project and per-user token buckets, with the retry policy and its metrics.
+
+    :param project_qps: Requests per second for the process, 0 for no limit.
+    :param user_qps: Requests per second for each user, 0 for no limit.
+    """
+
+    def __init__(
+        self,
+        project_qps: float = PROJECT_QPS,
+        user_qps: float = USER_QPS,
+        project_burst: float = PROJECT_BURST,
+        user_burst: float = USER_BURST,
+        max_retries: int = MAX_RETRIES,
+    ):
+        self.project = TokenBucket(project_qps, project_burst) if project_qps > 0 else None
+        self.user_qps = user_qps
+        self.user_burst = user_burst
+        self.max_retries = max_retries
+        self.stats = Counter()
+        self.waiting = 0
+        self.max_wait = 0.0
+        self._users: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _user_bucket(self, user: str) -> Optional[TokenBucket]:
+        if self.user_qps <= 0:
+            return None
+        with self._lock:
+            bucket = self._users.get(user)
+            if bucket is not None:
+                self._users.move_to_end(user)
+                return bucket
+            # Serve sessions come and go; their buckets must not pile up.
+            while self._users and (len(self._users) >= MAX_USER_BUCKETS or next(iter(self._users.values())).is_full()):
+                self._users.popitem(last=False)
+                self.stats["user_buckets_dropped"] += 1
+            bucket = self._users[user] = TokenBucket(self.user_qps, self.user_burst)
+        return bucket
+
+    def reserve(self, cost: float = 1.0, user: Optional[str] = None) -> float:
+        """Reserve ``cost`` requests from both budgets and return the seconds to wait."""
+        buckets = [self.project, self._user_bucket(user or _user.get())]
+        delay = max([bucket.reserve(cost) for bucket in buckets if bucket is not None], default=0.0)
+        with self._lock:
+            self.stats["requests"] += cost
+            if delay > 0:
+                self.stats["queued"] += 1
+                self.stats["queue_wait_s"] += delay
+                self.max_wait = max(self.max_wait, delay)
+        return delay
+
+    def acquire(self, cost: float = 1.0, user: Optional[str] = None) -> float:
+        """Wait until ``cost`` requests may go out. Returns the seconds waited."""
+        delay = self.reserve(cost, user)
+        if delay > 0:
+            self._wait_started()
+            try:
+                time.sleep(delay)
+            finally:
+                self._wait_ended()
+        return delay
+
+    async def aacquire(self, cost: float = 1.0, user: Optional[str] = None) -> float:
+        """Async ``acquire``: waits without blocking the event loop."""
+        delay = self.reserve(cost, user)
+        if delay > 0:
+            self._wait_started()
+            try:
+                await asyncio.sleep(delay)
+            finally:
+                self._wait_ended()
+        return delay
+
+    def _wait_started(self):
+        with self._lock:
+            self.waiting += 1
+
+    def _wait_ended(self):
+        with self._lock:
+            self.waiting -= 1
+
+    def retry_delay(
+        self,
+        attempt: int,
+        status: Optional[int],
+        content=b"",
+        retry_after: Optional[float] = None,
+        user: Optional[str] = None,
+        idempotent: bool = True,
+    ) -> Optional[float]:
+        """
+        Seconds to wait before retrying a failed request, or None to give up.
+
+        :param attempt: Retries already made, 0 after the first failure.
+        :param status: HTTP status, None for a transport error.
+        :param content: Response body, to tell rate limit 403s from others.
+        :param retry_after: Parsed ``Retry-After`` header, if any.
+        :param idempotent: Whether the request may be sent twice (see
+            ``is_idempotent``). Others are only retried when throttled, as
+            the server then did not process them.
+        """
+        throttled = is_throttled(status, content)
+        if not throttled and status is not None and status not in RETRYABLE_STATUSES:
+            return None
+        if not throttled and not idempotent:
+            with self._lock:
+                self.stats["unsafe_to_retry"] += 1
+            return None
+
+        with self._lock:
+            if throttled:
+                self.stats["throttled"] += 1
+            elif status is None:
+                self.stats["transport_errors"] += 1
+            else:
+                self.stats["server_errors"] += 1
+            if attempt >= self.max_retries:
+                self.stats["exhausted"] += 1
+                return None
+            self.stats["retries"] += 1
+
+        delay = max(random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt)), retry_after or 0.0)
+        if throttled:
+            # A user-level refusal only concerns that user; anything else the whole project.
+            user_bucket = self._user_bucket(user or _user.get())
+            buckets = [user_bucket] if "userratelimitexceeded" in _text(content) else [self.project, user_bucket]
+            for bucket in buckets:
+                if bucket is not None:
+                    bucket.pause(delay)
+        return delay
+
+    def metrics(self) -> dict:
+        return {
+            **self.stats,
+            "queue_wait_s": round(self.stats["queue_wait_s"], 3),
+            "max_queue_wait_ms": round(self.max_wait * 1000, 1),
+            "waiting": self.waiting,
+            "users": len(self._users),
+        }
+
+
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter() -> RateLimiter:
+    """Limiter shared by every request of the process."""
+    global _limiter
+
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter()
+    return _limiter
+
+
+def set_limiter(limiter: Optional[RateLimiter] = None):
+    """Replace the shared limiter, e.g. with other budgets. None resets it to the defaults."""
+    global _limiter
+
+    with _limiter_lock:
+        _limiter = limiter
@@ -0,0 +1,198 @@
+import heapq
+import re
+import threading
+import unicodedata
+
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from pydantic import BaseModel
+
+from gtasks.api.cache import TaskStore, get_store
+from gtasks.api.typing import Task, TaskStatus
+
+# Notes count for less than titles when ranking.
+TITLE_WEIGHT = 1.0
+NOTES_WEIGHT = 0.4
+
+# Matches covering less than this share of the query's trigrams are noise.
+MIN_SCORE = 0.35
+
+# Turkish dotted/dotless i do not round-trip through str.lower(): "İ" becomes
+# "i" plus a combining dot and "I" becomes "i" instead of "ı". Map them first,
+# then fold every i to the same letter so that "ISIK", "ışık" and "isik" match.
+_TURKISH_UPPER = str.maketrans({"I": "ı", "İ": "i"})
+_FOLD = str.maketrans({"ı": "i", "ß": "ss"})
+
+_WORD = re.compile(r"\w+")
+
+_Key = Tuple[str, str]
+
+
+def fold(text: str) -> str:
+    """Lowercase ``text`` the Turkish way and strip diacritics (``Çiçek`` -> ``cicek``)."""
+    text = unicodedata.normalize("NFKD", text.translate(_TURKISH_UPPER).lower())
+    return "".join(char for char in text if not unicodedata.combining(char)).translate(_FOLD)
+
+
+def trigrams(text: str) -> Set[str]:
+    """Trigrams of the folded words of ``text``, padded so that short words and word edges count."""
+    grams = set()
+    for word in _WORD.findall(fold(text)):
+        padded = f" {word} "
+        grams.update(padded[index:index + 3] for index in range(len(padded) - 2))
+    return grams
+
+
+class SearchHit(BaseModel):
+    """A task matching a search, with the list it belongs to."""
+
+    task_list_id: str
+    task: Task
+    score: float
+
+
+class TaskIndex:
+    """
+    In-memory trigram index over task titles and notes, across lists.
+
+    The index is derived from the ``TaskStore`` and refreshed per list, only
+    for lists the store has written to since they were last indexed.
+    """
+
+    def __init__(self, store: Optional[TaskStore] = None):
+        self._store = store
+        self._lock = threading.Lock()
+        # trigram -> {(list id, task id): weight}
+        self._postings: Dict[str, Dict[_Key, float]] = defaultdict(dict)
+        self._tasks: Dict[_Key, Task] = {}
+        self._grams: Dict[_Key, Set[str]] = {}
+        self._titles: Dict[_Key, str] = {}
+        self._keys: Dict[str, Set[_Key]] = defaultdict(set)
+        # list id -> store version the list was indexed at
+        self._indexed: Dict[str, int] = {}
+        self._indexed_store: Optional[TaskStore] = None
+
+    @property
+    def store(self) -> TaskStore:
+        return self._store or get_store()
+
+    def refresh(self, task_list_ids: Iterable[str]):
+        """Re-index the lists that changed in the store."""
+        store = self.store
+        with self._lock:
+            if store is not self._indexed_store:
+                self._clear()
+                self._indexed_store = store
+            for task_list_id in task_list_ids:
+                version = store.version(task_list_id)
+                if self._indexed.get(task_list_id) == version:
+                    continue
+                self._drop_list(task_list_id)
+                for task in store.get_tasks(task_list_id, show_completed=True):
+                    self._add(task_list_id, task)
+                self._indexed[task_list_id] = version
+
+    def _clear(self):
+        self._postings.clear()
+        self._tasks.clear()
+        self._grams.clear()
+        self._titles.clear()
+        self._keys.clear()
+        self._indexed.clear()
+
+    def _drop_list(self, task_list_id: str):
+        for key in self._keys.pop(task_list_id, ()):
+            for gram in self._grams.pop(key):
+                postings = self._postings[gram]
+                postings.pop(key, None)
+                if not postings:
+                    del self._postings[gram]
+            del self._tasks[key]
+            del self._titles[key]
+
+    def _add(self, task_list_id: str, task: Task):
+        key = (task_list_id, task.id)
+        weights = {gram: NOTES_WEIGHT for gram in trigrams(task.notes or "")}
+        weights.update((gram, TITLE_WEIGHT) for gram in trigrams(task.title or ""))
+        for gram, weight in weights.items():
+            self._postings[gram][key] = weight
+        self._tasks[key] = task
+        self._grams[key] = set(weights)
+        self._titles[key] = fold(task.title or "")
+        self._keys[task_list_id].add(key)
+
+    def search(
+        self,
+        query: str,
+        task_list_ids: Optional[Iterable[str]] = None,
+        limit: int = 5,
+        include_completed: bool = False,
+    ) -> List[SearchHit]:
+        """
+        Rank indexed tasks by how much of ``query`` they contain.
+
+        The score is the weighted share of the query's trigrams found in the
+        task, so typos and inflected words ("kumunu" for "kumu") still match.
+        Ties go to the task with the shorter title.
+
+        :param query: Free text.
+        :param task_list_ids: Only search these lists. All indexed lists if None.
+        :param limit: Maximum number of hits.
+        :param include_completed: Also return completed tasks.
+        """
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+        lists = set(task_list_ids) if task_list_ids is not None else None
+        folded_query = fold(query).strip()
+
+        with self._lock:
+            scores: Dict[_Key, float] = defaultdict(float)
+            for gram in query_grams:
+                for key, weight in self._postings.get(gram, {}).items():
+                    scores[key] += weight
+
+            ranked = []
+            for key, score in scores.items():
+                score /= len(query_grams)
+                if score < MIN_SCORE or (lists is not None and key[0] not in lists):
+                    continue
+                task = self._tasks[key]
+                if not include_completed and task.status == TaskStatus.completed:
+                    continue
+                title = self._titles[key]
+                if folded_query and folded_query in title:
+                    score += 0.5 if title.strip() == folded_query else 0.25
+                ranked.append((score, -len(title), key))
+
+            best = heapq.nlargest(limit, ranked)
+            return [
+                SearchHit(task_list_id=key[0], task=self._tasks[key], score=round(score, 3))
+                for score, _, key in best
+            ]
+
+
+@lru_cache(maxsize=None)
+def get_index() -> TaskIndex:
+    """Shared index over the shared store."""
+    return TaskIndex()
+
+
+def search_tasks(
+    query: str,
+    task_list_ids: Iterable[str],
+    limit: int = 5,
+    include_completed: bool = False,
+) -> List[SearchHit]:
+    """
+    Search the locally stored tasks of the given lists.
+
+    Lists are searched as stored; bring them up to date first with
+    ``sync_task_lists``.
+    """
+    task_list_ids = list(task_list_ids)
+    index = get_index()
+    index.refresh(task_list_ids)
+    return index.search(query, task_list_ids, limit=limit, include_completed=include_completed)
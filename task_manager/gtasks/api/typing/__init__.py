@@ -1,2 +1,2 @@
-from .types import Task, TaskStatus, TaskLink, TasksResponse
+from .types import Task, TaskStatus, TaskLink, TasksResponse, TaskSummary, TaskSummariesResponse
 from .types import TaskList, TaskListsResponse
\ No newline at end of file
@@ -16,12 +16,13 @@ class TaskLink(BaseModel):
     link: str = Field(..., description="URL.")
 
 class Task(BaseModel):
-    kind: str = Field(..., description="Type of the resource. This is always 'tasks#task'.")
+    # kind and selfLink are left out of the partial responses of syncs.
+    kind: Optional[str] = Field(None, description="Type of the resource. This is always 'tasks#task'.")
     id: str = Field(..., description="Task identifier.")
     etag: str = Field(..., description="ETag of the resource.")
     title: Optional[str] = Field(None, description="Title of the task.")
     updated: str = Field(..., description="Last modification time of the task (as a RFC 3339 timestamp).")
-    selfLink: str = Field(..., description="URL pointing to this task.")
+    selfLink: Optional[str] = Field(None, description="URL pointing to this task.")
     parent: Optional[str] = Field(None, description="Parent task identifier. This field is omitted if it is a top-level task.")
     position: str = Field(..., description="String indicating the position of the task among its sibling tasks.")
     notes: Optional[str] = Field(None, description="Notes describing the task.")
@@ -34,10 +35,28 @@ class Task(BaseModel):
 
 
 class TasksResponse(BaseModel):
-    kind: str = Field(..., description="Type of the resource. This is always 'tasks#tasks'.")
+    kind: Optional[str] = Field(None, description="Type of the resource. This is always 'tasks#tasks'.")
     etag: str = Field(..., description="ETag of the resource.")
+    nextPageToken: Optional[str] = Field(None, description="Token used to access the next page of this result.")
     items: Optional[List[Task]] = Field(None, description="Collection of items.")
 
+class TaskSummary(BaseModel):
+    """The fields of a ``Task`` needed to show it, read from partial responses."""
+
+    id: str = Field(..., description="Task identifier.")
+    title: Optional[str] = Field(None, description="Title of the task.")
+    parent: Optional[str] = Field(None, description="Parent task identifier. This field is omitted if it is a top-level task.")
+    position: Optional[str] = Field(None, description="String indicating the position of the task among its sibling tasks.")
+    notes: Optional[str] = Field(None, description="Notes describing the task.")
+    status: Optional[TaskStatus] = Field(None, description="Status of the task. This is either 'needsAction' or 'completed'.")
+    due: Optional[str] = Field(None, description="Due date of the task (as a RFC 3339 timestamp).")
+    completed: Optional[str] = Field(None, description="Completion date of the task (as a RFC 3339 timestamp).")
+
+
+class TaskSummariesResponse(BaseModel):
+    nextPageToken: Optional[str] = Field(None, description="Token used to access the next page of this result.")
+    items: Optional[List[TaskSummary]] = Field(None, description="Collection of items.")
+
 class TaskList(BaseModel):
     kind: str = Field(..., description="Type of the resource. This is always 'tasks#taskList'.")
     id: str = Field(..., description="Task list identifier.")
@@ -49,4 +68,5 @@ class TaskList(BaseModel):
 class TaskListsResponse(BaseModel):
     kind: str = Field(..., description="Type of the resource. This is always 'tasks#taskLists'.")
     etag: str = Field(..., description="ETag of the resource.")
+    nextPageToken: Optional[str] = Field(None, description="Token that can be used to request the next page of this result.")
     items: Optional[List[TaskList]] = Field(None, description="Collection of items.")
@@ -1,51 +1,147 @@
-from typing import List
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional
 
-from .typing import TasksResponse
+from gtasks import tracing
 
-def build_task_hierarchy(task_list: TasksResponse) -> List[dict]:
-    task_dict = {tsk.id: tsk.model_dump() for tsk in task_list.items}
+from .typing import Task
 
-    # Prepare a dictionary to hold parent-child relationships
-    task_hierarchy = {}
 
-    # First, populate the top-level tasks (without a parent)
-    for task_id, task in task_dict.items():
-        parent_id = task.get('parent')
+class TaskNode:
+    """A task with its subtasks, ordered by ``position``."""
+
+    __slots__ = ("task", "children", "orphan")
+
+    def __init__(self, task: Task):
+        self.task = task
+        self.children: List["TaskNode"] = []
+        # True if the task's parent is not in the list (e.g. filtered out).
+        self.orphan = False
+
+    def __repr__(self):
+        return f"TaskNode({self.task.id!r}, children={len(self.children)})"
+
+
+def _position(node: TaskNode) -> str:
+    return node.task.position or ""
+
+
+@tracing.traced("compute")
+def build_task_hierarchy(tasks: Iterable[Task]) -> List[TaskNode]:
+    """
+    Build the task tree of a list in a single pass, without recursion.
+
+    Tasks whose parent is missing (e.g. a completed parent that was filtered
+    out) are kept as top-level nodes with ``orphan`` set, and so are tasks
+    caught in a parent cycle. Siblings are ordered by ``position``.
+
+    :param tasks: Tasks of one list, in any order.
+    :return: Top-level nodes.
+    """
+    nodes = {task.id: TaskNode(task) for task in tasks}
+
+    roots: List[TaskNode] = []
+    for node in nodes.values():
+        parent_id = node.task.parent
         if not parent_id:
-            # If no parent, it's a top-level task
-            task_hierarchy[task_id] = task
-            task_hierarchy[task_id]['children'] = []
-
-    # Now, assign children to their respective parents
-    for task_id, task in task_dict.items():
-        parent_id = task.get('parent')
-        if parent_id:
-            if parent_id in task_hierarchy:
-                task_hierarchy[parent_id]['children'].append(task)
-            else:
-                # Parent not found at top level, nest it as a child of its parent
-                # task_hierarchy[parent_id] = {'children': [task], **task_dict.get(parent_id, {})}
-                pass
-
-    # Return only the top-level tasks (parents) with their nested children
-    return [task for task in task_hierarchy.values() if not task.get('parent')]
-
-
-def build_yaml_task_hierarchy(tasks: List[dict]) -> List[dict]:
-    result = []
-    
-    for task in tasks:
-        try:
-            task_entry = {
-                'id': task['id'],
-                'title': task['title'],
-                'notes': task.get('notes', ''),
-                'status': repr(task.get('status', 'unknown')),
-            }
-            if 'children' in task and task['children']:
-                task_entry['children'] = build_yaml_task_hierarchy(task['children'])  # Recursive for children
-            result.append(task_entry)
-        except Exception as e:
-            print(f"Error processing task: {task}")
-            raise e
+            roots.append(node)
+        elif parent_id in nodes:
+            nodes[parent_id].children.append(node)
+        else:
+            node.orphan = True
+            roots.append(node)
+
+    def visit(start: List[TaskNode]) -> int:
+        count, stack = 0, list(start)
+        while stack:
+            node = stack.pop()
+            count += 1
+            if len(node.children) > 1:
+                node.children.sort(key=_position)
+            stack.extend(node.children)
+        return count
+
+    # Anything unreachable from a root sits on a parent cycle. Cut each cycle
+    # at the first node found and hang it off the top level.
+    if visit(roots) < len(nodes):
+        reached = set()
+        stack = list(roots)
+        while stack:
+            node = stack.pop()
+            reached.add(node.task.id)
+            stack.extend(node.children)
+
+        for node in nodes.values():
+            if node.task.id not in reached:
+                nodes[node.task.parent].children.remove(node)
+                node.orphan = True
+                roots.append(node)
+                stack = [node]
+                while stack:
+                    cut = stack.pop()
+                    reached.add(cut.task.id)
+                    if len(cut.children) > 1:
+                        cut.children.sort(key=_position)
+                    stack.extend(cut.children)
+
+    roots.sort(key=_position)
+    return roots
+
+
+def build_yaml_task_hierarchy(nodes: List[TaskNode]) -> List[dict]:
+    """Plain nested dicts of a task tree, for JSON output. Iterative, any depth."""
+    result: List[dict] = []
+    stack = [(node, result) for node in reversed(nodes)]
+
+    while stack:
+        node, siblings = stack.pop()
+        task = node.task
+        task_entry = {
+            'id': task.id,
+            'title': task.title,
+            'notes': task.notes or '',
+            'status': task.status.value if task.status else 'unknown',
+        }
+        siblings.append(task_entry)
+
+        if node.children:
+            task_entry['children'] = []
+            stack.extend((child, task_entry['children']) for child in reversed(node.children))
     return result
+
+
+def parse_time(value: Optional[str]) -> Optional[datetime]:
+    """An RFC 3339 timestamp or a plain date (midnight UTC) as an aware datetime."""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.strip())
+    return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=timezone.utc)
+
+
+def filter_tasks(
+    tasks: Iterable[Task],
+    dueMin: Optional[str] = None,
+    dueMax: Optional[str] = None,
+    completedMin: Optional[str] = None,
+    completedMax: Optional[str] = None,
+    updatedMin: Optional[str] = None,
+) -> List[Task]:
+    """
+    The tasks the ``tasks.list`` time filters would return, for lists served
+    from the local store. Lower bounds are inclusive, upper bounds exclusive.
+    """
+    bounds = [
+        (field, parse_time(low), parse_time(high))
+        for field, low, high in (("due", dueMin, dueMax), ("completed", completedMin, completedMax), ("updated", updatedMin, None))
+        if low or high
+    ]
+    if not bounds:
+        return list(tasks)
+
+    def matches(task) -> bool:
+        for field, low, high in bounds:
+            value = parse_time(getattr(task, field, None))
+            if value is None or (low is not None and value < low) or (high is not None and value >= high):
+                return False
+        return True
+
+    return [task for task in tasks if matches(task)]
@@ -1,52 +1,101 @@
+import json
+import os
 import uuid
 
-from typing import Annotated
+from contextlib import nullcontext
+from functools import lru_cache
+from typing import Annotated, Optional
 from typing_extensions import TypedDict
 
 from langgraph.prebuilt import tools_condition
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import AnyMessage, add_messages
-from langgraph.checkpoint.memory import MemorySaver
-from langchain_openai import ChatOpenAI
 from langchain_core.runnables import Runnable
 from langchain_core.prompts import ChatPromptTemplate
 # from langchain_core.messages import SystemMessage, AIMessage, ToolMessage
 
-from .utils import _print_event, create_tool_node_with_fallback
-from .tools import GetTaskLists, UpsertTask, GetTasks
+from . import tracing
+from .cassette import get_cassette
+from .checkpoint import get_checkpointer
+from .context import ContextWindow
+from .directory import get_directory
+from .prefetch import PREFETCH_ENABLED, Prefetch
+from .router import ROUTER_ENABLED, Router, route
+from .response_cache import LLM_CACHE_ENABLED, ResponseCache, SemanticIndex, schema_hash
+from .render import STREAM_MODES, StreamRenderer
+from .utils import conversation_node, create_tool_node_with_fallback
+from .tools import GetTaskLists, UpsertTask, GetTasks, SearchTasks, BulkTaskOps
 
 
 class State(TypedDict):
     messages: Annotated[list[AnyMessage], add_messages]
+    # Summary of the turns dropped by the context window, if any.
+    summary: list[AnyMessage]
 
 
 class Assistant:
-    def __init__(self, runnable: Runnable):
+    def __init__(self, runnable: Runnable, cache: Optional[ResponseCache] = None):
         # Initialize with the runnable that defines the process for interacting with the tools
         self.runnable = runnable
+        # Responses to conversations seen before are served from here
+        self.cache = cache
 
     def __call__(self, state: State):
+        cached = self.cache.lookup(state) if self.cache is not None else None
+        if cached is not None:
+            tracing.incr("llm_cache_hits")
+            return {"messages": cached}
+
+        request = state
         while True:
             # Invoke the runnable with the current state (messages and context)
             result = self.runnable.invoke(state)
 
             # If the tool fails to return valid output, re-prompt the user to clarify or retry
-            if not result.tool_calls and (
-                not result.content
-                or isinstance(result.content, list)
-                and not result.content[0].get("text")
-            ):
+            if self._is_empty(result):
                 # Add a message to request a valid response
-                messages = state["messages"] + [("user", "Respond with a real output.")]
-                state = {**state, "messages": messages}
+                state = self._reprompt(state)
             else:
                 # Break the loop when valid output is obtained
                 break
 
+        if self.cache is not None:
+            self.cache.store(request, result)
         # Return the final state after processing the runnable
         return {"messages": result}
 
-llm = ChatOpenAI(model='gpt-4o-mini', temperature=0)
+    async def acall(self, state: State):
+        """Same as calling the node, for the async graph API."""
+        cached = self.cache.lookup(state) if self.cache is not None else None
+        if cached is not None:
+            tracing.incr("llm_cache_hits")
+            return {"messages": cached}
+
+        request = state
+        while True:
+            result = await self.runnable.ainvoke(state)
+            if self._is_empty(result):
+                state = self._reprompt(state)
+            else:
+                break
+
+        if self.cache is not None:
+            self.cache.store(request, result)
+        return {"messages": result}
+
+    @staticmethod
+    def _is_empty(result) -> bool:
+        return not result.tool_calls and (
+            not result.content
+            or isinstance(result.content, list)
+            and not result.content[0].get("text")
+        )
+
+    @staticmethod
+    def _reprompt(state: State) -> State:
+        tracing.incr("reprompts")
+        messages = state["messages"] + [("user", "Respond with a real output.")]
+        return {**state, "messages": messages}
 
 assistant_template = ChatPromptTemplate.from_messages(
     [
@@ -66,13 +115,20 @@ assistant_template = ChatPromptTemplate.from_messages(
             Using task management tools:
             1. If the user asks to perform a command, use the tools to complete it.
             2. If user asks for a task to be added or edited, check first if it exists.
-            2.1. First destination is to search for the task without asking for task list ID.
+            2.1. First destination is to search for the task with search_tasks, without asking for task list ID.
+            Only get whole lists with get_tasks if the user asks to see them.
             2.2. If the task is not found, add task to an appropriate list.
             2.3. If there is no appropriate list, ask the user to provide the list name.
+            3. When several tasks change at once (adding many items, completing a whole list,
+            moving or deleting tasks), do it in a single bulk_task_ops call.
+
+            Task lists (short id and title): {task_lists}
+            Pass these ids to the other tools directly. Only call get_task_lists for a list not shown here.
 
             If you are not able to discern any info, ask them to clarify! Do not attempt to wildly guess.
             """,
         ),
+        ("placeholder", "{summary}"),
         ("placeholder", "{messages}"),
     ]
 )
@@ -80,21 +136,88 @@ assistant_template = ChatPromptTemplate.from_messages(
 tools = [
     GetTaskLists(),
     GetTasks(),
+    SearchTasks(),
     UpsertTask(),
+    BulkTaskOps(),
 ]
 
-assistant = assistant_template | llm.bind_tools(tools)
 
-builder = StateGraph(State)
-builder.add_node("assistant", Assistant(assistant))
-builder.add_node("tools", create_tool_node_with_fallback(tools))
+LLM_MODEL = 'gpt-4o-mini'
+
+
+@lru_cache(maxsize=None)
+def get_response_cache() -> Optional[ResponseCache]:
+    """
+    Assistant response cache shared by every graph, None unless enabled with
+    ``GTASKS_LLM_CACHE=1``.
+
+    Set ``GTASKS_SEMANTIC_CACHE=1`` to also match near-duplicate opening
+    commands by embedding similarity.
+    """
+    if not LLM_CACHE_ENABLED:
+        return None
 
-builder.add_edge(START, "assistant")  # Start with the assistant
-builder.add_conditional_edges("assistant", tools_condition)  # Move to tools after input
-builder.add_edge("tools", "assistant")  # Return to assistant after tool execution
+    semantic = None
+    if os.environ.get("GTASKS_SEMANTIC_CACHE") == "1":
+        from langchain_openai import OpenAIEmbeddings
 
-memory = MemorySaver()
-graph = builder.compile(checkpointer=memory)
+        semantic = SemanticIndex(OpenAIEmbeddings(model="text-embedding-3-small").embed_documents)
+    return ResponseCache(schema_hash(tools, LLM_MODEL, assistant_template), semantic=semantic)
+
+
+def build_graph(checkpointer=None):
+    """
+    Build the agent graph.
+
+    Constructing the OpenAI client (and importing it) is deferred until a
+    command is actually run, so importing ``gtasks`` stays cheap.
+
+    :param checkpointer: Defaults to ``get_checkpointer()``.
+    """
+    from langchain_openai import ChatOpenAI
+
+    cassette = get_cassette()
+    if cassette is None:
+        llm = ChatOpenAI(model=LLM_MODEL, temperature=0)
+    else:
+        # Recorded and replayed runs (see ``cassette``); replays never build a client
+        llm = cassette.chat_model(lambda: ChatOpenAI(model=LLM_MODEL, temperature=0))
+    # The list directory is rendered anew for every prompt, so list changes show up at once
+    prompt = assistant_template.partial(task_lists=lambda: get_directory().render())
+    assistant = prompt | llm.bind_tools(tools)
+
+    builder = StateGraph(State)
+    builder.add_node("context", ContextWindow())
+    assistant_node = Assistant(assistant, cache=get_response_cache())
+    builder.add_node("assistant", conversation_node(assistant_node, assistant_node.acall))
+    builder.add_node("tools", create_tool_node_with_fallback(tools))
+
+    # New commands naming a list start fetching it while the LLM runs
+    first = "context"
+    if PREFETCH_ENABLED:
+        builder.add_node("prefetch", Prefetch())
+        builder.add_edge("prefetch", "context")
+        first = "prefetch"
+
+    if ROUTER_ENABLED:
+        # Simple commands are answered without the LLM, the rest go on
+        builder.add_node("router", conversation_node(Router(tools)))
+        builder.add_edge(START, "router")
+        builder.add_conditional_edges("router", route, {"context": first, END: END})
+    else:
+        builder.add_edge(START, first)
+    # Trim the history before every assistant step
+    builder.add_edge("context", "assistant")
+    builder.add_conditional_edges("assistant", tools_condition)  # Move to tools after input
+    builder.add_edge("tools", "context")  # Return to assistant after tool execution
+
+    return builder.compile(checkpointer=checkpointer or get_checkpointer())
+
+
+@lru_cache(maxsize=None)
+def get_graph():
+    """The agent graph, built on first use."""
+    return build_graph()
 
 thread_id = str(uuid.uuid4())
 
@@ -108,11 +231,34 @@ config = {
 # ----
 
 
-def run_commands(commands):
-    _printed = set()
+def run_commands(commands) -> list:
+    """
+    Run ``commands`` in order in one conversation, printing each turn as it streams.
+
+    :return: Per command, the milliseconds to its first LLM token
+        (``ttft_ms``), to its final answer (``answer_ms``) and in total.
+    """
+    renderer = StreamRenderer()
+    timings = []
     for command in commands:
-        events = graph.stream(
-            {"messages": ("user", command)}, config=config, stream_mode="values"
-        )
-        for event in events:
-            _print_event(event, _printed, max_length=2000)
+        # GTASKS_TRACE=1 prints where the time of each command went.
+        with tracing.trace(command) if tracing.TRACE_ENABLED else nullcontext() as turn:
+            renderer.start(command)
+            events = get_graph().stream(
+                {"messages": ("user", command)},
+                config={**config, "callbacks": turn.callbacks} if turn else config,
+                stream_mode=STREAM_MODES,
+            )
+            for mode, payload in events:
+                renderer.handle(mode, payload)
+            timing = renderer.finish()
+            if turn is not None:
+                turn.root.attributes.update(ttft_ms=timing["ttft_ms"], answer_ms=timing["answer_ms"])
+        timings.append(timing)
+
+        if turn is not None:
+            turn.print_summary()
+            if tracing.TRACE_PATH:
+                with open(tracing.TRACE_PATH, "a") as file:
+                    file.write(json.dumps(turn.to_json(), ensure_ascii=False, default=str) + "\n")
+    return timings
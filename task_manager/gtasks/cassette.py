@@ -0,0 +1,276 @@
+"""
+Record and replay the agent's LLM responses and Tasks API exchanges.
+
+A run recorded inside ``use_cassette(path, "record")`` talks to OpenAI and the
+Tasks API as usual, and every chat model response and HTTP exchange of
+``gtasks_api`` is written to ``path`` as JSON. The same run inside
+``use_cassette(path)`` is then served entirely from the file, without network
+access or credentials, optionally sleeping as long as each call took when it
+was recorded::
+
+    with use_cassette("tutorial.json", latency_scale=1.0):
+        graph = build_graph(checkpointer=MemorySaver())
+        graph.invoke({"messages": ("user", "alınacak listesini göster")}, config)
+
+Calls are matched by their content first: the prompt for the LLM, the method,
+path and query for HTTP. Volatile parts (``updatedMin`` timestamps, batch
+boundaries) are left out of the match, and a call matching no recorded one
+gets the next unused call of the same kind and endpoint. Only the
+``gtasks_api`` transport is covered; the httpx client of ``async_api`` is not.
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import httplib2
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AnyMessage, message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from gtasks.api import gtasks_api, rate_limit
+
+CASSETTE_VERSION = 1
+
+# Root the API client points at while replaying. Nothing is ever sent there.
+REPLAY_API_ROOT = "http://cassette.invalid/"
+
+# Query parameters holding timestamps of the local clock, left out of matching.
+VOLATILE_PARAMS = frozenset({"updatedMin"})
+
+_REQUEST_LINE = re.compile(r"^(GET|POST|PUT|PATCH|DELETE) (\S+)", re.MULTILINE)
+# googleapiclient numbers batch parts "<base+n>" with a random base per batch.
+_CONTENT_ID = re.compile(r"Content-ID: <(?:response-)?([^+>]+)\+")
+
+
+class CassetteMiss(LookupError):
+    """A replayed call that was not recorded."""
+
+
+def _path_key(uri: str) -> str:
+    split = urlsplit(uri)
+    query = sorted((key, value) for key, value in parse_qsl(split.query) if key not in VOLATILE_PARAMS)
+    return f"{split.path}?{urlencode(query)}" if query else split.path
+
+
+def _http_keys(method: str, uri: str, body) -> tuple:
+    """``(exact, loose)`` match keys of an HTTP exchange."""
+    path = urlsplit(uri).path
+    if path.endswith("/batch"):
+        text = body.decode(errors="replace") if isinstance(body, bytes) else body or ""
+        calls = sorted(f"{verb} {_path_key(target)}" for verb, target in _REQUEST_LINE.findall(text))
+        return f"{method} {path} {calls}", f"{method} {path} {len(calls)}"
+    return f"{method} {_path_key(uri)}", f"{method} {path}"
+
+
+def _llm_keys(messages: List[AnyMessage]) -> tuple:
+    """``(exact, loose)`` match keys of a chat model call."""
+    prompt = [
+        [message.type, message.content, [[call["name"], call["args"]] for call in getattr(message, "tool_calls", None) or []]]
+        for message in messages
+    ]
+    digest = hashlib.sha256(json.dumps(prompt, sort_keys=True, ensure_ascii=False, default=str).encode()).hexdigest()
+    return digest, "llm"
+
+
+class Cassette:
+    """
+    Recorded calls of one run, by kind (``llm`` or ``http``).
+
+    :param path: JSON file to read (replay) or write (record).
+    :param mode: ``"record"`` or ``"replay"``.
+    :param latency_scale: Replays sleep the recorded duration of each call
+        times this. 0 replays at full speed.
+    """
+
+    def __init__(self, path: str, mode: str = "replay", latency_scale: float = 0.0):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.calls: Dict[str, List[dict]] = {"llm": [], "http": []}
+        self.loose_matches = 0
+        self._lock = threading.Lock()
+        self._exact: Dict[tuple, deque] = defaultdict(deque)
+        self._loose: Dict[tuple, deque] = defaultdict(deque)
+        self._used = set()
+        if mode == "replay":
+            self._load()
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    def _load(self):
+        with open(self.path, encoding="utf-8") as file:
+            data = json.load(file)
+        if data.get("version") != CASSETTE_VERSION:
+            raise ValueError(f"Unsupported cassette version in {self.path}: {data.get('version')}")
+        self.calls = {kind: data.get(kind, []) for kind in ("llm", "http")}
+        for kind, calls in self.calls.items():
+            for index, call in enumerate(calls):
+                self._exact[kind, call["key"]].append(index)
+                self._loose[kind, call["loose"]].append(index)
+
+    def save(self):
+        with open(self.path, "w", encoding="utf-8") as file:
+            json.dump({"version": CASSETTE_VERSION, **self.calls}, file, ensure_ascii=False, indent=1)
+
+    def record(self, kind: str, keys: tuple, duration: float, **data):
+        with self._lock:
+            self.calls[kind].append({"key": keys[0], "loose": keys[1], "duration": round(duration, 4), **data})
+
+    def take(self, kind: str, keys: tuple) -> dict:
+        """The recorded call for a replayed one, after its simulated latency."""
+        with self._lock:
+            index = self._pop(kind, self._exact[kind, keys[0]])
+            if index is None:
+                index = self._pop(kind, self._loose[kind, keys[1]])
+                self.loose_matches += 1
+            if index is None:
+                raise CassetteMiss(f"No recorded {kind} call left for {keys[1]} in {self.path}")
+            self._used.add((kind, index))
+            call = self.calls[kind][index]
+        if self.latency_scale > 0:
+            time.sleep(call["duration"] * self.latency_scale)
+        return call
+
+    def _pop(self, kind: str, indices: deque) -> Optional[int]:
+        while indices:
+            index = indices.popleft()
+            if (kind, index) not in self._used:
+                return index
+        return None
+
+    def unused(self) -> Dict[str, int]:
+        """Recorded calls not replayed, by kind."""
+        return {kind: len(calls) - sum(used_kind == kind for used_kind, _ in self._used) for kind, calls in self.calls.items()}
+
+    # ---- adapters
+
+    def transport(self, http: httplib2.Http) -> "CassetteHttp":
+        return CassetteHttp(self, http if self.recording else None)
+
+    def chat_model(self, factory: Callable[[], BaseChatModel]) -> "CassetteChatModel":
+        """Chat model recording ``factory()``'s responses, or replaying them without calling ``factory``."""
+        return CassetteChatModel(cassette=self, model=factory() if self.recording else None)
+
+
+class CassetteHttp:
+    """``httplib2.Http`` stand-in recording or replaying ``request`` calls."""
+
+    def __init__(self, cassette: Cassette, http: Optional[httplib2.Http]):
+        self.cassette = cassette
+        self.http = http
+
+    def request(self, uri, method="GET", body=None, headers=None, redirections=5, connection_type=None):
+        keys = _http_keys(method, uri, body)
+        if self.cassette.recording:
+            started = time.perf_counter()
+            response, content = self.http.request(uri, method, body=body, headers=headers, redirections=redirections, connection_type=connection_type)
+            self.cassette.record(
+                "http",
+                keys,
+                time.perf_counter() - started,
+                method=method,
+                uri=uri,
+                batch_id=self._batch_id(body),
+                status=response.status,
+                headers={key: value for key, value in response.items() if key != "status"},
+                content=content.decode("utf-8", errors="replace") if isinstance(content, bytes) else content,
+            )
+            return response, content
+
+        call = self.cassette.take("http", keys)
+        content = call["content"]
+        batch_id = self._batch_id(body)
+        if batch_id and call.get("batch_id"):
+            # Parts are matched to their requests by id, which is new in every batch.
+            content = content.replace(call["batch_id"], batch_id)
+        return httplib2.Response({**call["headers"], "status": str(call["status"])}), content.encode("utf-8")
+
+    @staticmethod
+    def _batch_id(body) -> Optional[str]:
+        text = body.decode(errors="replace") if isinstance(body, bytes) else body
+        found = _CONTENT_ID.search(text or "")
+        return found.group(1) if found else None
+
+    def __getattr__(self, name):
+        # Anything else googleapiclient reaches for (timeout, credentials...).
+        if self.http is None:
+            raise AttributeError(name)
+        return getattr(self.http, name)
+
+
+class CassetteChatModel(BaseChatModel):
+    """Chat model recording the responses of ``model``, or replaying them when it is None."""
+
+    cassette: Any
+    model: Optional[BaseChatModel] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "cassette"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        keys = _llm_keys(messages)
+        if self.cassette.recording:
+            started = time.perf_counter()
+            result = self.model._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            self.cassette.record(
+                "llm", keys, time.perf_counter() - started, message=message_to_dict(result.generations[0].message)
+            )
+            return result
+
+        call = self.cassette.take("llm", keys)
+        return ChatResult(generations=[ChatGeneration(message=messages_from_dict([call["message"]])[0])])
+
+
+_active: Optional[Cassette] = None
+
+
+def get_cassette() -> Optional[Cassette]:
+    """The cassette in use, if any. ``app.build_graph`` wraps its chat model in it."""
+    return _active
+
+
+@contextmanager
+def use_cassette(path: str, mode: str = "replay", latency_scale: float = 0.0) -> Iterator[Cassette]:
+    """
+    Record or replay the LLM and Tasks API calls made inside the block.
+
+    Graphs must be built inside the block to use it. Replays run without the
+    client-side rate limit: recorded durations already include any waiting.
+    """
+    global _active
+
+    cassette = Cassette(path, mode, latency_scale)
+    previous_root = gtasks_api.get_api_root()
+    _active = cassette
+    gtasks_api.use_transport(cassette.transport)
+    if not cassette.recording:
+        gtasks_api.use_api_root(REPLAY_API_ROOT)
+        rate_limit.set_limiter(rate_limit.RateLimiter(project_qps=0, user_qps=0))
+    try:
+        yield cassette
+    finally:
+        _active = None
+        gtasks_api.use_transport()
+        if cassette.recording:
+            cassette.save()
+        else:
+            gtasks_api.use_api_root(previous_root)
+            rate_limit.set_limiter()
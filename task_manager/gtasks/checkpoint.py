@@ -0,0 +1,144 @@
+import asyncio
+import os
+import sqlite3
+import time
+
+from typing import Optional, Sequence
+
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import MemorySaver
+
+try:
+    from langgraph.checkpoint.sqlite import SqliteSaver
+except ImportError:  # langgraph-checkpoint-sqlite is optional
+    SqliteSaver = None
+
+# Location of the conversation checkpoints. Relative paths resolve against the
+# working directory, next to token.json.
+CHECKPOINT_PATH = os.environ.get("GTASKS_CHECKPOINT_PATH", "checkpoints.db")
+
+# Checkpoints kept per thread. Only the latest is needed to resume a
+# conversation; a few more allow replaying the last steps.
+CHECKPOINTS_PER_THREAD = 5
+
+# Threads untouched for this long are deleted by ``prune_idle_threads``.
+THREAD_MAX_IDLE = 7 * 24 * 3600
+
+
+if SqliteSaver is not None:
+
+    class PruningSqliteSaver(SqliteSaver):
+        """
+        ``SqliteSaver`` that keeps the latest ``keep`` checkpoints of each thread
+        and records when every thread was last written to.
+
+        The graph has no ``DeltaChannel``\\ s, so every checkpoint holds the full
+        state and older ones can be deleted without breaking the newer.
+        """
+
+        def __init__(self, conn: sqlite3.Connection, keep: int = CHECKPOINTS_PER_THREAD, **kwargs):
+            super().__init__(conn, **kwargs)
+            self.keep = keep
+
+        def setup(self) -> None:
+            if self.is_setup:
+                return
+            super().setup()
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS thread_activity (thread_id TEXT PRIMARY KEY, updated_at REAL NOT NULL)"
+            )
+            self.conn.commit()
+
+        def put(self, config, checkpoint, metadata, new_versions):
+            result = super().put(config, checkpoint, metadata, new_versions)
+            thread_id = str(config["configurable"]["thread_id"])
+            checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+            with self.cursor() as cur:
+                cur.execute(
+                    "INSERT OR REPLACE INTO thread_activity (thread_id, updated_at) VALUES (?, ?)",
+                    (thread_id, time.time()),
+                )
+                self._trim(cur, thread_id, checkpoint_ns, self.keep)
+            return result
+
+        @staticmethod
+        def _trim(cur, thread_id: str, checkpoint_ns: str, keep: int):
+            # Checkpoint ids are time-ordered UUIDs, so they sort by age.
+            for table in ("writes", "checkpoints"):
+                cur.execute(
+                    f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN ("
+                    "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "ORDER BY checkpoint_id DESC LIMIT ?)",
+                    (thread_id, checkpoint_ns, thread_id, checkpoint_ns, keep),
+                )
+
+        def prune(self, thread_ids: Sequence[str], *, strategy: str = "keep_latest") -> None:
+            """
+            :param strategy: ``"keep_latest"`` keeps the latest checkpoint of each
+                namespace, ``"delete"`` deletes the threads.
+            """
+            if strategy not in ("keep_latest", "delete"):
+                raise ValueError(f"Unknown pruning strategy: {strategy}")
+            for thread_id in thread_ids:
+                if strategy == "delete":
+                    self.delete_thread(thread_id)
+                    continue
+                with self.cursor() as cur:
+                    cur.execute("SELECT DISTINCT checkpoint_ns FROM checkpoints WHERE thread_id = ?", (str(thread_id),))
+                    for checkpoint_ns, in cur.fetchall():
+                        self._trim(cur, str(thread_id), checkpoint_ns, 1)
+
+        def delete_thread(self, thread_id: str) -> None:
+            super().delete_thread(thread_id)
+            with self.cursor() as cur:
+                cur.execute("DELETE FROM thread_activity WHERE thread_id = ?", (str(thread_id),))
+
+        # SqliteSaver is sync only. Its queries are short, so the async graph
+        # API (astream, used by the server) runs them on worker threads.
+
+        async def aget_tuple(self, config):
+            return await asyncio.to_thread(self.get_tuple, config)
+
+        async def alist(self, config, *, filter=None, before=None, limit=None):
+            for item in await asyncio.to_thread(
+                lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+            ):
+                yield item
+
+        async def aput(self, config, checkpoint, metadata, new_versions):
+            return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+        async def aput_writes(self, config, writes, task_id, task_path=""):
+            return await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+        async def adelete_thread(self, thread_id):
+            return await asyncio.to_thread(self.delete_thread, thread_id)
+
+        def prune_idle_threads(self, max_idle: float = THREAD_MAX_IDLE) -> int:
+            """
+            Delete threads not written to for ``max_idle`` seconds.
+
+            :return: The number of threads deleted.
+            """
+            with self.cursor() as cur:
+                cur.execute("SELECT thread_id FROM thread_activity WHERE updated_at < ?", (time.time() - max_idle,))
+                thread_ids = [thread_id for thread_id, in cur.fetchall()]
+            for thread_id in thread_ids:
+                self.delete_thread(thread_id)
+            return len(thread_ids)
+
+
+def get_checkpointer(path: Optional[str] = None) -> BaseCheckpointSaver:
+    """
+    Checkpointer for the agent graph: SQLite on disk, with per-thread
+    retention, if ``langgraph-checkpoint-sqlite`` is installed, otherwise in
+    memory. Threads idle for longer than ``THREAD_MAX_IDLE`` are pruned on open.
+    """
+    if SqliteSaver is None:
+        return MemorySaver()
+
+    conn = sqlite3.connect(path or CHECKPOINT_PATH, check_same_thread=False)
+    saver = PruningSqliteSaver(conn)
+    saver.setup()
+    saver.prune_idle_threads()
+    return saver
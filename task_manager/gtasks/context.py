@@ -0,0 +1,135 @@
+import json
+import os
+
+from typing import List, Optional
+
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage, RemoveMessage, SystemMessage, ToolMessage
+
+from gtasks.tools.compact import estimate_tokens
+
+# Prompt budget for the conversation history, in estimated tokens. The system
+# prompt and tool schemas come on top of this.
+CONTEXT_MAX_TOKENS = int(os.environ.get("GTASKS_CONTEXT_MAX_TOKENS", 3000))
+
+# The latest turns (a user message and everything after it) are never trimmed.
+KEEP_RECENT_TURNS = 2
+
+# Tool outputs shorter than this are not worth stubbing.
+MIN_STUB_TOKENS = 20
+
+# Each dropped turn leaves a line in the summary; only the latest are kept.
+MAX_SUMMARY_LINES = 20
+SUMMARY_LINE_LENGTH = 120
+
+SUMMARY_ID = "context-summary"
+
+
+def message_tokens(message: AnyMessage) -> int:
+    """Estimated prompt cost of a message, tool calls included."""
+    content = message.content if isinstance(message.content, str) else json.dumps(message.content)
+    tokens = estimate_tokens(content) + 4
+    if isinstance(message, AIMessage) and message.tool_calls:
+        tokens += estimate_tokens(json.dumps([call["args"] for call in message.tool_calls], ensure_ascii=False))
+    return tokens
+
+
+def _text(message: AnyMessage) -> str:
+    content = message.content if isinstance(message.content, str) else json.dumps(message.content)
+    content = " ".join(content.split())
+    if len(content) > SUMMARY_LINE_LENGTH:
+        content = content[: SUMMARY_LINE_LENGTH - 1] + "…"
+    return content
+
+
+def _split_turns(messages: List[AnyMessage]) -> List[List[AnyMessage]]:
+    turns: List[List[AnyMessage]] = []
+    for message in messages:
+        if isinstance(message, HumanMessage) or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def _summary_line(turn: List[AnyMessage]) -> str:
+    request = next((_text(it) for it in turn if isinstance(it, HumanMessage)), "")
+    tools = sorted({call["name"] for it in turn if isinstance(it, AIMessage) for call in it.tool_calls})
+    answer = next((_text(it) for it in reversed(turn) if isinstance(it, AIMessage) and it.content), "")
+    line = f"- user: {request}"
+    if tools:
+        line += f" | tools: {', '.join(tools)}"
+    if answer:
+        line += f" | assistant: {answer}"
+    return line
+
+
+class ContextWindow:
+    """
+    Graph node that keeps the conversation history under a token budget.
+
+    Runs before the assistant. When the history is over budget it first stubs
+    the output of tool calls outside the recent turns (they can be called
+    again), then drops whole old turns, oldest first, leaving one summary line
+    each. Changes are written back to the state, so checkpoints stay bounded
+    too: stubs replace messages by id, dropped turns are ``RemoveMessage``\\ s.
+    """
+
+    def __init__(self, max_tokens: int = CONTEXT_MAX_TOKENS, keep_turns: int = KEEP_RECENT_TURNS):
+        self.max_tokens = max_tokens
+        self.keep_turns = keep_turns
+
+    def __call__(self, state: dict) -> dict:
+        messages = state["messages"]
+        total = sum(message_tokens(it) for it in messages)
+        if total <= self.max_tokens:
+            return {}
+
+        turns = _split_turns(messages)
+        old_turns = turns[: max(0, len(turns) - self.keep_turns)]
+        updates: List[AnyMessage] = []
+
+        for turn in old_turns:
+            for index, message in enumerate(turn):
+                if not isinstance(message, ToolMessage) or message.id is None:
+                    continue
+                tokens = message_tokens(message)
+                if tokens < MIN_STUB_TOKENS:
+                    continue
+                stub = message.model_copy(
+                    update={
+                        "content": f"[{message.name or 'tool'} output elided ({tokens} tokens); call the tool again if it is needed]",
+                        "artifact": None,
+                    }
+                )
+                total += message_tokens(stub) - tokens
+                turn[index] = stub
+                updates.append(stub)
+
+        summary_lines = self._summary_lines(state)
+        for turn in old_turns:
+            if total <= self.max_tokens:
+                break
+            # Whole turns go at once, so that no tool call loses its result.
+            for message in turn:
+                total -= message_tokens(message)
+                if message.id is not None:
+                    updates = [it for it in updates if it.id != message.id]
+                    updates.append(RemoveMessage(id=message.id))
+            summary_lines.append(_summary_line(turn))
+
+        result = {"messages": updates}
+        if summary_lines != self._summary_lines(state):
+            summary = "\n".join(summary_lines[-MAX_SUMMARY_LINES:])
+            result["summary"] = [
+                SystemMessage(
+                    content=f"Summary of earlier turns of this conversation:\n{summary}",
+                    id=SUMMARY_ID,
+                )
+            ]
+        return result
+
+    @staticmethod
+    def _summary_lines(state: dict) -> List[str]:
+        summary: Optional[list] = state.get("summary")
+        if not summary:
+            return []
+        return summary[0].content.splitlines()[1:]
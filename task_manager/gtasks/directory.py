@@ -0,0 +1,180 @@
+"""
+Directory of the account's task lists: short ids, titles and the names a
+command may use for them.
+
+The directory is rendered into the assistant's system prompt, so the model
+can call ``get_tasks`` or ``upsert_task`` on the first turn instead of first
+asking ``get_task_lists`` which id a spoken list name has. The router and the
+prefetcher match list names against it too.
+
+It is built from the task lists in the local store and rebuilt whenever they
+change there. The store itself is refreshed from the API in the background
+once the last refresh is older than ``DIRECTORY_MAX_AGE``; only the very
+first refresh of an empty store is waited for.
+"""
+
+import os
+import re
+import threading
+import time
+
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List, Optional, Set
+
+from gtasks.api import iter_task_lists
+from gtasks.api.cache import get_store
+from gtasks.api.search import fold
+from gtasks.api.typing import TaskList
+from gtasks.tools.compact import aliases
+
+# Seconds before the directory is refreshed from the API again.
+DIRECTORY_MAX_AGE = float(os.environ.get("GTASKS_DIRECTORY_MAX_AGE", 300))
+
+# Lists rendered into the prompt. The model asks get_task_lists for the rest.
+MAX_DIRECTORY_LISTS = 50
+
+# Names shorter than this match too many commands by accident, so ``find``
+# skips them. ``resolve`` still takes them.
+MIN_NAME_LENGTH = 3
+
+# Words calling a list a list ("alışveriş listesi", "shopping list"). They are
+# dropped from the end of titles and of names to resolve.
+_LIST_WORDS = re.compile(r"\s+(?:listesi|listem|listemi|listesini|liste|list)$")
+# Turkish plural suffix: "alınacaklar" is also called "alınacak".
+_PLURAL = re.compile(r"(\w{3,})(?:lar|ler)$")
+_NON_WORD = re.compile(r"[^\w\s]+")
+
+
+def list_names(title: str) -> Set[str]:
+    """Folded names ``title`` goes by: itself, without "listesi" and the like, and in the singular."""
+    name = " ".join(_NON_WORD.sub(" ", fold(title)).split())
+    names = {name, _LIST_WORDS.sub("", name)}
+    names |= {_PLURAL.sub(r"\1", it) for it in names}
+    return {it for it in names if it}
+
+
+class ListDirectory:
+    """
+    Task lists by short id, with their folded names.
+
+    :param max_age: Seconds between two refreshes from the API.
+    """
+
+    def __init__(self, max_age: float = DIRECTORY_MAX_AGE):
+        self.max_age = max_age
+        self.stats = Counter()
+        self._lock = threading.Lock()
+        self._refreshed: Optional[float] = None
+        self._refreshing = False
+        self._version: Optional[tuple] = None
+        self._task_lists: List[TaskList] = []
+        # Folded name -> lists going by it, longest names first.
+        self._names: Dict[str, List[TaskList]] = {}
+
+    # ---- refresh
+
+    def refresh(self):
+        """Bring the stored lists in line with the API, dropping lists deleted there."""
+        seen = {task_list.id for task_list in iter_task_lists()}
+        store = get_store()
+        for task_list in store.get_task_lists():
+            if task_list.id not in seen:
+                store.clear(task_list.id)
+        self._refreshed = time.monotonic()
+        self.stats["refreshes"] += 1
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        except Exception as error:
+            self.stats["errors"] += 1
+            print(f"Task list directory refresh failed: {error!r}")
+        finally:
+            self._refreshing = False
+
+    def _ensure_fresh(self):
+        if self._refreshed is None and not get_store().get_task_lists():
+            # Nothing to show yet: worth one blocking request.
+            with self._lock:
+                if self._refreshed is None:
+                    try:
+                        self.refresh()
+                    except Exception as error:
+                        self.stats["errors"] += 1
+                        print(f"Task list directory refresh failed: {error!r}")
+                        self._refreshed = time.monotonic()
+            return
+
+        if self._refreshed is None or time.monotonic() - self._refreshed > self.max_age:
+            with self._lock:
+                if self._refreshing:
+                    return
+                self._refreshing = True
+            # Stale lists are served meanwhile.
+            threading.Thread(target=self._refresh_in_background, name="gtasks-directory", daemon=True).start()
+
+    # ---- lookups
+
+    def _load(self):
+        """Rebuild the names if the stored lists changed."""
+        store = get_store()
+        # The store can be swapped for another (e.g. by tests and benchmarks).
+        version = (id(store), store.lists_version())
+        if version == self._version:
+            return
+
+        task_lists = sorted(store.get_task_lists(), key=lambda it: (it.title or "").lower())
+        names: Dict[str, List[TaskList]] = {}
+        for task_list in task_lists:
+            for name in list_names(task_list.title or ""):
+                names.setdefault(name, []).append(task_list)
+
+        with self._lock:
+            self._task_lists = task_lists
+            self._names = dict(sorted(names.items(), key=lambda item: -len(item[0])))
+            self._version = version
+            self.stats["rebuilds"] += 1
+
+    def task_lists(self) -> List[TaskList]:
+        self._ensure_fresh()
+        self._load()
+        return self._task_lists
+
+    def resolve(self, name: str) -> Optional[TaskList]:
+        """The list called ``name`` (case, diacritics and "listesi" aside), if exactly one is."""
+        self.task_lists()
+        found = {task_list.id: task_list for wanted in list_names(name) for task_list in self._names.get(wanted, [])}
+        return next(iter(found.values())) if len(found) == 1 else None
+
+    def find(self, text: str) -> List[TaskList]:
+        """Lists named anywhere in ``text``, in order of the longest name first."""
+        self.task_lists()
+        text = fold(text)
+        found: Dict[str, TaskList] = {}
+        for name, task_lists in self._names.items():
+            # Turkish suffixes attach to the name ("alınacak listeme"), so only its start must be a word boundary.
+            if len(name) >= MIN_NAME_LENGTH and len(task_lists) == 1 and re.search(rf"(?<!\w){re.escape(name)}", text):
+                found.setdefault(task_lists[0].id, task_lists[0])
+                # "market" must not match again inside "market alışverişi".
+                text = text.replace(name, " ")
+        return list(found.values())
+
+    def render(self) -> str:
+        """The lists as ``l1 Alınacak; l2 Market``, for the system prompt."""
+        task_lists = self.task_lists()
+        self.stats["renders"] += 1
+        # Aliases belong to the conversation, so they are looked up on every render.
+        shown = [f"{aliases.alias(task_list.id, prefix='l')} {task_list.title}" for task_list in task_lists[:MAX_DIRECTORY_LISTS]]
+        if len(task_lists) > MAX_DIRECTORY_LISTS:
+            shown.append(f"and {len(task_lists) - MAX_DIRECTORY_LISTS} more")
+        return "; ".join(shown) if shown else "none found"
+
+    def metrics(self) -> dict:
+        return {**self.stats, "lists": len(self._task_lists)}
+
+
+@lru_cache(maxsize=None)
+def get_directory() -> ListDirectory:
+    """Directory shared by every graph of the process."""
+    return ListDirectory()
@@ -0,0 +1,190 @@
+"""
+Speculative prefetch of the task lists a command names.
+
+The assistant's first LLM call takes as long as several Tasks API round
+trips. When a new command names a known list ("alınacak listesini göster"),
+the ``prefetch`` node starts syncing that list in the background, so the
+tasks are in the store, or on their way, by the time the model calls
+``get_tasks``. The tool ``claim``s the lists it reads first: that waits for
+a sync still in flight instead of sending a second one.
+
+Lists are matched by their names in the task list directory. A list
+prefetched but not read within ``PREFETCH_TTL`` seconds counts as wasted.
+"""
+
+import asyncio
+import concurrent.futures
+import contextvars
+import os
+import threading
+import time
+
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+
+from langchain_core.messages import HumanMessage
+
+from gtasks import tracing
+from gtasks.api import gtasks_api
+from gtasks.api.batch import sync_task_lists
+from gtasks.directory import get_directory
+
+# Set GTASKS_PREFETCH=0 to only fetch what the model asks for.
+PREFETCH_ENABLED = os.environ.get("GTASKS_PREFETCH", "1") != "0"
+
+# Budget: lists prefetched for one command, and list syncs in flight at once
+# across every session. Lists beyond either are skipped.
+PREFETCH_MAX_LISTS = int(os.environ.get("GTASKS_PREFETCH_MAX_LISTS", 2))
+PREFETCH_MAX_IN_FLIGHT = int(os.environ.get("GTASKS_PREFETCH_MAX_IN_FLIGHT", 8))
+
+# Prefetched lists not read within this many seconds are dropped as wasted.
+PREFETCH_TTL = 30.0
+
+# Longest a tool waits for a prefetch in flight before syncing by itself.
+PREFETCH_WAIT = 10.0
+
+
+class Prefetcher:
+    """
+    Background list syncs keyed by list id, with their hit and waste counts.
+
+    :param max_lists: Lists prefetched per command.
+    :param max_in_flight: List syncs running at once.
+    """
+
+    def __init__(
+        self,
+        max_lists: int = PREFETCH_MAX_LISTS,
+        max_in_flight: int = PREFETCH_MAX_IN_FLIGHT,
+        ttl: float = PREFETCH_TTL,
+    ):
+        self.max_lists = max_lists
+        self.max_in_flight = max_in_flight
+        self.ttl = ttl
+        self.stats = Counter()
+        # List id -> (sync of the list, when it started).
+        self._pending: Dict[str, Tuple[concurrent.futures.Future, float]] = {}
+        self._lock = threading.Lock()
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(1, max_in_flight), thread_name_prefix="gtasks-prefetch"
+        )
+
+    @staticmethod
+    def match(command: str) -> List[str]:
+        """Ids of the lists ``command`` names."""
+        return [task_list.id for task_list in get_directory().find(command)]
+
+    def start(self, command: str) -> List[str]:
+        """
+        Start syncing the lists ``command`` names, within the budget.
+
+        :return: Ids of the lists whose sync was started.
+        """
+        self._expire()
+        with self._lock:
+            self.stats["commands"] += 1
+        matched = self.match(command)
+        if not matched:
+            return []
+
+        started = []
+        with self._lock:
+            in_flight = sum(not future.done() for future, _ in self._pending.values())
+            for index, task_list_id in enumerate(matched):
+                if task_list_id in self._pending:
+                    continue
+                if index >= self.max_lists or in_flight >= self.max_in_flight:
+                    self.stats["skipped"] += 1
+                    continue
+                # Fresh lists are read from the store anyway.
+                if gtasks_api.sync_params(task_list_id) is None:
+                    continue
+                started.append(task_list_id)
+                in_flight += 1
+
+            if started:
+                # One batched request for all of them, charged to the caller's quota and trace.
+                context = contextvars.copy_context()
+                future = self._executor.submit(context.run, sync_task_lists, started)
+                now = time.monotonic()
+                for task_list_id in started:
+                    self._pending[task_list_id] = (future, now)
+                self.stats["started"] += len(started)
+        return started
+
+    def _take(self, task_list_ids: Iterable[str]) -> List[concurrent.futures.Future]:
+        futures = []
+        with self._lock:
+            for task_list_id in task_list_ids:
+                entry = self._pending.pop(task_list_id, None)
+                if entry is not None:
+                    self.stats["hits"] += 1
+                    tracing.incr("prefetch_hits")
+                    if entry[0] not in futures:
+                        futures.append(entry[0])
+        return futures
+
+    def claim(self, task_list_ids: Iterable[str], timeout: float = PREFETCH_WAIT):
+        """Wait for the prefetches of ``task_list_ids`` still in flight, if any."""
+        for future in self._take(task_list_ids):
+            started, failed = time.monotonic(), False
+            try:
+                future.result(timeout)
+            except Exception:
+                # The tool syncs the list itself, as without a prefetch.
+                failed = True
+            self._waited(time.monotonic() - started, failed)
+
+    async def aclaim(self, task_list_ids: Iterable[str], timeout: float = PREFETCH_WAIT):
+        """Async ``claim``: waits without blocking the event loop."""
+        for future in self._take(task_list_ids):
+            started, failed = time.monotonic(), False
+            try:
+                await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+            except Exception:
+                failed = True
+            self._waited(time.monotonic() - started, failed)
+
+    def _waited(self, seconds: float, failed: bool):
+        with self._lock:
+            self.stats["wait_s"] += seconds
+            self.stats["errors"] += failed
+
+    def _expire(self):
+        now = time.monotonic()
+        with self._lock:
+            for task_list_id, (future, started) in list(self._pending.items()):
+                if future.done() and now - started > self.ttl:
+                    del self._pending[task_list_id]
+                    self.stats["wasted"] += 1
+
+    def metrics(self) -> dict:
+        self._expire()
+        hits, wasted = self.stats["hits"], self.stats["wasted"]
+        return {
+            **self.stats,
+            "wait_s": round(self.stats["wait_s"], 3),
+            "pending": len(self._pending),
+            "hit_rate": round(hits / (hits + wasted), 3) if hits + wasted else None,
+        }
+
+
+@lru_cache(maxsize=None)
+def get_prefetcher() -> Prefetcher:
+    """Prefetcher shared by every graph and tool of the process."""
+    return Prefetcher()
+
+
+class Prefetch:
+    """
+    Graph node starting the prefetch for a new command, ahead of the assistant.
+
+    It returns at once: the syncs run while the assistant waits for the LLM.
+    """
+
+    def __call__(self, state: dict) -> dict:
+        last = state["messages"][-1]
+        if isinstance(last, HumanMessage) and isinstance(last.content, str):
+            get_prefetcher().start(last.content)
+        return {}
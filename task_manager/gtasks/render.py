@@ -0,0 +1,136 @@
+"""
+Incremental terminal rendering of a turn streamed with
+``stream_mode=["messages", "updates"]``.
+
+LLM tokens are printed as they arrive (``messages``), tool calls and their
+results as soon as the step making them ends (``updates``). Only the current
+turn's state is kept, so memory does not grow with the conversation.
+
+Each turn records the time to the first LLM token and to the final answer.
+"""
+
+import sys
+import time
+
+from typing import Dict, Optional, TextIO
+
+from langchain_core.messages import AIMessage, AIMessageChunk, ToolMessage
+
+STREAM_MODES = ["messages", "updates"]
+
+# Tool arguments and results are cut to this many characters.
+MAX_TOOL_TEXT = 160
+
+
+def _text(content) -> str:
+    if isinstance(content, str):
+        return content
+    return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+
+
+def _clip(text: str, limit: int = MAX_TOOL_TEXT) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[: limit - 1] + "…"
+
+
+class StreamRenderer:
+    """
+    Prints the events of one turn at a time.
+
+    .. code-block:: python
+
+        renderer = StreamRenderer()
+        renderer.start(command)
+        for mode, payload in graph.stream(inputs, config, stream_mode=STREAM_MODES):
+            renderer.handle(mode, payload)
+        timings = renderer.finish()
+
+    :param out: Stream to write to.
+    """
+
+    def __init__(self, out: Optional[TextIO] = None):
+        self.out = out or sys.stdout
+        self._started = 0.0
+        self._first_token: Optional[float] = None
+        self._answered: Optional[float] = None
+        # Id of the message whose tokens are being printed.
+        self._streaming: Optional[str] = None
+        self._streamed_ids = set()
+        self._tool_started: Dict[str, float] = {}
+
+    def start(self, command: str):
+        self._started = time.perf_counter()
+        self._first_token = self._answered = None
+        self._streaming = None
+        self._streamed_ids = set()
+        self._tool_started = {}
+        self._write(f"> {command}\n")
+
+    def handle(self, mode: str, payload):
+        if mode == "messages":
+            message, _ = payload
+            if isinstance(message, AIMessageChunk):
+                self._token(message)
+        elif mode == "updates":
+            for update in payload.values():
+                # Nodes returning nothing, and interrupts, have no messages.
+                messages = update.get("messages", []) if isinstance(update, dict) else []
+                for message in messages if isinstance(messages, list) else [messages]:
+                    self._message(message)
+
+    def finish(self) -> dict:
+        """End the turn and return its timings, in milliseconds."""
+        self._end_stream()
+        timings = {
+            "ttft_ms": self._ms(self._first_token),
+            "answer_ms": self._ms(self._answered),
+            "total_ms": self._ms(time.perf_counter()),
+        }
+        shown = [f"{label} {timings[key]:.0f} ms" for key, label in (("ttft_ms", "first token"), ("answer_ms", "answer")) if timings[key] is not None]
+        self._write(f"[{', '.join(shown) or 'no answer'}]\n\n")
+        return timings
+
+    # ---- events
+
+    def _token(self, chunk: AIMessageChunk):
+        text = _text(chunk.content)
+        if not text:
+            return
+        if self._first_token is None:
+            self._first_token = time.perf_counter()
+        if self._streaming != chunk.id:
+            self._end_stream()
+            self._streaming = chunk.id
+            self._streamed_ids.add(chunk.id)
+        self._write(text)
+
+    def _message(self, message):
+        if isinstance(message, AIMessage):
+            self._end_stream()
+            if message.content and message.id not in self._streamed_ids:
+                # Not streamed: cached responses and the router's replies.
+                self._write(_text(message.content) + "\n")
+            for call in message.tool_calls:
+                self._tool_started[call["id"]] = time.perf_counter()
+                args = ", ".join(f"{key}={value!r}" for key, value in call["args"].items())
+                self._write(f"  → {call['name']}({_clip(args)})\n")
+            if not message.tool_calls:
+                self._answered = time.perf_counter()
+        elif isinstance(message, ToolMessage):
+            self._end_stream()
+            started = self._tool_started.pop(message.tool_call_id, None)
+            took = f" {(time.perf_counter() - started) * 1000:.0f} ms" if started is not None else ""
+            marker = "✗" if message.status == "error" else "←"
+            self._write(f"  {marker} {message.name or 'tool'}{took}: {_clip(_text(message.content))}\n")
+
+    def _end_stream(self):
+        if self._streaming is not None:
+            self._write("\n")
+            self._streaming = None
+
+    def _ms(self, moment: Optional[float]) -> Optional[float]:
+        return None if moment is None else round((moment - self._started) * 1000, 1)
+
+    def _write(self, text: str):
+        self.out.write(text)
+        self.out.flush()
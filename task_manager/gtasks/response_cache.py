@@ -0,0 +1,264 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+
+from collections import Counter, OrderedDict
+from typing import Callable, List, Optional, Sequence
+
+from langchain_core.messages import AIMessage, AnyMessage, ToolMessage
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from gtasks.api.cache import get_store
+from gtasks.api.search import fold
+from gtasks.directory import get_directory
+from gtasks.tools.compact import aliases
+
+# Set GTASKS_LLM_CACHE=1 to serve repeated assistant steps from the cache.
+# Off by default: entries only notice task changes made through this process,
+# so changes from other clients go unseen until the entry expires.
+LLM_CACHE_ENABLED = os.environ.get("GTASKS_LLM_CACHE", "0") == "1"
+
+LLM_CACHE_SIZE = 1024
+LLM_CACHE_TTL = 3600.0
+
+# Cosine similarity above which the semantic layer treats two commands as
+# the same request.
+SEMANTIC_THRESHOLD = 0.97
+
+# Tool calls that only read data. A response made only of these gives the same
+# result whatever the tasks are, because the tools fetch fresh data when run.
+READ_ONLY_TOOLS = frozenset({"get_task_lists", "get_tasks", "search_tasks"})
+
+# Tool arguments naming task lists.
+LIST_ARGS = frozenset({"task_list_id", "task_list_ids", "destination_task_list_id"})
+
+_TURKISH_UPPER = str.maketrans({"I": "ı", "İ": "i"})
+
+
+def _normalize(text: str) -> str:
+    text = " ".join(text.translate(_TURKISH_UPPER).lower().split())
+    return text.rstrip("?!. ")
+
+
+def _message_key(message: AnyMessage) -> list:
+    content = message.content if isinstance(message.content, str) else json.dumps(message.content, sort_keys=True)
+    key = [message.type, _normalize(content)]
+    if isinstance(message, AIMessage) and message.tool_calls:
+        key.append([[call["name"], call["args"]] for call in message.tool_calls])
+    if isinstance(message, ToolMessage):
+        key.append(message.name)
+    return key
+
+
+def schema_hash(tools: Sequence, *extra) -> str:
+    """Hash of the tool schemas and anything else (model, prompt) that shapes a response."""
+    schemas = [convert_to_openai_tool(tool) for tool in tools]
+    payload = json.dumps([schemas, [str(it) for it in extra]], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def is_state_independent(message: AIMessage) -> bool:
+    """True if the response only calls read-only tools, so task data changes cannot make it stale."""
+    return bool(message.tool_calls) and all(call["name"] in READ_ONLY_TOOLS for call in message.tool_calls)
+
+
+def _values(value) -> list:
+    return [it for item in value for it in _values(item)] if isinstance(value, list) else [value]
+
+
+def is_grounded(command: str, message: AIMessage) -> bool:
+    """
+    True if ``message`` is a valid response to ``command`` as far as its tool
+    arguments go: every list it names is a list ``command`` names, and every
+    other text it passes appears in ``command``.
+
+    Similar commands differing in one word ("alınacak listesini göster",
+    "yapılacak listesini göster") differ in exactly these arguments.
+    """
+    named = {task_list.id for task_list in get_directory().find(command)}
+    folded = fold(command)
+    for call in message.tool_calls:
+        for name, value in call["args"].items():
+            for item in _values(value):
+                if not isinstance(item, str):
+                    continue
+                if name in LIST_ARGS:
+                    if aliases.resolve(item) not in named:
+                        return False
+                elif fold(item).strip() not in folded:
+                    return False
+    return True
+
+
+class _Entry:
+    __slots__ = ("message", "created", "generation")
+
+    def __init__(self, message: AIMessage, generation: Optional[int]):
+        self.message = message
+        self.created = time.monotonic()
+        # Store generation the response was made at, None if it does not depend on it.
+        self.generation = generation
+
+
+class SemanticIndex:
+    """
+    Local vector index over first-turn commands, for near-duplicate lookups.
+
+    Only responses that call read-only tools are indexed: for anything that
+    writes, "kedi kumu ekle" and "kedi maması ekle" are close in embedding
+    space but must not share a response. Even those are only served to a
+    command their arguments fit (see ``is_grounded``).
+
+    :param embed: Function embedding a list of texts.
+    """
+
+    def __init__(self, embed: Callable[[List[str]], List[List[float]]], threshold: float = SEMANTIC_THRESHOLD, size: int = LLM_CACHE_SIZE):
+        import numpy
+
+        self._numpy = numpy
+        self.embed = embed
+        self.threshold = threshold
+        self.size = size
+        self._vectors = numpy.zeros((0, 0), dtype=numpy.float32)
+        self._keys: List[str] = []
+
+    def _vector(self, text: str):
+        vector = self._numpy.asarray(self.embed([text])[0], dtype=self._numpy.float32)
+        return vector / (self._numpy.linalg.norm(vector) or 1.0)
+
+    def add(self, text: str, key: str):
+        vector = self._vector(text)[None, :]
+        self._vectors = vector if not self._keys else self._numpy.vstack([self._vectors, vector])[-self.size:]
+        self._keys = (self._keys + [key])[-self.size:]
+
+    def nearest(self, text: str) -> Optional[str]:
+        if not self._keys:
+            return None
+        scores = self._vectors @ self._vector(text)
+        best = int(scores.argmax())
+        return self._keys[best] if scores[best] >= self.threshold else None
+
+
+class ResponseCache:
+    """
+    LRU cache of assistant responses with a TTL.
+
+    The exact layer keys on the normalized conversation (whitespace, case and
+    trailing punctuation folded), the summary, the task list directory of the
+    prompt and ``schema_hash``. The response
+    is served only while it is still valid for the tasks: unless it merely
+    calls read-only tools, it is tied to the task store generation it was made
+    at, and any task change since makes it a miss. Changes made by other
+    clients are only seen once synced, so entries may be stale until then.
+
+    :param namespace: ``schema_hash`` of the tools, model and prompt in use.
+    :param semantic: Optional ``SemanticIndex`` consulted on exact misses of a
+        conversation's first message.
+    """
+
+    def __init__(self, namespace: str = "", size: int = LLM_CACHE_SIZE, ttl: float = LLM_CACHE_TTL, semantic: Optional[SemanticIndex] = None):
+        self.namespace = namespace
+        self.size = size
+        self.ttl = ttl
+        self.semantic = semantic
+        self.stats = Counter()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, state: dict) -> str:
+        messages = [_message_key(message) for message in state.get("summary") or []]
+        messages += [_message_key(message) for message in state["messages"]]
+        # The prompt's list directory: list aliases differ between conversations.
+        payload = json.dumps([self.namespace, get_directory().render(), messages], sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    @staticmethod
+    def _first_command(state: dict) -> Optional[str]:
+        # The semantic layer only answers a conversation's opening request.
+        messages = state["messages"]
+        if len(messages) == 1 and messages[0].type == "human" and not state.get("summary"):
+            return _normalize(messages[0].content if isinstance(messages[0].content, str) else "")
+        return None
+
+    def lookup(self, state: dict) -> Optional[AIMessage]:
+        """A fresh copy of the cached response for ``state``, or None."""
+        key = self.key(state)
+        message = self._get(key)
+        if message is not None:
+            self.stats["hits"] += 1
+            return self._fresh_copy(message, "exact")
+
+        command = self._first_command(state)
+        if self.semantic is not None and command:
+            similar = self.semantic.nearest(command)
+            message = self._get(similar) if similar else None
+            if message is not None and not is_grounded(command, message):
+                self.stats["semantic_rejects"] += 1
+                message = None
+            if message is not None:
+                self.stats["semantic_hits"] += 1
+                return self._fresh_copy(message, "semantic")
+
+        self.stats["misses"] += 1
+        return None
+
+    def _get(self, key: str) -> Optional[AIMessage]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry.created > self.ttl:
+                del self._entries[key]
+                self.stats["expired"] += 1
+                return None
+            if entry.generation is not None and entry.generation != get_store().version():
+                del self._entries[key]
+                self.stats["stale"] += 1
+                return None
+            self._entries.move_to_end(key)
+            return entry.message
+
+    def store(self, state: dict, message: AIMessage):
+        independent = is_state_independent(message)
+        key = self.key(state)
+        with self._lock:
+            self._entries[key] = _Entry(message, None if independent else get_store().version())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+        command = self._first_command(state)
+        if self.semantic is not None and command and independent:
+            self.semantic.add(command, key)
+
+    @staticmethod
+    def _fresh_copy(message: AIMessage, layer: str) -> AIMessage:
+        # New message and tool call ids: the copy may land in the same thread
+        # as the original, where ids must be unique. No tokens were used.
+        tool_calls = [{**call, "id": f"call_{uuid.uuid4().hex[:24]}"} for call in message.tool_calls]
+        additional_kwargs = {key: value for key, value in message.additional_kwargs.items() if key != "tool_calls"}
+        return message.model_copy(
+            update={
+                "id": None,
+                "tool_calls": tool_calls,
+                "additional_kwargs": additional_kwargs,
+                "usage_metadata": None,
+                "response_metadata": {**message.response_metadata, "cache": layer},
+            }
+        )
+
+    def metrics(self) -> dict:
+        lookups = self.stats["hits"] + self.stats["semantic_hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "hit_rate": round((self.stats["hits"] + self.stats["semantic_hits"]) / lookups, 3) if lookups else None,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
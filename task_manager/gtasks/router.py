@@ -0,0 +1,201 @@
+"""
+Rule-based fast path for the most common commands, ahead of the LLM.
+
+Adding a task to a list, showing a list and completing a task are matched
+with Turkish and English patterns. When the list, and for completion the
+task, resolve unambiguously against the local store, the router calls the
+tool itself and answers without a model call. Anything else falls through
+to the assistant unchanged.
+"""
+
+import os
+import re
+import uuid
+
+from typing import List, Optional, Tuple
+
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.graph import END
+
+from gtasks.api import search_tasks, sync_task_lists
+from gtasks.api.search import fold
+from gtasks.api.typing import TaskList
+from gtasks.directory import get_directory
+from gtasks.tools.compact import aliases
+from gtasks.utils import tool_error_message
+
+# Set GTASKS_ROUTER=0 to send every command to the LLM.
+ROUTER_ENABLED = os.environ.get("GTASKS_ROUTER", "1") != "0"
+
+# A task title matches a command only with this search score, and this far
+# ahead of the runner-up.
+MIN_TASK_SCORE = 0.6
+MIN_TASK_MARGIN = 0.15
+
+_LIST = r"(?P<list_name>[\w ]+?)"
+_TITLE = r"(?P<title>.+?)"
+
+# (intent, language, pattern). Patterns match the whole command, ignoring case.
+PATTERNS: List[Tuple[str, str, re.Pattern]] = [
+    (intent, language, re.compile(rf"^\s*{pattern}\s*[.!?]*\s*$", re.IGNORECASE))
+    for intent, language, pattern in [
+        ("add", "tr", rf"{_LIST} listeme {_TITLE} (?:ekler misin|ekleyebilir misin|ekle)"),
+        ("add", "tr", rf"{_LIST} listesine {_TITLE} (?:ekler misin|ekleyebilir misin|ekle)"),
+        ("add", "en", rf"(?:please )?add {_TITLE} to (?:my |the )?{_LIST} list"),
+        ("show", "tr", rf"{_LIST} (?:listesini|listemi) (?:göster|gösterir misin|listele)"),
+        ("show", "en", rf"(?:please )?(?:show|list)(?: me)? (?:my |the )?{_LIST} list"),
+        ("complete", "tr", rf"{_LIST} (?:listesindeki|listemdeki) {_TITLE} (?:tamamlandı olarak işaretle|tamamla|bitti olarak işaretle)"),
+        ("complete", "en", rf"(?:please )?(?:mark|check off) {_TITLE} (?:in|on|from) (?:my |the )?{_LIST} list(?: as (?:done|completed?))?"),
+        ("complete", "en", rf"(?:please )?complete {_TITLE} (?:in|on|from) (?:my |the )?{_LIST} list"),
+    ]
+]
+
+REPLIES = {
+    ("add", "tr"): "'{title}' {list} listesine eklendi.",
+    ("add", "en"): "Added '{title}' to {list}.",
+    ("exists", "tr"): "'{title}' zaten {list} listesinde var.",
+    ("exists", "en"): "'{title}' is already on {list}.",
+    ("complete", "tr"): "'{title}' tamamlandı olarak işaretlendi.",
+    ("complete", "en"): "Marked '{title}' as completed.",
+    ("show", "tr"): "{list} listesi:\n{content}",
+    ("show", "en"): "{list}:\n{content}",
+    ("failed", "tr"): "{list} listesi güncellenemedi: {error}",
+    ("failed", "en"): "Could not update {list}: {error}",
+}
+
+
+def match(command: str) -> Optional[Tuple[str, str, dict]]:
+    """``(intent, language, groups)`` of the first pattern matching ``command``, or None."""
+    for intent, language, pattern in PATTERNS:
+        found = pattern.match(command)
+        if found:
+            return intent, language, {key: value.strip() for key, value in found.groupdict().items()}
+    return None
+
+
+def resolve_task_list(name: str) -> Optional[TaskList]:
+    """The task list called ``name`` (case and diacritics aside), if exactly one is."""
+    return get_directory().resolve(name)
+
+
+class Router:
+    """
+    Graph node at ``START`` that answers simple commands without the LLM.
+
+    A handled command leaves the same trace an LLM turn would: an ``AIMessage``
+    with the tool call, its ``ToolMessage`` and a final ``AIMessage``. Commands
+    that fail before a change is made are left to the assistant; a failed
+    change is reported, so the assistant does not make it a second time.
+
+    :param tools: The graph's tools, by name.
+    """
+
+    def __init__(self, tools: list):
+        self.tools = {tool.name: tool for tool in tools}
+
+    def __call__(self, state: dict, config: RunnableConfig) -> dict:
+        last = state["messages"][-1]
+        if not isinstance(last, HumanMessage) or not isinstance(last.content, str):
+            return {}
+        matched = match(last.content)
+        if matched is None:
+            return {}
+
+        intent, language, groups = matched
+        try:
+            messages = getattr(self, f"_{intent}")(config, language, **groups)
+        except Exception:
+            # Tool calls do not raise (see _call), so nothing was changed yet:
+            # the assistant can still handle the command.
+            return {}
+        return {"messages": messages} if messages else {}
+
+    # ---- intents
+
+    def _show(self, config: RunnableConfig, language: str, list_name: str) -> Optional[List[AnyMessage]]:
+        task_list = resolve_task_list(list_name)
+        if task_list is None:
+            return None
+        call, result = self._call(config, "get_tasks", {"task_list_ids": [aliases.alias(task_list.id, prefix="l")]})
+        if result.status == "error":
+            return None
+        reply = REPLIES[("show", language)].format(list=task_list.title, content=result.content)
+        return [call, result, AIMessage(content=reply)]
+
+    def _add(self, config: RunnableConfig, language: str, list_name: str, title: str) -> Optional[List[AnyMessage]]:
+        task_list = resolve_task_list(list_name)
+        if task_list is None:
+            return None
+        # Same rule as the prompt gives the assistant: check before adding.
+        sync_task_lists([task_list.id])
+        existing = self._find(task_list.id, title, exact=True)
+        if existing is not None:
+            reply = REPLIES[("exists", language)].format(title=existing.title, list=task_list.title)
+            return [AIMessage(content=reply)]
+
+        call, result = self._call(
+            config, "upsert_task", {"task_list_id": aliases.alias(task_list.id, prefix="l"), "task": {"title": title}}
+        )
+        if result.status == "error":
+            return self._failed(language, task_list, call, result)
+        reply = REPLIES[("add", language)].format(title=title, list=task_list.title)
+        return [call, result, AIMessage(content=reply)]
+
+    def _complete(self, config: RunnableConfig, language: str, list_name: str, title: str) -> Optional[List[AnyMessage]]:
+        task_list = resolve_task_list(list_name)
+        if task_list is None:
+            return None
+        sync_task_lists([task_list.id])
+        task = self._find(task_list.id, title)
+        if task is None:
+            return None
+
+        call, result = self._call(
+            config,
+            "upsert_task",
+            {"task_list_id": aliases.alias(task_list.id, prefix="l"), "task": {"id": aliases.alias(task.id), "status": "completed"}},
+        )
+        if result.status == "error":
+            return self._failed(language, task_list, call, result)
+        reply = REPLIES[("complete", language)].format(title=task.title)
+        return [call, result, AIMessage(content=reply)]
+
+    # ---- helpers
+
+    @staticmethod
+    def _find(task_list_id: str, title: str, exact: bool = False):
+        """The open task ``title`` refers to, if it is clear which one."""
+        hits = search_tasks(title, [task_list_id], limit=2)
+        if exact:
+            wanted = fold(title).strip()
+            return next((hit.task for hit in hits if fold(hit.task.title or "").strip() == wanted), None)
+        if not hits or hits[0].score < MIN_TASK_SCORE:
+            return None
+        if len(hits) > 1 and hits[0].score - hits[1].score < MIN_TASK_MARGIN:
+            return None
+        return hits[0].task
+
+    def _call(self, config: RunnableConfig, name: str, args: dict) -> Tuple[AIMessage, ToolMessage]:
+        """Run a tool as the assistant would have, a failure making an error ``ToolMessage``."""
+        call = {"name": name, "args": args, "id": f"call_{uuid.uuid4().hex[:24]}", "type": "tool_call"}
+        try:
+            result = self.tools[name].invoke(call, config)
+        except Exception as error:
+            result = tool_error_message(error, call)
+        return AIMessage(content="", tool_calls=[call]), result
+
+    @staticmethod
+    def _failed(language: str, task_list: TaskList, call: AIMessage, result: ToolMessage) -> List[AnyMessage]:
+        # The change may have gone through before the error; the assistant should not guess.
+        error = str(result.content).splitlines()[0].removeprefix("Error: ")
+        reply = REPLIES[("failed", language)].format(list=task_list.title, error=error)
+        return [call, result, AIMessage(content=reply)]
+
+
+def route(state: dict) -> str:
+    """Edge after the router: done if it answered, on to the assistant otherwise."""
+    last = state["messages"][-1]
+    if isinstance(last, AIMessage) and not last.tool_calls:
+        return END
+    return "context"
@@ -0,0 +1,249 @@
+"""
+Replay a corpus of commands through the agent, many conversations at once.
+
+Every line of the input is a JSON record holding one command or a whole
+conversation::
+
+    {"id": "add-1", "command": "alınacak listeme kedi kumu ekler misin?"}
+    {"commands": ["alınacak listesini göster", "kedi kumunu tamamlandı olarak işaretle"]}
+
+Each record runs in its own conversation and produces one output line::
+
+    {"offset": 0, "id": "add-1", "thread_id": "...", "final_message": "...",
+     "tool_calls": [{"name": "search_tasks", "args": {...}}],
+     "latency_ms": 812.4, "usage": {"input_tokens": ..., "output_tokens": ..., "total_tokens": ...}}
+
+A record's optional ``"user"`` field charges its Tasks API requests to that
+user's budget (see ``gtasks.api.rate_limit``).
+
+``offset`` is the line number of the record in the input. Output lines are
+written as records complete, so they are not in input order; ``--resume``
+skips the offsets already in the output file.
+"""
+
+import asyncio
+import json
+import os
+import time
+import uuid
+
+from collections import deque
+from typing import Iterator, Optional, Set, Tuple
+
+from langchain_core.messages import AIMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+from gtasks.api.rate_limit import DEFAULT_USER, as_user, get_limiter
+from gtasks.directory import get_directory
+from gtasks.prefetch import get_prefetcher
+from gtasks.serve import LATENCY_WINDOW, percentile
+
+# Records running at the same time.
+BATCH_WORKERS = int(os.environ.get("GTASKS_BATCH_WORKERS", 8))
+
+USAGE_KEYS = ("input_tokens", "output_tokens", "total_tokens")
+
+# Bytes read at a time from the end of an output file, looking for its last line.
+RESUME_READ_SIZE = 64 * 1024
+
+
+def read_lines(path: str, start: int = 0, limit: Optional[int] = None, skip: Set[int] = frozenset()) -> Iterator[Tuple[int, str]]:
+    """Lazily read ``(offset, line)`` pairs of a JSONL file. Blank lines keep their offset."""
+    with open(path, encoding="utf-8") as lines:
+        for offset, line in enumerate(lines):
+            if limit is not None and offset >= start + limit:
+                break
+            if offset < start or offset in skip or not line.strip():
+                continue
+            yield offset, line
+
+
+def completed_offsets(path: str) -> Set[int]:
+    """Offsets already written to an output file, for resuming."""
+    if not os.path.exists(path):
+        return set()
+    done = set()
+    with open(path, encoding="utf-8") as results:
+        for line in results:
+            try:
+                done.add(json.loads(line)["offset"])
+            except (ValueError, KeyError):
+                # A line cut short by an interrupted run; the record runs again.
+                continue
+    return done
+
+
+def drop_partial_line(path: str):
+    """Cut an output file back to its last complete line, so appended records start on their own."""
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as results:
+        end = results.seek(0, os.SEEK_END)
+        position = end
+        while position > 0:
+            size = min(RESUME_READ_SIZE, position)
+            position -= size
+            results.seek(position)
+            newline = results.read(size).rfind(b"\n")
+            if newline != -1:
+                position += newline + 1
+                break
+        if position != end:
+            results.truncate(position)
+
+
+class BatchRunner:
+    """
+    Runs records on a pool of ``workers`` coroutines.
+
+    Conversations are checkpointed in memory and deleted once their record is
+    written, so memory stays flat however long the input is.
+
+    :param graph: Compiled agent graph. Defaults to one built with a
+        ``MemorySaver``.
+    """
+
+    def __init__(self, graph=None, workers: int = BATCH_WORKERS):
+        if graph is None:
+            from gtasks.app import build_graph
+
+            graph = build_graph(MemorySaver())
+        self.graph = graph
+        self.workers = workers
+        self.run_id = uuid.uuid4().hex[:8]
+        self.records = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.usage = dict.fromkeys(USAGE_KEYS, 0)
+
+    async def run_record(self, offset: int, line: str) -> dict:
+        thread_id = f"batch-{self.run_id}-{offset}"
+        config = {"configurable": {"thread_id": thread_id}}
+        result = {"offset": offset, "id": None, "thread_id": thread_id}
+        tool_calls, usage = [], dict.fromkeys(USAGE_KEYS, 0)
+        final = None
+
+        start = time.perf_counter()
+        try:
+            record = json.loads(line)
+            result["id"] = record.get("id")
+            commands = record.get("commands") or [record["command"]]
+            with as_user(str(record.get("user") or DEFAULT_USER)):
+                for command in commands:
+                    async for update in self.graph.astream(
+                        {"messages": ("user", command)}, config=config, stream_mode="updates"
+                    ):
+                        for message in self._ai_messages(update):
+                            final = message
+                            tool_calls.extend({"name": call["name"], "args": call["args"]} for call in message.tool_calls)
+                            for key in USAGE_KEYS:
+                                usage[key] += (message.usage_metadata or {}).get(key, 0)
+        except Exception as error:
+            result["error"] = repr(error)
+        finally:
+            await self.graph.checkpointer.adelete_thread(thread_id)
+        latency = time.perf_counter() - start
+
+        result.update(
+            final_message=final.content if final is not None else None,
+            tool_calls=tool_calls,
+            latency_ms=round(latency * 1000, 1),
+            usage=usage,
+        )
+        self.records += 1
+        self.latencies.append(latency)
+        self.errors += "error" in result
+        for key in USAGE_KEYS:
+            self.usage[key] += usage[key]
+        return result
+
+    @staticmethod
+    def _ai_messages(update: dict):
+        """AI messages of every node in ``update``: the router answers simple commands itself."""
+        found = []
+        for node_update in update.values():
+            messages = node_update.get("messages") if isinstance(node_update, dict) else None
+            if messages is None:
+                continue
+            if not isinstance(messages, list):
+                messages = [messages]
+            found.extend(message for message in messages if isinstance(message, AIMessage))
+        return found
+
+    async def run(self, records, output):
+        """
+        Run ``(offset, line)`` pairs and write a JSON line per record to ``output``.
+
+        Records are read as workers free up, not all at once.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.workers * 2)
+
+        async def work():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                result = await self.run_record(*item)
+                output.write(json.dumps(result, ensure_ascii=False) + "\n")
+                output.flush()
+
+        workers = [asyncio.create_task(work()) for _ in range(self.workers)]
+        try:
+            for item in records:
+                await queue.put(item)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+    def summary(self, wall: float) -> dict:
+        from gtasks.app import get_response_cache
+
+        p50, p95 = percentile(self.latencies, 0.5), percentile(self.latencies, 0.95)
+        summary = {
+            "records": self.records,
+            "errors": self.errors,
+            "wall_s": round(wall, 2),
+            "records_per_s": round(self.records / max(wall, 1e-9), 2),
+            "p50_ms": None if p50 is None else round(p50 * 1000, 1),
+            "p95_ms": None if p95 is None else round(p95 * 1000, 1),
+            **self.usage,
+        }
+        cache = get_response_cache()
+        if cache is not None:
+            summary["llm_cache"] = cache.metrics()
+        summary["api_quota"] = get_limiter().metrics()
+        summary["prefetch"] = get_prefetcher().metrics()
+        summary["list_directory"] = get_directory().metrics()
+        return summary
+
+
+def run_batch(
+    input_path: str,
+    output_path: str,
+    workers: int = BATCH_WORKERS,
+    start: int = 0,
+    limit: Optional[int] = None,
+    resume: bool = False,
+    graph=None,
+) -> dict:
+    """
+    Run the records of ``input_path`` and write results to ``output_path``.
+
+    :param start: Offset of the first record to run.
+    :param limit: Run at most the records in ``[start, start + limit)``.
+    :param resume: Skip records already in the output file and append to it,
+        instead of overwriting it.
+    :return: Summary of the run.
+    """
+    skip = set()
+    if resume:
+        drop_partial_line(output_path)
+        skip = completed_offsets(output_path)
+    runner = BatchRunner(graph, workers=workers)
+    began = time.perf_counter()
+    with open(output_path, "a" if resume else "w", encoding="utf-8") as output:
+        asyncio.run(runner.run(read_lines(input_path, start, limit, skip), output))
+    return runner.summary(time.perf_counter() - began)
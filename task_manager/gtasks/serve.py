@@ -0,0 +1,247 @@
+"""
+Serve the task agent to many users at once.
+
+Every session is one conversation (one checkpointer thread). Its turns run in
+order on a per-session queue, while turns of different sessions run
+concurrently, at most ``concurrency`` at a time.
+
+The wire protocol is JSON lines over TCP. A client sends::
+
+    {"session": "alice", "message": "alınacak listesini göster"}
+    {"command": "stats"}
+
+and gets one line back per request, in completion order::
+
+    {"session": "alice", "reply": "...", "latency_ms": 812.4}
+"""
+
+import asyncio
+import json
+import os
+import time
+
+from collections import deque
+from typing import Dict, Optional
+
+from gtasks.api.rate_limit import as_user, get_limiter
+from gtasks.directory import get_directory
+from gtasks.prefetch import get_prefetcher
+
+# Turns of different sessions running at the same time.
+SERVE_CONCURRENCY = int(os.environ.get("GTASKS_SERVE_CONCURRENCY", 32))
+
+# Pending turns per session. Reading from a client stops while one of its
+# sessions is this far behind, which pushes back on the client through TCP.
+SESSION_QUEUE_SIZE = 8
+
+# Sessions without a turn for this long release their worker. Their history
+# stays in the checkpointer.
+SESSION_IDLE_TIMEOUT = 300.0
+
+# Seconds between two stats lines printed by a running server.
+STATS_INTERVAL = 30.0
+
+# Latencies kept for the percentiles.
+LATENCY_WINDOW = 10000
+
+
+def percentile(values, fraction: float) -> Optional[float]:
+    """Nearest-rank percentile, None if there are no values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class ServeStats:
+    """Session and turn counters, with a window of recent turn latencies."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.sessions = 0
+        self.turns = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def record(self, latency: float, ok: bool):
+        self.turns += 1
+        self.errors += not ok
+        self.latencies.append(latency)
+
+    def snapshot(self, active_sessions: int = 0) -> dict:
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        p50, p95 = percentile(self.latencies, 0.5), percentile(self.latencies, 0.95)
+        return {
+            "uptime_s": round(elapsed, 1),
+            "sessions": self.sessions,
+            "active_sessions": active_sessions,
+            "sessions_per_s": round(self.sessions / elapsed, 2),
+            "turns": self.turns,
+            "turns_per_s": round(self.turns / elapsed, 2),
+            "errors": self.errors,
+            "p50_ms": None if p50 is None else round(p50 * 1000, 1),
+            "p95_ms": None if p95 is None else round(p95 * 1000, 1),
+        }
+
+
+class _Session:
+    __slots__ = ("id", "queue", "worker")
+
+    def __init__(self, session_id: str, queue_size: int):
+        self.id = session_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.worker: Optional[asyncio.Task] = None
+
+
+class AgentServer:
+    """
+    Runs conversations concurrently over ``graph.astream``.
+
+    :param graph: Compiled agent graph. Defaults to ``app.get_graph()``.
+    :param concurrency: Maximum number of turns running at once.
+    :param queue_size: Maximum number of pending turns per session.
+    """
+
+    def __init__(
+        self,
+        graph=None,
+        concurrency: int = SERVE_CONCURRENCY,
+        queue_size: int = SESSION_QUEUE_SIZE,
+        idle_timeout: float = SESSION_IDLE_TIMEOUT,
+    ):
+        if graph is None:
+            from gtasks.app import get_graph
+
+            graph = get_graph()
+        self.graph = graph
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.idle_timeout = idle_timeout
+        self.stats = ServeStats()
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._sessions: Dict[str, _Session] = {}
+
+    # ---- sessions
+
+    async def enqueue(self, session_id: str, message: str) -> asyncio.Future:
+        """
+        Queue a turn. Waits while the session's queue is full.
+
+        :return: A future resolving to the response dict of the turn.
+        """
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = _Session(session_id, self.queue_size)
+            session.worker = asyncio.create_task(self._work(session))
+            self.stats.sessions += 1
+
+        future = asyncio.get_running_loop().create_future()
+        await session.queue.put((message, future))
+        return future
+
+    async def submit(self, session_id: str, message: str) -> dict:
+        """Run one turn of a session and return its response dict."""
+        return await (await self.enqueue(session_id, message))
+
+    async def _work(self, session: _Session):
+        while True:
+            try:
+                message, future = await asyncio.wait_for(session.queue.get(), self.idle_timeout)
+            except asyncio.TimeoutError:
+                if session.queue.empty():
+                    del self._sessions[session.id]
+                    return
+                continue
+
+            start = time.perf_counter()
+            response = {"session": session.id}
+            try:
+                async with self._semaphore:
+                    response["reply"] = await self._turn(session.id, message)
+            except Exception as error:
+                response["error"] = repr(error)
+            latency = time.perf_counter() - start
+            response["latency_ms"] = round(latency * 1000, 1)
+            self.stats.record(latency, ok="error" not in response)
+            if not future.done():
+                future.set_result(response)
+
+    async def _turn(self, session_id: str, message: str) -> str:
+        config = {"configurable": {"thread_id": session_id}}
+        last = None
+        # Each session has its own Tasks API budget, so one busy client cannot starve the others.
+        with as_user(session_id):
+            async for event in self.graph.astream({"messages": ("user", message)}, config=config, stream_mode="values"):
+                last = event
+        content = last["messages"][-1].content
+        return content if isinstance(content, str) else json.dumps(content, ensure_ascii=False)
+
+    async def close(self):
+        workers = [session.worker for session in self._sessions.values() if session.worker]
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        self._sessions.clear()
+
+    # ---- network
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve one client connection."""
+        write_lock = asyncio.Lock()
+        pending = set()
+
+        async def respond(response):
+            if isinstance(response, asyncio.Future):
+                response = await response
+            async with write_lock:
+                writer.write(json.dumps(response, ensure_ascii=False).encode() + b"\n")
+                await writer.drain()
+
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                    if request.get("command") == "stats":
+                        response = self.snapshot()
+                    else:
+                        response = await self.enqueue(str(request["session"]), str(request["message"]))
+                except (ValueError, KeyError, TypeError, AttributeError) as error:
+                    response = {"error": f"Bad request: {error!r}"}
+
+                task = asyncio.create_task(respond(response))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+
+            await asyncio.gather(*pending, return_exceptions=True)
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8765, stats_interval: float = STATS_INTERVAL):
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"Serving on {host}:{port} with concurrency {self.concurrency}")
+        reporter = asyncio.create_task(self._report(stats_interval))
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            reporter.cancel()
+            await self.close()
+            print(json.dumps(self.snapshot()))
+
+    async def _report(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            print(json.dumps(self.snapshot()))
+
+    def snapshot(self) -> dict:
+        """Serving stats, with the Tasks API limiter's, the prefetcher's, the list directory's and the assistant response cache's if it is enabled."""
+        from gtasks.app import get_response_cache
+
+        snapshot = self.stats.snapshot(len(self._sessions))
+        cache = get_response_cache()
+        if cache is not None:
+            snapshot["llm_cache"] = cache.metrics()
+        snapshot["api_quota"] = get_limiter().metrics()
+        snapshot["prefetch"] = get_prefetcher().metrics()
+        snapshot["list_directory"] = get_directory().metrics()
+        return snapshot
@@ -2,3 +2,5 @@
 from .get_task_lists import GetTaskLists
 from .upsert_task import UpsertTask
 from .get_tasks import GetTasks
+from .search_tasks import SearchTasks
+from .bulk_task_ops import BulkTaskOps
@@ -0,0 +1,222 @@
+from langchain_community.tools import BaseTool
+from langchain_core.callbacks import AsyncCallbackManagerForToolRun
+from pydantic import BaseModel, Field
+from typing import Literal, Type, Tuple, Optional
+
+from gtasks.api import aupsert_task, amove_task, adelete_task
+from gtasks.api import gtasks_api
+from gtasks.api.batch import TasksBatch, _single
+from gtasks.api.cache import get_store
+from gtasks.tools.upsert_task import Task
+from gtasks.tools.compact import aliases, _task_line
+
+import asyncio
+
+
+class TaskOperation(BaseModel):
+    """One change in a bulk_task_ops call."""
+
+    op: Literal["create", "patch", "complete", "move", "delete"] = Field(
+        ...,
+        description=(
+            "create: add a task. patch: change title, notes, due or status. "
+            "complete: mark done. move: reparent, reorder or move to another list. "
+            "delete: remove the task and its subtasks."
+        ),
+    )
+    task_list_id: str = Field(..., description="Task list ID the task is (or, for create, will be) in.")
+    task_id: Optional[str] = Field(None, description="Task ID. Required for every operation but create.")
+    title: Optional[str] = Field(None, description="create, patch: title of the task.")
+    notes: Optional[str] = Field(None, description="create, patch: notes of the task.")
+    due: Optional[str] = Field(None, description="create, patch: due date (RFC 3339 timestamp).")
+    status: Optional[Literal["needsAction", "completed"]] = Field(None, description="patch: new status.")
+    parent: Optional[str] = Field(
+        None, description="create, move: parent task ID. Omit for a top-level task."
+    )
+    previous: Optional[str] = Field(
+        None, description="create, move: sibling task ID to place the task after. Omit to place it first."
+    )
+    destination_task_list_id: Optional[str] = Field(None, description="move: task list ID to move the task to.")
+
+
+class BulkTaskOpsModel(BaseModel):
+    """Input for the Bulk Task Operations tool."""
+
+    operations: list[TaskOperation] = Field(
+        ...,
+        description="Operations to run. They are independent of each other and run together, in no particular order.",
+    )
+
+
+class BulkTaskOps(BaseTool):
+    """Tool that applies many task changes in one call, as one batch of API requests.
+
+    Instantiate:
+
+      .. code-block:: python
+
+        from task_manager.gtasks import BulkTaskOps
+
+        tool = BulkTaskOps()
+
+    Invoke directly with args:
+
+      .. code-block:: python
+
+        tool.invoke({"operations": [
+            {"op": "create", "task_list_id": "l1", "title": "kedi kumu"},
+            {"op": "complete", "task_list_id": "l1", "task_id": "t3"},
+        ]})
+
+    """  # noqa: E501
+
+    name: str = "bulk_task_ops"
+    args_schema: Type[BaseModel] = BulkTaskOpsModel
+    description: str = (
+        "Create, update, complete, move or delete several tasks in one call. "
+        "Use this instead of repeated upsert_task calls whenever more than one "
+        "task changes. Reports the result of each operation."
+    )
+    return_direct: bool = True
+    response_format: Literal["content", "content_and_artifact"] = "content_and_artifact"
+
+    def _run(
+        self,
+        operations: list[TaskOperation],
+        run_manager: Optional[AsyncCallbackManagerForToolRun] = None,
+    ) -> Tuple[str, list]:
+        """Run the operations as batched API requests."""
+        operations = [self._resolve(operation) for operation in operations]
+        results = [self._check(operation) for operation in operations]
+
+        batch = TasksBatch()
+        for index, operation in enumerate(operations):
+            if results[index] is not None:
+                continue
+            key = str(index)
+            if operation.op == "move":
+                batch.move_task(
+                    operation.task_list_id,
+                    operation.task_id,
+                    operation.parent,
+                    operation.previous,
+                    operation.destination_task_list_id,
+                    key=key,
+                )
+            elif operation.op == "delete":
+                batch.delete_task(operation.task_list_id, operation.task_id, key=key)
+            else:
+                batch.upsert_task(operation.task_list_id, self._task(operation), key=key, previous=operation.previous)
+
+        if len(batch):
+            for key, result in batch.execute().items():
+                index = int(key)
+                operation = operations[index]
+                if result.status == 412:
+                    # The task changed on the server since it was stored.
+                    result = _single(key, lambda: gtasks_api._patch_task(operation.task_list_id, self._task(operation), stale=True))
+                if result.ok:
+                    self._store(operation, result.value)
+                results[index] = (result.value, result.error)
+
+        return self._format(operations, results)
+
+    async def _arun(
+        self,
+        operations: list[TaskOperation],
+        run_manager: Optional[AsyncCallbackManagerForToolRun] = None,
+    ) -> Tuple[str, list]:
+        """Use the tool asynchronously."""
+        operations = [self._resolve(operation) for operation in operations]
+
+        async def run(operation: TaskOperation):
+            problem = self._check(operation)
+            if problem is not None:
+                return problem
+            try:
+                if operation.op == "move":
+                    value = await amove_task(
+                        operation.task_list_id,
+                        operation.task_id,
+                        operation.parent,
+                        operation.previous,
+                        operation.destination_task_list_id,
+                    )
+                elif operation.op == "delete":
+                    value = await adelete_task(operation.task_list_id, operation.task_id)
+                else:
+                    value = await aupsert_task(operation.task_list_id, self._task(operation), operation.previous)
+            except Exception as error:
+                return None, str(error)
+            return value, None
+
+        results = await asyncio.gather(*(run(operation) for operation in operations))
+        return self._format(operations, results)
+
+    # ---- helpers
+
+    @staticmethod
+    def _resolve(operation: TaskOperation) -> TaskOperation:
+        """Swap short ids printed by the other tools for the real ones."""
+        return operation.model_copy(
+            update={
+                field: aliases.resolve(getattr(operation, field))
+                for field in ("task_list_id", "task_id", "parent", "previous", "destination_task_list_id")
+            }
+        )
+
+    @staticmethod
+    def _check(operation: TaskOperation) -> Optional[Tuple[None, str]]:
+        """An error result for an operation that cannot be sent, None if it can."""
+        if operation.op == "create" and not operation.title:
+            return None, "create needs a title."
+        if operation.op != "create" and not operation.task_id:
+            return None, f"{operation.op} needs a task_id."
+        return None
+
+    @staticmethod
+    def _task(operation: TaskOperation) -> Task:
+        """Body of the create or patch request for ``operation``. Unset fields are left out."""
+        fields = dict(
+            id=operation.task_id,
+            title=operation.title,
+            notes=operation.notes,
+            due=operation.due,
+            parent=operation.parent if operation.op == "create" else None,
+        )
+        # status is passed even when None: its default would reopen patched tasks.
+        status = "completed" if operation.op == "complete" else operation.status
+        return Task(status=status, **{key: value for key, value in fields.items() if value is not None})
+
+    @staticmethod
+    def _store(operation: TaskOperation, value):
+        """Write a batched result through to the store, as the single-task functions do."""
+        if operation.op == "move":
+            gtasks_api._store_move(operation.task_list_id, operation.task_id, value, operation.destination_task_list_id)
+        elif operation.op == "delete":
+            gtasks_api._store_delete(operation.task_list_id, operation.task_id)
+        else:
+            get_store().put_task(operation.task_list_id, value)
+
+    @staticmethod
+    def _format(operations: list[TaskOperation], results: list) -> Tuple[str, list]:
+        lines, artifact = [], []
+        for index, (operation, (value, error)) in enumerate(zip(operations, results), start=1):
+            if error is not None:
+                lines.append(f"{index}. {operation.op} failed: {error}")
+            elif value is None:
+                lines.append(f"{index}. {operation.op} ok: {aliases.alias(operation.task_id)}")
+            else:
+                lines.append(f"{index}. {operation.op} ok: {_task_line(value, 0, include_notes=False)[2:]}")
+            artifact.append(
+                {
+                    "op": operation.op,
+                    "task_list_id": operation.destination_task_list_id or operation.task_list_id,
+                    "id": value.id if value is not None else operation.task_id,
+                    "error": error,
+                }
+            )
+
+        failed = sum(item["error"] is not None for item in artifact)
+        lines.insert(0, f"{len(operations) - failed} of {len(operations)} operations succeeded.")
+        return "\n".join(lines), artifact
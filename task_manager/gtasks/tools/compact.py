@@ -0,0 +1,240 @@
+import contextvars
+import threading
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Iterable, Iterator, List, Optional
+
+from gtasks.api.typing import Task, TaskStatus
+
+# Rough size of a token for the mixed Turkish/English text of task titles.
+CHARS_PER_TOKEN = 4
+
+# Default per-call budget for compact tool output.
+DEFAULT_MAX_TOKENS = 1500
+
+# Notes are cut to this many characters in compact output.
+MAX_NOTES_LENGTH = 80
+
+# Ids aliased per conversation, and conversations with an alias table. The
+# least recently used go first; a forgotten alias is never handed out again.
+ALIAS_TABLE_SIZE = 5000
+MAX_ALIAS_TABLES = 1000
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+class IdAliases:
+    """
+    Short, stable aliases (``l1``, ``t42``) for task list and task ids.
+
+    Real ids are 20+ characters of base64 and cost several tokens each. Tools
+    print aliases instead and resolve them back when the model passes them in.
+
+    :param size: Ids kept. Numbers are not reused, so an alias that was
+        forgotten resolves to nothing rather than to another task.
+    """
+
+    def __init__(self, size: int = ALIAS_TABLE_SIZE):
+        self.size = size
+        self._lock = threading.Lock()
+        self._by_id: "OrderedDict[str, str]" = OrderedDict()
+        self._by_alias = {}
+        self._counts = {}
+
+    def alias(self, real_id: str, prefix: str = "t") -> str:
+        with self._lock:
+            alias = self._by_id.get(real_id)
+            if alias is None:
+                self._counts[prefix] = self._counts.get(prefix, 0) + 1
+                alias = f"{prefix}{self._counts[prefix]}"
+                self._by_id[real_id] = alias
+                self._by_alias[alias] = real_id
+                while len(self._by_id) > self.size:
+                    _, forgotten = self._by_id.popitem(last=False)
+                    del self._by_alias[forgotten]
+            else:
+                self._by_id.move_to_end(real_id)
+            return alias
+
+    def clear(self):
+        """Forget every alias, so numbering starts again from l1 and t1."""
+        with self._lock:
+            self._by_id.clear()
+            self._by_alias.clear()
+            self._counts.clear()
+
+    def resolve(self, value: Optional[str]) -> Optional[str]:
+        """Real id for an alias. Anything else, including real ids, is returned as is."""
+        if value is None:
+            return None
+        with self._lock:
+            return self._by_alias.get(value.strip(), value)
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+
+class _AliasTables:
+    """Alias tables by conversation, keeping the ``MAX_ALIAS_TABLES`` most recently used."""
+
+    def __init__(self, size: int = MAX_ALIAS_TABLES):
+        self.size = size
+        self._lock = threading.Lock()
+        self._tables: "OrderedDict[str, IdAliases]" = OrderedDict()
+
+    def get(self, conversation: str) -> IdAliases:
+        with self._lock:
+            table = self._tables.get(conversation)
+            if table is None:
+                table = self._tables[conversation] = IdAliases()
+                while len(self._tables) > self.size:
+                    self._tables.popitem(last=False)
+            else:
+                self._tables.move_to_end(conversation)
+            return table
+
+    def clear(self):
+        with self._lock:
+            self._tables.clear()
+
+
+_tables = _AliasTables()
+# Table of code running outside any conversation (scripts, benchmarks).
+_shared = IdAliases()
+_current: contextvars.ContextVar[Optional[IdAliases]] = contextvars.ContextVar("gtasks_aliases", default=None)
+
+
+@contextmanager
+def use_aliases(conversation: Optional[str]) -> Iterator[IdAliases]:
+    """Alias ids inside the block with the table of ``conversation`` (a thread id)."""
+    table = _tables.get(conversation) if conversation else _shared
+    token = _current.set(table)
+    try:
+        yield table
+    finally:
+        _current.reset(token)
+
+
+def current_aliases() -> IdAliases:
+    table = _current.get()
+    return table if table is not None else _shared
+
+
+def clear_aliases():
+    """Forget the aliases of every conversation."""
+    _tables.clear()
+    _shared.clear()
+
+
+class _CurrentAliases:
+    """``IdAliases`` of the conversation being served (see ``use_aliases``)."""
+
+    def alias(self, real_id: str, prefix: str = "t") -> str:
+        return current_aliases().alias(real_id, prefix)
+
+    def resolve(self, value: Optional[str]) -> Optional[str]:
+        return current_aliases().resolve(value)
+
+    def clear(self):
+        current_aliases().clear()
+
+
+aliases = _CurrentAliases()
+
+
+def _task_line(task: Task, depth: int, include_notes: bool) -> str:
+    line = "  " * depth + "- "
+    if task.status == TaskStatus.completed:
+        line += "[x] "
+    line += f"{aliases.alias(task.id)} {task.title or ''}".rstrip()
+    if task.due:
+        line += f" (due {task.due[:10]})"
+    notes = (task.notes or "").strip()
+    if include_notes and notes:
+        notes = " ".join(notes.split())
+        if len(notes) > MAX_NOTES_LENGTH:
+            notes = notes[: MAX_NOTES_LENGTH - 1] + "…"
+        line += f" | {notes}"
+    return line
+
+
+def render_compact(
+    task_lists: Iterable[dict],
+    include_notes: bool = False,
+    include_completed: bool = False,
+    max_tokens: int = DEFAULT_MAX_TOKENS,
+) -> str:
+    """
+    Render task lists as terse, indented lines with aliased ids.
+
+    ::
+
+        # alınacak [l1] 2 open, 1 completed elided
+        - t1 kedi kumu
+          - t2 büyük boy
+        - t3 süt
+
+    Completed tasks are elided unless ``include_completed``; their open
+    subtasks move up to the completed task's level. Output stops at
+    ``max_tokens`` with a line saying how many tasks were left out.
+
+    :param task_lists: ``{"id", "title", "items"}`` dicts, with ``items`` the
+        ``TaskNode`` list returned by ``build_task_hierarchy`` (or ``{"id",
+        "error"}`` dicts).
+    """
+    lines: List[str] = []
+    used = 0
+    omitted = 0
+    budget_exhausted = False
+
+    def emit(line: str) -> bool:
+        nonlocal used, budget_exhausted
+        cost = estimate_tokens(line) + 1
+        if budget_exhausted or used + cost > max_tokens:
+            budget_exhausted = True
+            return False
+        lines.append(line)
+        used += cost
+        return True
+
+    for task_list in task_lists:
+        list_alias = aliases.alias(task_list["id"], prefix="l")
+        if "error" in task_list:
+            emit(f"# [{list_alias}] error: {task_list['error']}")
+            continue
+
+        # Depth-first, without recursion. Siblings are pushed in reverse so
+        # that they pop in their original order.
+        stack = [(node, 0) for node in reversed(task_list["items"])]
+        total = open_count = 0
+        visible = []
+        while stack:
+            node, depth = stack.pop()
+            total += 1
+            completed = node.task.status == TaskStatus.completed
+            if completed and not include_completed:
+                stack.extend((child, depth) for child in reversed(node.children))
+                continue
+            open_count += not completed
+            visible.append((node.task, depth))
+            stack.extend((child, depth + 1) for child in reversed(node.children))
+
+        elided = total - len(visible)
+        header = f"# {task_list['title']} [{list_alias}] {open_count} open"
+        if elided:
+            header += f", {elided} completed elided"
+        if not emit(header):
+            omitted += len(visible)
+            continue
+
+        for index, (task, depth) in enumerate(visible):
+            if not emit(_task_line(task, depth, include_notes)):
+                omitted += len(visible) - index
+                break
+
+    if omitted:
+        lines.append(f"... {omitted} tasks omitted to stay within the token budget.")
+    return "\n".join(lines)
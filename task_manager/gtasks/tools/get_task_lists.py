@@ -3,7 +3,7 @@ from langchain_core.callbacks import AsyncCallbackManagerForToolRun
 from pydantic import BaseModel, Field
 from typing import Type, Tuple, Optional
 
-from gtasks.api import get_task_lists
+from gtasks.api import iter_task_lists, aiter_task_lists
 
 
 class GetTaskListsModel(BaseModel):
@@ -47,7 +47,7 @@ class GetTaskLists(BaseTool):
 
     name: str = "get_task_lists"
     args_schema: Type[BaseModel] = GetTaskListsModel
-    description = "Get all task lists."
+    description: str = "Get all task lists."
     return_direct: bool = True
 
     def _run(
@@ -55,7 +55,7 @@ class GetTaskLists(BaseTool):
         run_manager: Optional[AsyncCallbackManagerForToolRun] = None,
     ) -> Tuple[dict, dict]:
         """Retrieve all task lists."""
-        raw_results = get_task_lists()
+        raw_results = list(iter_task_lists())
         return raw_results
 
     async def _arun(
@@ -63,4 +63,4 @@ class GetTaskLists(BaseTool):
         run_manager: Optional[AsyncCallbackManagerForToolRun] = None,
     ) -> str:
         """Use the tool asynchronously."""
-        return self._run(run_manager=run_manager.get_sync())
+        return [task_list async for task_list in aiter_task_lists()]
@@ -1,12 +1,18 @@
 from langchain_community.tools import BaseTool
 from langchain_core.callbacks import AsyncCallbackManagerForToolRun
 from pydantic import BaseModel, Field
-from typing import Type, Tuple, Optional
+from typing import Literal, Type, Tuple, Optional
 
-from gtasks.api import get_task_lists, get_task_list, get_tasks
+from gtasks.api import iter_task_lists, get_cached_task_list, get_cached_tasks, sync_task_lists, query_tasks
+from gtasks.api import aiter_task_lists, aget_cached_task_list, aget_cached_tasks, aquery_tasks
+from gtasks.api.batch import MAX_BATCH_SIZE, chunks
+from gtasks.api.cache import get_store
 from gtasks.api.typing import Task
-from gtasks.api.utils import build_task_hierarchy, build_yaml_task_hierarchy
+from gtasks.api.utils import build_task_hierarchy, build_yaml_task_hierarchy, filter_tasks
+from gtasks.prefetch import get_prefetcher
+from gtasks.tools.compact import DEFAULT_MAX_TOKENS, aliases, render_compact
 
+import asyncio
 import json
 
 
@@ -16,7 +22,27 @@ class GetTasksModel(BaseModel):
     # optional task list ids to retrieve
     task_list_ids: Optional[list[str]] = Field(
         None,
-        description="Task list IDs to retrieve. This is optional. If not provided, first 5 task lists will be retrieved.",
+        description="Task list IDs to retrieve. This is optional. If not provided, all task lists will be retrieved.",
+    )
+    include_notes: bool = Field(
+        False,
+        description="Include task notes. Only ask for them if they are needed.",
+    )
+    include_completed: bool = Field(
+        False,
+        description="Include completed tasks.",
+    )
+    due_min: Optional[str] = Field(
+        None,
+        description="Only tasks due on or after this date (YYYY-MM-DD or RFC 3339 timestamp).",
+    )
+    due_max: Optional[str] = Field(
+        None,
+        description="Only tasks due before this date (YYYY-MM-DD or RFC 3339 timestamp).",
+    )
+    completed_min: Optional[str] = Field(
+        None,
+        description="Only tasks completed on or after this date (YYYY-MM-DD or RFC 3339 timestamp).",
     )
 
 
@@ -72,49 +98,176 @@ class GetTasks(BaseTool):
 
     name: str = "get_tasks"
     args_schema: Type[BaseModel] = GetTasksModel
-    description = "Get tasks in a list or all tasks in lists with given ids."
+    description: str = (
+        "Get tasks in a list or all tasks in lists with given ids. "
+        "Use due_min, due_max and completed_min for questions about dates, "
+        "such as what is due this week. "
+        "Lists and tasks are shown with short ids like l1 and t1, which can be "
+        "passed to the other tools as they are."
+    )
     return_direct: bool = True
+    response_format: Literal["content", "content_and_artifact"] = "content_and_artifact"
+
+    # "compact" renders terse lines with aliased ids, "json" the full hierarchy.
+    output_format: Literal["compact", "json"] = "compact"
+    # Hard limit on the size of compact output, in estimated tokens.
+    max_tokens: int = DEFAULT_MAX_TOKENS
 
     def _run(
         self,
         task_list_ids: Optional[list[str]] = None,
+        include_notes: bool = False,
+        include_completed: bool = False,
+        due_min: Optional[str] = None,
+        due_max: Optional[str] = None,
+        completed_min: Optional[str] = None,
         run_manager: Optional[AsyncCallbackManagerForToolRun] = None,
     ) -> Tuple[dict, dict]:
         """Retrieve all task lists."""
-        task_lists_ids: list[str] = task_list_ids or list(
-            map(lambda it: it.id, get_task_lists().items)
-        )
-
-        if not task_lists_ids:
-            return "No task lists found.", {}
-
-        if not isinstance(task_lists_ids, list):
+        if task_list_ids is not None and not isinstance(task_list_ids, list):
             raise ValueError("Task lists must be a list.")
 
-        task_lists: list[TaskListResponse] = []
-        for task_list_id in task_lists_ids:
-            task_list = get_task_list(task_list_id)
-            tasks = get_tasks(task_list_id)
-
-            hierarchical_tasks = build_task_hierarchy(tasks)
-            yaml_tasks = build_yaml_task_hierarchy(hierarchical_tasks)
-
-            task_lists.append(
-                {
-                    "id": task_list_id,
-                    "title": task_list.title,
-                    "items": yaml_tasks,
-                }
-            )
+        # Lists are paged in lazily, so only one list's tasks are held at a time.
+        task_lists_ids = (
+            [aliases.resolve(it) for it in task_list_ids]
+            if task_list_ids
+            else map(lambda it: it.id, iter_task_lists())
+        )
+        show_completed = self._show_completed(include_completed)
+        filters = self._filters(due_min, due_max, completed_min)
 
-        return json.dumps(task_lists), task_lists
+        task_lists: list[TaskListResponse] = []
+        for chunk in chunks(task_lists_ids, MAX_BATCH_SIZE):
+            # Lists the prefetch node started syncing while the LLM ran.
+            get_prefetcher().claim(chunk)
+            queried = self._queried(chunk, filters)
+            # One batched round trip brings every other list of the chunk up to date.
+            errors = sync_task_lists([task_list_id for task_list_id in chunk if task_list_id not in queried])
+
+            for task_list_id in chunk:
+                if task_list_id in errors:
+                    task_lists.append({"id": task_list_id, "error": errors[task_list_id]})
+                    continue
+
+                try:
+                    task_list = get_cached_task_list(task_list_id)
+                    if task_list_id in queried:
+                        items = query_tasks(task_list_id, showCompleted=include_completed, **filters)
+                    else:
+                        tasks = get_cached_tasks(task_list_id, showCompleted=show_completed, max_age=None)
+                        items = filter_tasks(tasks.items or [], **filters)
+                except Exception as error:
+                    task_lists.append({"id": task_list_id, "error": str(error)})
+                    continue
+                task_lists.append(self._hierarchy(task_list_id, task_list.title, items))
+
+        return self._format(task_lists, include_notes, include_completed)
 
     async def _arun(
         self,
         task_list_ids: Optional[list[str]] = None,
+        include_notes: bool = False,
+        include_completed: bool = False,
+        due_min: Optional[str] = None,
+        due_max: Optional[str] = None,
+        completed_min: Optional[str] = None,
         run_manager: Optional[AsyncCallbackManagerForToolRun] = None,
     ) -> str:
         """Use the tool asynchronously."""
-        return self._run(
-            task_list_ids=task_list_ids, run_manager=run_manager.get_sync()
+        if task_list_ids is not None and not isinstance(task_list_ids, list):
+            raise ValueError("Task lists must be a list.")
+
+        task_lists_ids = (
+            [aliases.resolve(it) for it in task_list_ids]
+            if task_list_ids
+            else [it.id async for it in aiter_task_lists()]
+        )
+        show_completed = self._show_completed(include_completed)
+        filters = self._filters(due_min, due_max, completed_min)
+        await get_prefetcher().aclaim(task_lists_ids)
+        queried = self._queried(task_lists_ids, filters)
+
+        # All lists are fetched concurrently over the pooled async client.
+        results = await asyncio.gather(
+            *(
+                self._aload(task_list_id, show_completed, include_completed, filters, task_list_id in queried)
+                for task_list_id in task_lists_ids
+            ),
+            return_exceptions=True,
         )
+
+        task_lists: list[TaskListResponse] = [
+            {"id": task_list_id, "error": str(result)} if isinstance(result, Exception) else result
+            for task_list_id, result in zip(task_lists_ids, results)
+        ]
+
+        return self._format(task_lists, include_notes, include_completed)
+
+    async def _aload(
+        self, task_list_id: str, show_completed: bool, include_completed: bool, filters: dict, query: bool
+    ) -> dict:
+        if query:
+            task_list, items = await asyncio.gather(
+                aget_cached_task_list(task_list_id),
+                aquery_tasks(task_list_id, showCompleted=include_completed, **filters),
+            )
+        else:
+            task_list, tasks = await asyncio.gather(
+                aget_cached_task_list(task_list_id),
+                aget_cached_tasks(task_list_id, showCompleted=show_completed),
+            )
+            items = filter_tasks(tasks.items or [], **filters)
+        return self._hierarchy(task_list_id, task_list.title, items)
+
+    @staticmethod
+    def _filters(due_min: Optional[str], due_max: Optional[str], completed_min: Optional[str]) -> dict:
+        filters = dict(dueMin=due_min, dueMax=due_max, completedMin=completed_min)
+        return {key: value for key, value in filters.items() if value}
+
+    @staticmethod
+    def _queried(task_list_ids, filters: dict) -> set:
+        """
+        Lists a filtered read leaves to the server. A list that was never
+        synced is not downloaded whole for a filtered question: the server
+        filters it and sends only the fields shown, without the completed
+        tasks unless they are asked for, so their elided count is not shown.
+        Synced lists are filtered locally after a delta sync.
+        """
+        if not filters:
+            return set()
+        store = get_store()
+        return {task_list_id for task_list_id in task_list_ids if store.get_sync_state(task_list_id) is None}
+
+    def _show_completed(self, include_completed: bool) -> bool:
+        # Compact output counts the completed tasks it elides, so it always
+        # needs them from the local store. Queried lists do without the count.
+        return include_completed or self.output_format == "compact"
+
+    @staticmethod
+    def _hierarchy(task_list_id: str, title: str, items: list) -> dict:
+        return {
+            "id": task_list_id,
+            "title": title,
+            "items": build_task_hierarchy(items),
+        }
+
+    def _format(self, task_lists: list[dict], include_notes: bool, include_completed: bool) -> Tuple[str, list]:
+        if not task_lists:
+            return "No task lists found.", []
+
+        # Plain dicts for the artifact, which ends up in the checkpointed state.
+        plain_task_lists = [
+            task_list if "error" in task_list else {**task_list, "items": build_yaml_task_hierarchy(task_list["items"])}
+            for task_list in task_lists
+        ]
+
+        if self.output_format == "compact":
+            content = render_compact(
+                task_lists,
+                include_notes=include_notes,
+                include_completed=include_completed,
+                max_tokens=self.max_tokens,
+            )
+            return content, plain_task_lists
+
+        return json.dumps(plain_task_lists), plain_task_lists
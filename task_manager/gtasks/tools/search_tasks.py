@@ -0,0 +1,136 @@
+from langchain_community.tools import BaseTool
+from langchain_core.callbacks import AsyncCallbackManagerForToolRun
+from pydantic import BaseModel, Field
+from typing import Literal, Type, Tuple, Optional
+
+from gtasks.api import iter_task_lists, aiter_task_lists, async_sync_tasks, aget_cached_task_list, get_cached_task_list, sync_task_lists
+from gtasks.api import SearchHit, search_tasks
+from gtasks.api.batch import MAX_BATCH_SIZE, chunks
+from gtasks.tools.compact import aliases, _task_line
+
+import asyncio
+
+
+class SearchTasksModel(BaseModel):
+    """Input for the Search Tasks tool."""
+
+    query: str = Field(
+        ...,
+        description="Words to look for in task titles and notes, e.g. 'kedi kumu'. Spelling and case do not need to be exact.",
+    )
+    task_list_ids: Optional[list[str]] = Field(
+        None,
+        description="Task list IDs to search. This is optional. If not provided, all task lists are searched.",
+    )
+    include_completed: bool = Field(
+        False,
+        description="Also match completed tasks.",
+    )
+    limit: int = Field(
+        5,
+        description="Maximum number of matches to return.",
+    )
+
+
+class SearchTasks(BaseTool):
+    """Tool that finds tasks by title or notes across task lists.
+
+    Instantiate:
+
+      .. code-block:: python
+
+        from task_manager.gtasks import SearchTasks
+
+        tool = SearchTasks()
+
+    Invoke directly with args:
+
+      .. code-block:: python
+
+        tool.invoke({ "query": "kedi kumu" })
+
+    """  # noqa: E501
+
+    name: str = "search_tasks"
+    args_schema: Type[BaseModel] = SearchTasksModel
+    description: str = (
+        "Find tasks by title or notes across all task lists. Use this to check "
+        "whether a task exists before adding or editing it, instead of getting "
+        "whole lists. Returns the best matches with their list."
+    )
+    return_direct: bool = True
+    response_format: Literal["content", "content_and_artifact"] = "content_and_artifact"
+
+    def _run(
+        self,
+        query: str,
+        task_list_ids: Optional[list[str]] = None,
+        include_completed: bool = False,
+        limit: int = 5,
+        run_manager: Optional[AsyncCallbackManagerForToolRun] = None,
+    ) -> Tuple[str, list]:
+        """Search tasks."""
+        task_lists_ids = (
+            [aliases.resolve(it) for it in task_list_ids]
+            if task_list_ids
+            else [it.id for it in iter_task_lists()]
+        )
+
+        errors = {}
+        for chunk in chunks(task_lists_ids, MAX_BATCH_SIZE):
+            errors.update(sync_task_lists(chunk))
+
+        hits = search_tasks(query, task_lists_ids, limit=limit, include_completed=include_completed)
+        titles = {task_list_id: get_cached_task_list(task_list_id).title for task_list_id in self._hit_lists(hits)}
+        return self._format(query, hits, errors, titles)
+
+    async def _arun(
+        self,
+        query: str,
+        task_list_ids: Optional[list[str]] = None,
+        include_completed: bool = False,
+        limit: int = 5,
+        run_manager: Optional[AsyncCallbackManagerForToolRun] = None,
+    ) -> Tuple[str, list]:
+        """Use the tool asynchronously."""
+        task_lists_ids = (
+            [aliases.resolve(it) for it in task_list_ids]
+            if task_list_ids
+            else [it.id async for it in aiter_task_lists()]
+        )
+
+        results = await asyncio.gather(
+            *(async_sync_tasks(task_list_id) for task_list_id in task_lists_ids),
+            return_exceptions=True,
+        )
+        errors = {
+            task_list_id: str(result)
+            for task_list_id, result in zip(task_lists_ids, results)
+            if isinstance(result, Exception)
+        }
+
+        hits = search_tasks(query, task_lists_ids, limit=limit, include_completed=include_completed)
+        hit_lists = self._hit_lists(hits)
+        task_lists = await asyncio.gather(*(aget_cached_task_list(task_list_id) for task_list_id in hit_lists))
+        titles = {task_list_id: task_list.title for task_list_id, task_list in zip(hit_lists, task_lists)}
+        return self._format(query, hits, errors, titles)
+
+    @staticmethod
+    def _hit_lists(hits: list[SearchHit]) -> list[str]:
+        return list(dict.fromkeys(hit.task_list_id for hit in hits))
+
+    @staticmethod
+    def _format(query: str, hits: list[SearchHit], errors: dict, titles: dict) -> Tuple[str, list]:
+        lines = [f"# [{aliases.alias(task_list_id, prefix='l')}] error: {error}" for task_list_id, error in errors.items()]
+        if not hits:
+            lines.append(f"No tasks match '{query}'.")
+
+        for hit in hits:
+            list_alias = aliases.alias(hit.task_list_id, prefix="l")
+            lines.append(f"{_task_line(hit.task, 0, include_notes=True)} (in {titles[hit.task_list_id]} [{list_alias}])")
+
+        artifact = [
+            {"task_list_id": hit.task_list_id, "id": hit.task.id, "title": hit.task.title, "score": hit.score}
+            for hit in hits
+        ]
+        return "\n".join(lines), artifact
@@ -2,10 +2,11 @@ from langchain_community.tools import BaseTool
 from langchain_core.callbacks import AsyncCallbackManagerForToolRun
 from pydantic import BaseModel, Field
 
-from typing import Type, Tuple, Optional
+from typing import Literal, Type, Tuple, Optional
 # from gtasks.api.typing import Task
 
-from gtasks.api import upsert_task
+from gtasks.api import upsert_task, aupsert_task
+from gtasks.tools.compact import aliases, _task_line
 
 from enum import Enum
 
@@ -67,25 +68,43 @@ class UpsertTask(BaseTool):
 
     name: str = "upsert_task"
     args_schema: Type[BaseModel] = UpsertTaskModel
-    description = "Create or update a task in a specified task list."
+    description: str = (
+        "Create or update a task in a specified task list. When updating, pass "
+        "the task id and only the fields to change; other fields are kept."
+    )
     return_direct: bool = True
+    response_format: Literal["content", "content_and_artifact"] = "content_and_artifact"
 
     def _run(
         self,
         task_list_id: Optional[str],
         task: Task,
         run_manager: Optional[AsyncCallbackManagerForToolRun] = None,
-    ) -> Tuple[dict, dict]:
+    ) -> Tuple[str, dict]:
         """Create or update a task in a specified task list."""
-        raw_results = upsert_task(task_list_id, task)
-        return raw_results
+        task_list_id, task = self._resolve(task_list_id, task)
+        return self._format(task_list_id, task, upsert_task(task_list_id, task))
     
-    def _arun(
+    async def _arun(
         self,
         task_list_id: Optional[str],
         task: Task,
         run_manager: Optional[AsyncCallbackManagerForToolRun] = None,
-    ) -> str:
+    ) -> Tuple[str, dict]:
         """Use the tool asynchronously."""
-
-        return self._run(task_list_id=task_list_id, task=task, run_manager=run_manager.get_sync())
+        task_list_id, task = self._resolve(task_list_id, task)
+        return self._format(task_list_id, task, await aupsert_task(task_list_id, task))
+
+    @staticmethod
+    def _resolve(task_list_id: Optional[str], task: Task) -> Tuple[Optional[str], Task]:
+        """Swap short ids printed by get_tasks for the real ones."""
+        task = task.model_copy(update={"id": aliases.resolve(task.id), "parent": aliases.resolve(task.parent)})
+        return aliases.resolve(task_list_id), task
+
+    @staticmethod
+    def _format(task_list_id: Optional[str], task: Task, result) -> Tuple[str, dict]:
+        """One aliased line, as get_tasks prints it, instead of the raw task."""
+        line = f"{'Updated' if task.id else 'Created'}: {_task_line(result, 0, include_notes=True)[2:]}"
+        if task_list_id:
+            line += f" (in [{aliases.alias(task_list_id, prefix='l')}])"
+        return line, {"task_list_id": task_list_id, "id": result.id, "title": result.title}
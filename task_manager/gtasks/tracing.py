@@ -0,0 +1,325 @@
+"""
+Per-turn tracing of graph nodes, LLM calls, tools and Google API requests.
+
+A turn is traced by running it inside ``trace()`` with the trace's
+``callbacks`` in the run config::
+
+    with tracing.trace("alınacak listesini göster") as turn:
+        graph.invoke(inputs, config={**config, "callbacks": turn.callbacks})
+    turn.print_summary()
+
+Graph nodes, LLM calls and tools are recorded from LangChain callbacks. Code
+below them (API requests, hierarchy builds) opens spans with ``span()``, which
+costs nothing when no trace is active.
+"""
+
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:  # opentelemetry-api is optional
+    otel_trace = None
+
+# GTASKS_TRACE=1 prints a summary table after every command run by
+# ``run_commands``. GTASKS_TRACE_PATH also appends each turn's spans there as
+# a JSON line.
+TRACE_ENABLED = os.environ.get("GTASKS_TRACE") == "1" or bool(os.environ.get("GTASKS_TRACE_PATH"))
+TRACE_PATH = os.environ.get("GTASKS_TRACE_PATH")
+
+# Numeric span attributes added up in the summary table.
+SUMMED_ATTRIBUTES = ("input_tokens", "output_tokens", "request_bytes", "response_bytes", "retries", "queue_ms")
+
+_current_trace: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar("gtasks_trace", default=None)
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("gtasks_span", default=None)
+
+
+class Span:
+    __slots__ = ("span_id", "parent_id", "name", "kind", "start", "end", "attributes", "error")
+
+    def __init__(self, name: str, kind: str, parent_id: Optional[str] = None, **attributes):
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start = time.time()
+        self.end: Optional[float] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        return None if self.end is None else (self.end - self.start) * 1000
+
+    def to_dict(self) -> dict:
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start": self.start,
+            "duration_ms": self.duration_ms,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class Trace:
+    """Spans of one turn, under a root span named after the turn."""
+
+    def __init__(self, name: str):
+        self.trace_id = uuid.uuid4().hex
+        self.root = Span(name, "turn")
+        self.spans: List[Span] = [self.root]
+        self._lock = threading.Lock()
+        self.callbacks = [TracingCallbackHandler(self)]
+
+    def start_span(self, name: str, kind: str, parent_id: Optional[str] = None, **attributes) -> Span:
+        span = Span(name, kind, parent_id or self.root.span_id, **attributes)
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    @staticmethod
+    def end_span(span: Span, error: Optional[BaseException] = None, **attributes):
+        span.end = time.time()
+        span.attributes.update(attributes)
+        if error is not None:
+            span.error = repr(error)
+
+    def incr(self, attribute: str, amount: int = 1):
+        """Add to a counter on the turn itself (e.g. assistant re-prompts)."""
+        with self._lock:
+            self.root.attributes[attribute] = self.root.attributes.get(attribute, 0) + amount
+
+    # ---- export
+
+    def to_json(self) -> dict:
+        return {"trace_id": self.trace_id, "spans": [span.to_dict() for span in self.spans]}
+
+    def export_otel(self, tracer=None):
+        """Replay the spans into OpenTelemetry, with their original timings."""
+        if otel_trace is None:
+            raise RuntimeError("opentelemetry-api is not installed.")
+        tracer = tracer or otel_trace.get_tracer("gtasks")
+        exported: Dict[str, object] = {}
+        for span in self.spans:
+            parent = exported.get(span.parent_id)
+            context = otel_trace.set_span_in_context(parent) if parent is not None else None
+            otel_span = tracer.start_span(
+                span.name,
+                context=context,
+                start_time=int(span.start * 1e9),
+                attributes={"gtasks.kind": span.kind, **{key: value for key, value in span.attributes.items() if value is not None}},
+            )
+            if span.error:
+                otel_span.set_status(otel_trace.Status(otel_trace.StatusCode.ERROR, span.error))
+            exported[span.span_id] = otel_span
+        # Children first, so that no span ends before the spans it contains.
+        for span in reversed(self.spans):
+            exported[span.span_id].end(end_time=int((span.end or time.time()) * 1e9))
+
+    def summary_rows(self) -> List[dict]:
+        """One row per span kind and name: count, total and max time, and summed attributes."""
+        rows: Dict[tuple, dict] = {}
+        for span in self.spans:
+            row = rows.setdefault(
+                (span.kind, span.name),
+                {"kind": span.kind, "name": span.name, "count": 0, "total_ms": 0.0, "max_ms": 0.0, "errors": 0, **dict.fromkeys(SUMMED_ATTRIBUTES, 0)},
+            )
+            duration = span.duration_ms or 0.0
+            row["count"] += 1
+            row["total_ms"] += duration
+            row["max_ms"] = max(row["max_ms"], duration)
+            row["errors"] += span.error is not None
+            for attribute in SUMMED_ATTRIBUTES:
+                row[attribute] += span.attributes.get(attribute) or 0
+        return sorted(rows.values(), key=lambda row: -row["total_ms"])
+
+    def timings(self) -> Dict[str, float]:
+        """Total milliseconds per span kind, without the turn itself."""
+        totals = defaultdict(float)
+        for span in self.spans[1:]:
+            totals[span.kind] += span.duration_ms or 0.0
+        return {kind: round(total, 1) for kind, total in totals.items()}
+
+    def print_summary(self):
+        rows = self.summary_rows()
+        columns = ["kind", "name", "count", "total_ms", "max_ms", "errors", *SUMMED_ATTRIBUTES]
+        columns = [column for column in columns if any(row[column] for row in rows) or column in ("kind", "name", "count", "total_ms")]
+        cells = [[f"{row[column]:.1f}" if isinstance(row[column], float) else str(row[column]) for column in columns] for row in rows]
+        widths = [max(len(column), *(len(line[index]) for line in cells)) for index, column in enumerate(columns)]
+        print("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+        for line in cells:
+            print("  ".join(cell.ljust(width) for cell, width in zip(line, widths)))
+        if self.root.attributes:
+            print(", ".join(f"{key}: {value}" for key, value in self.root.attributes.items()))
+
+
+@contextmanager
+def trace(name: str) -> Iterator[Trace]:
+    """Trace everything run inside the block, including worker threads started from it."""
+    current = Trace(name)
+    token = _current_trace.set(current)
+    try:
+        yield current
+    finally:
+        _current_trace.reset(token)
+        current.end_span(current.root)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name: str, kind: str, **attributes) -> Iterator[Optional[Span]]:
+    """
+    Record the block as a span of the active trace, if there is one.
+
+    Attributes can be added to the yielded span before the block ends.
+    """
+    current = _current_trace.get()
+    if current is None:
+        yield None
+        return
+
+    parent = _current_span.get()
+    opened = current.start_span(name, kind, parent.span_id if parent else None, **attributes)
+    token = _current_span.set(opened)
+    try:
+        yield opened
+    except BaseException as error:
+        current.end_span(opened, error=error)
+        raise
+    else:
+        current.end_span(opened)
+    finally:
+        _current_span.reset(token)
+
+
+def incr(attribute: str, amount: int = 1):
+    """Add to a counter of the active turn, if there is one."""
+    current = _current_trace.get()
+    if current is not None:
+        current.incr(attribute, amount)
+
+
+def traced(kind: str, name: Optional[str] = None):
+    """Decorator recording every call of a function as a span of the active trace."""
+
+    def decorator(function):
+        span_name = name or function.__name__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if _current_trace.get() is None:
+                return function(*args, **kwargs)
+            with span(span_name, kind):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """Turns LangChain callbacks for graph nodes, chat models and tools into spans."""
+
+    # Called in the tool's own context, so spans opened by the tool's code
+    # (API requests) nest under the tool span.
+    run_inline = True
+
+    def __init__(self, trace: Trace):
+        self.trace = trace
+        self._spans: Dict[UUID, Span] = {}
+        self._parents: Dict[UUID, Optional[UUID]] = {}
+        self._outer: Dict[UUID, Optional[Span]] = {}
+
+    def _parent_id(self, parent_run_id: Optional[UUID]) -> Optional[str]:
+        # Nearest ancestor run that has a span. Most chains (prompts, sequences)
+        # do not get one.
+        while parent_run_id is not None:
+            if parent_run_id in self._spans:
+                return self._spans[parent_run_id].span_id
+            parent_run_id = self._parents.get(parent_run_id)
+        return None
+
+    def _start(self, run_id: UUID, parent_run_id: Optional[UUID], name: str, kind: str, **attributes):
+        self._spans[run_id] = self.trace.start_span(name, kind, self._parent_id(parent_run_id), **attributes)
+
+    def _end(self, run_id: UUID, error: Optional[BaseException] = None, **attributes):
+        span = self._spans.get(run_id)
+        if span is not None:
+            self.trace.end_span(span, error=error, **attributes)
+
+    # ---- graph nodes
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        self._parents[run_id] = parent_run_id
+        node = (metadata or {}).get("langgraph_node")
+        if node and kwargs.get("name") == node:
+            self._start(run_id, parent_run_id, node, "node", step=(metadata or {}).get("langgraph_step"))
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=error)
+
+    # ---- chat models
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        self._parents[run_id] = parent_run_id
+        model = (metadata or {}).get("ls_model_name") or (serialized or {}).get("name") or "llm"
+        self._start(run_id, parent_run_id, model, "llm", streamed_tokens=0)
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        span = self._spans.get(run_id)
+        if span is not None:
+            if not span.attributes["streamed_tokens"]:
+                span.attributes["ttft_ms"] = round((time.time() - span.start) * 1000, 1)
+            span.attributes["streamed_tokens"] += 1
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        usage = {}
+        for generations in response.generations:
+            for generation in generations:
+                message_usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                for key in ("input_tokens", "output_tokens"):
+                    usage[key] = usage.get(key, 0) + message_usage.get(key, 0)
+        self._end(run_id, **usage)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=error)
+
+    # ---- tools
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs):
+        self._parents[run_id] = parent_run_id
+        name = (serialized or {}).get("name") or kwargs.get("name") or "tool"
+        self._start(run_id, parent_run_id, name, "tool", request_bytes=len(input_str or ""))
+        self._outer[run_id] = _current_span.get()
+        _current_span.set(self._spans[run_id])
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        content = getattr(output, "content", output)
+        _current_span.set(self._outer.pop(run_id, None))
+        self._end(run_id, response_bytes=len(content if isinstance(content, str) else json.dumps(content, default=str)))
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        _current_span.set(self._outer.pop(run_id, None))
+        self._end(run_id, error=error)
+
@@ -1,53 +1,238 @@
-from langchain_core.messages import ToolMessage
-from langchain_core.runnables import RunnableLambda
-from langgraph.prebuilt import ToolNode
-
-def _print_event(event: dict, _printed: set, max_length=2000):
-    current_state = event.get("dialog_state")
-    if current_state:
-        print("Currently in: ", current_state[-1])
-    message = event.get("messages")
-    if message:
-        if isinstance(message, list):
-            message = message[-1]
-        if message.id not in _printed:
-            msg_repr = message.pretty_repr(html=True)
-            if len(msg_repr) > max_length:
-                msg_repr = msg_repr[:max_length] + " ... (truncated)"
-            print(msg_repr)
-            _printed.add(message.id)
-
-# create an agent system to run an llm and search for information on tavily via function call
-def handle_tool_error(state) -> dict:
+import asyncio
+import concurrent.futures
+import contextvars
+import os
+import threading
+import time
+
+from typing import Callable, Dict, List, Optional
+
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from langchain_core.runnables.utils import accepts_config
+from langchain_core.tools import BaseTool
+
+from gtasks import tracing
+from gtasks.api.rate_limit import is_throttled
+from gtasks.tools.compact import use_aliases
+
+# Tool calls of one message run at once, up to this many across the process.
+TOOL_MAX_WORKERS = int(os.environ.get("GTASKS_TOOL_WORKERS", 8))
+
+# Seconds a tool call may take before it is given up on.
+TOOL_TIMEOUT = float(os.environ.get("GTASKS_TOOL_TIMEOUT", 30))
+
+# Tools allowed longer than TOOL_TIMEOUT.
+TOOL_TIMEOUTS = {"bulk_task_ops": 2 * TOOL_TIMEOUT}
+
+# Sync calls past their deadline that may still hold a worker. Once this many
+# do, the worker pool is replaced with a fresh one.
+TOOL_MAX_HUNG = int(os.environ.get("GTASKS_TOOL_MAX_HUNG", 4))
+
+# Seconds between two checks for queued sync calls having started.
+QUEUE_POLL = 0.05
+
+def _is_throttled(error) -> bool:
+    response = getattr(error, "resp", None) or getattr(error, "response", None)
+    status = getattr(response, "status", None) or getattr(response, "status_code", None)
+    content = getattr(error, "content", None) or getattr(response, "content", b"")
+    return is_throttled(status, content)
+
+def tool_error_message(error: BaseException, tool_call: dict, timeout: Optional[float] = None) -> ToolMessage:
     """
-    Function to handle errors that occur during tool execution.
+    Function to turn the error of one tool call into the message the model sees.
 
     Args:
-        state (dict): The current state of the AI agent, which includes messages and tool call details.
+        error (BaseException): What the tool raised.
+        tool_call (dict): The failed call.
+        timeout (float, optional): The deadline the call missed, if it timed out.
 
     Returns:
-        dict: A dictionary containing error messages for each tool that encountered an issue.
+        ToolMessage: An error message answering only this call.
+    """
+    if timeout is not None:
+        # The call may have gone through after all
+        content = f"Error: {tool_call['name']} did not finish within {timeout:g} seconds and was cancelled. It may still have taken effect; check before calling it again."
+    # Quota errors were already retried; another attempt by the model would only spend more
+    elif _is_throttled(error):
+        content = f"Error: {repr(error)}\n The Google Tasks API quota is exhausted for now. Do not retry; tell the user to try again later."
+    else:
+        content = f"Error: {repr(error)}\n please fix your mistakes."
+    return ToolMessage(content=content, tool_call_id=tool_call["id"], name=tool_call["name"], status="error")
+
+class ParallelToolNode:
     """
-    # Retrieve the error from the current state
-    error = state.get("error")
-
-    # Access the tool calls from the last message in the state's message history
-    tool_calls = state["messages"][-1].tool_calls
-
-    # Return a list of ToolMessages with error details, linked to each tool call ID
-    return {
-        "messages": [
-            ToolMessage(
-                content=f"Error: {repr(error)}\n please fix your mistakes.",  # Format the error message for the user
-                tool_call_id=tc[
-                    "id"
-                ],  # Associate the error message with the corresponding tool call ID
-            )
-            for tc in tool_calls  # Iterate over each tool call to produce individual error messages
-        ]
-    }
-
-def create_tool_node_with_fallback(tools: list) -> dict:
+    Graph node running the tool calls of the last message concurrently.
+
+    Each call has its own deadline and its own outcome: calls that succeed
+    return their results, and a call that raises or times out gets an error
+    message of its own, so the model only has to redo that one.
+
+    Deadlines count from the start of each call, not from the time it waited
+    for a worker. Async runs cancel a call at its deadline. Sync tools cannot
+    be interrupted once running: a call past its deadline is answered with an
+    error and its late result dropped, and once ``TOOL_MAX_HUNG`` such calls
+    hold a worker, the pool is replaced so they cannot starve later calls.
+
+    Args:
+        tools (list): The tools the model can call.
+        max_workers (int): Calls running at once.
+        timeout (float): Seconds each call may take.
+        timeouts (dict, optional): Deadlines of particular tools, by name.
+    """
+
+    def __init__(
+        self,
+        tools: List[BaseTool],
+        max_workers: int = TOOL_MAX_WORKERS,
+        timeout: float = TOOL_TIMEOUT,
+        timeouts: Optional[Dict[str, float]] = None,
+    ):
+        self.tools = {tool.name: tool for tool in tools}
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self.timeouts = {**TOOL_TIMEOUTS, **(timeouts or {})}
+        self._executor = self._pool()
+        self._hung = set()
+        self._lock = threading.Lock()
+
+    def _pool(self) -> concurrent.futures.ThreadPoolExecutor:
+        return concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="gtasks-tool")
+
+    def _timeout(self, name: str) -> float:
+        return self.timeouts.get(name, self.timeout)
+
+    @staticmethod
+    def _tool_calls(state: dict) -> list:
+        last = state["messages"][-1]
+        return last.tool_calls if isinstance(last, AIMessage) else []
+
+    def _result(self, tool_call: dict, output) -> ToolMessage:
+        if isinstance(output, ToolMessage):
+            return output
+        return ToolMessage(content=str(output), tool_call_id=tool_call["id"], name=tool_call["name"])
+
+    def _failed(self, tool_call: dict, error: BaseException, timeout: Optional[float] = None) -> ToolMessage:
+        tracing.incr("tool_timeouts" if timeout is not None else "tool_errors")
+        return tool_error_message(error, tool_call, timeout)
+
+    def _unknown(self, tool_call: dict) -> Optional[ToolMessage]:
+        if tool_call["name"] in self.tools:
+            return None
+        return self._failed(tool_call, ValueError(f"Unknown tool {tool_call['name']!r}; use one of {', '.join(self.tools)}"))
+
+    def _abandon(self, future: concurrent.futures.Future) -> bool:
+        """Leave a call past its deadline to finish on its own. True if the pool was replaced."""
+        with self._lock:
+            self._hung.add(future)
+            future.add_done_callback(self._hung.discard)
+            if len(self._hung) < TOOL_MAX_HUNG:
+                return False
+            tracing.incr("tool_pools_replaced")
+            # The old threads exit once their calls return.
+            self._executor.shutdown(wait=False)
+            self._executor = self._pool()
+            self._hung = set()
+            return True
+
+    def _outcome(self, tool_call: dict, future: concurrent.futures.Future) -> ToolMessage:
+        try:
+            return self._result(tool_call, future.result())
+        except Exception as error:
+            return self._failed(tool_call, error)
+
+    def __call__(self, state: dict, config: RunnableConfig) -> dict:
+        tool_calls = self._tool_calls(state)
+        calls = {tool_call["id"]: tool_call for tool_call in tool_calls if tool_call["name"] in self.tools}
+        started: Dict[str, float] = {}
+
+        def run(tool_call: dict):
+            started[tool_call["id"]] = time.monotonic()
+            return self.tools[tool_call["name"]].invoke({**tool_call, "type": "tool_call"}, config)
+
+        def submit(tool_call: dict) -> concurrent.futures.Future:
+            # Each call keeps the caller's trace and quota user
+            return self._executor.submit(contextvars.copy_context().run, run, tool_call)
+
+        futures = {call_id: submit(tool_call) for call_id, tool_call in calls.items()}
+        outcomes: Dict[str, ToolMessage] = {}
+        while futures:
+            now = time.monotonic()
+            replaced = False
+            for call_id, future in list(futures.items()):
+                tool_call = calls[call_id]
+                timeout = self._timeout(tool_call["name"])
+                if future.done():
+                    outcomes[call_id] = self._outcome(tool_call, future)
+                elif call_id in started and now >= started[call_id] + timeout:
+                    outcomes[call_id] = self._failed(tool_call, concurrent.futures.TimeoutError(), timeout)
+                    replaced = self._abandon(future) or replaced
+                else:
+                    continue
+                del futures[call_id]
+            if replaced:
+                # Calls still queued in the old pool move to the new one.
+                for call_id, future in futures.items():
+                    if future.cancel():
+                        futures[call_id] = submit(calls[call_id])
+
+            deadlines = [started[call_id] + self._timeout(calls[call_id]["name"]) for call_id in futures if call_id in started]
+            wait = min(deadlines) - now if deadlines else None
+            if len(deadlines) < len(futures):
+                # A queued call's deadline only starts once a worker takes it.
+                wait = QUEUE_POLL if wait is None else min(wait, QUEUE_POLL)
+            if futures:
+                concurrent.futures.wait(futures.values(), max(0.0, wait), concurrent.futures.FIRST_COMPLETED)
+
+        return {"messages": [outcomes[tool_call["id"]] if tool_call["id"] in calls else self._unknown(tool_call) for tool_call in tool_calls]}
+
+    async def acall(self, state: dict, config: RunnableConfig) -> dict:
+        slots = asyncio.Semaphore(self.max_workers)
+
+        async def run(tool_call: dict) -> ToolMessage:
+            unknown = self._unknown(tool_call)
+            if unknown is not None:
+                return unknown
+            timeout = self._timeout(tool_call["name"])
+            try:
+                async with slots:
+                    output = await asyncio.wait_for(
+                        self.tools[tool_call["name"]].ainvoke({**tool_call, "type": "tool_call"}, config), timeout
+                    )
+                return self._result(tool_call, output)
+            except asyncio.TimeoutError as error:
+                return self._failed(tool_call, error, timeout)
+            except Exception as error:
+                return self._failed(tool_call, error)
+
+        return {"messages": list(await asyncio.gather(*(run(tool_call) for tool_call in self._tool_calls(state))))}
+
+def conversation_node(func: Callable, afunc: Optional[Callable] = None) -> RunnableLambda:
+    """
+    Function to make a graph node use the id aliases of the conversation it runs for.
+
+    Args:
+        func (Callable): The node, called with the state (and the config if it takes one).
+        afunc (Callable, optional): Its async counterpart.
+
+    Returns:
+        RunnableLambda: The node, running inside ``use_aliases`` for the config's thread id.
+    """
+
+    def call(node: Callable, state: dict, config: RunnableConfig):
+        return node(state, config) if accepts_config(node) else node(state)
+
+    def run(state: dict, config: RunnableConfig):
+        with use_aliases(config.get("configurable", {}).get("thread_id")):
+            return call(func, state, config)
+
+    async def arun(state: dict, config: RunnableConfig):
+        with use_aliases(config.get("configurable", {}).get("thread_id")):
+            return await call(afunc, state, config)
+
+    return RunnableLambda(run, afunc=arun if afunc is not None else None)
+
+def create_tool_node_with_fallback(tools: list) -> RunnableLambda:
     """
     Function to create a tool node with fallback error handling.
 
@@ -55,13 +240,8 @@ def create_tool_node_with_fallback(tools: list) -> dict:
         tools (list): A list of tools to be included in the node.
 
     Returns:
-        dict: A tool node that uses fallback behavior in case of errors.
+        RunnableLambda: A tool node running the calls of a message in parallel,
+        answering each failed or timed out call with its own error message.
     """
-    # Create a ToolNode with the provided tools and attach a fallback mechanism
-    # If an error occurs, it will invoke the handle_tool_error function to manage the error
-    return ToolNode(tools).with_fallbacks(
-        [
-            RunnableLambda(handle_tool_error)
-        ],  # Use a lambda function to wrap the error handler
-        exception_key="error",  # Specify that this fallback is for handling errors
-    )
\ No newline at end of file
+    node = ParallelToolNode(tools)
+    return conversation_node(node, node.acall)